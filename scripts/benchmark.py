@@ -0,0 +1,295 @@
+# scripts/benchmark.py
+"""
+Offline benchmark: replay recorded conversations through the full turn path
+(session load → save_turn → process_user_message / stream_user_message →
+save_turn) against local Bedrock and DynamoDB stand-ins, and report
+throughput, p50/p95/p99 turn latency and AWS call counts per intent.
+
+Conversations are JSONL, one per line:
+
+    {"id": "office", "turns": [{"user": "Where is your office?", "intent": "rag"}, "Any other branches?"]}
+
+The labelled intent is what the fake classifier answers; unlabelled turns fall
+back to the local router's rules/model. DynamoDB is an in-memory fake by
+default, or moto (`--dynamodb moto`) or DynamoDB Local (`--dynamodb local
+--dynamodb-endpoint http://localhost:8000`).
+
+    python scripts/benchmark.py --concurrency 8 --repeat 3 --output bench.json
+    python scripts/benchmark.py --baseline bench.json --fail-on-regression 0.15
+
+Results are written as JSON so runs can be diffed; --baseline prints the
+change against a previous result file and can fail the run on a p95 regression.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+DEFAULT_CONVERSATIONS = Path(__file__).parent / "data" / "benchmark_conversations.jsonl"
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=Path, default=DEFAULT_CONVERSATIONS)
+    parser.add_argument("--concurrency", type=int, default=4, help="Conversations replayed at the same time")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay every conversation this many times (as new rooms)")
+    parser.add_argument("--bedrock-latency", type=float, default=0.3, help="Seconds per Bedrock runtime call (time to first byte for streams)")
+    parser.add_argument("--kb-latency", type=float, default=0.6, help="Seconds per knowledge-base call")
+    parser.add_argument("--token-latency", type=float, default=0.02, help="Seconds between streamed tokens")
+    parser.add_argument("--dynamodb-latency", type=float, default=0.01)
+    parser.add_argument("--bedrock-max-concurrency", type=int, default=0,
+                        help="Throttle Bedrock/KB calls beyond this many in flight, per client (0 = never)")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Latency varies uniformly by ± this fraction")
+    parser.add_argument("--dynamodb", choices=["fake", "moto", "local"], default="fake")
+    parser.add_argument("--dynamodb-endpoint", default="http://localhost:8000", help="DynamoDB Local endpoint for --dynamodb local")
+    parser.add_argument("--unprocessed-rate", type=float, default=0.0, help="Fraction of fake batch writes returned unprocessed")
+    parser.add_argument("--stream", action="store_true", help="Use the streaming pipeline (stream_user_message)")
+    parser.add_argument("--no-answer-cache", action="store_true", help="Disable the KB answer cache for this run")
+    parser.add_argument("--reconnect-every", type=int, default=0,
+                        help="Rejoin the room (reload its session) after every N turns; 0 never reconnects")
+    parser.add_argument("--output", type=Path, help="Write the JSON result here (default: stdout only)")
+    parser.add_argument("--baseline", type=Path, help="Previous result file to compare against")
+    parser.add_argument("--fail-on-regression", type=float, help="Exit 1 if p95 grows by more than this fraction over --baseline")
+    return parser.parse_args(argv)
+
+def load_conversations(path: Path) -> List[Dict]:
+    conversations = []
+    for n, line in enumerate(path.read_text().splitlines(), 1):
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        turns = [t if isinstance(t, dict) else {"user": t} for t in record["turns"]]
+        conversations.append({"id": record.get("id", f"conversation-{n}"), "turns": turns})
+    return conversations
+
+def percentile(values: List[float], q: float) -> float:
+    """Linear-interpolated percentile, q in [0, 100]."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+def latency_summary(values: List[float]) -> Dict[str, float]:
+    return {
+        "count": len(values),
+        "mean": round(sum(values) / len(values), 4) if values else 0.0,
+        "p50": round(percentile(values, 50), 4),
+        "p95": round(percentile(values, 95), 4),
+        "p99": round(percentile(values, 99), 4),
+        "max": round(max(values, default=0.0), 4),
+    }
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def dynamodb_backend(args):
+    """Return (client, cleanup) for the chosen DynamoDB stand-in."""
+    from scripts import local_aws
+    from src.utils.env import settings
+
+    if args.dynamodb == "fake":
+        return local_aws.FakeDynamoDB(unprocessed_rate=args.unprocessed_rate), lambda: None
+    import boto3
+    if args.dynamodb == "moto":
+        try:
+            from moto import mock_aws  # moto >= 5
+        except ImportError:
+            raise SystemExit('--dynamodb moto needs moto: pip install "moto[dynamodb]"')
+        mock = mock_aws()
+        mock.start()
+        return boto3.client("dynamodb", region_name=settings.AWS_REGION), mock.stop
+    return boto3.client("dynamodb", region_name=settings.AWS_REGION, endpoint_url=args.dynamodb_endpoint,
+                        aws_access_key_id="local", aws_secret_access_key="local"), lambda: None
+
+async def run_turn(room_id: str, text: str, chat_history: List[Dict], stream: bool) -> Dict:
+    """One turn as src/agent.py runs it; a fresh task so the intent label never leaks into the next turn."""
+    from src.dynamodb_logger import save_turn
+    from src.rag_tool import process_user_message, stream_user_message
+    from src.utils.tracing import set_turn_context
+
+    set_turn_context(room_id=room_id)
+    start = time.perf_counter()
+    first_chunk = None
+    await save_turn(room_id, "user", text)
+    chat_history.append({"role": "user", "content": text})
+    if stream:
+        spoken = []
+        async for sentence in stream_user_message(text, chat_history, room_id):
+            if first_chunk is None:
+                first_chunk = time.perf_counter() - start
+            spoken.append(sentence)
+        response = " ".join(spoken)
+    else:
+        response = await process_user_message(text, chat_history, room_id)
+    await save_turn(room_id, "assistant", response)
+    chat_history.append({"role": "assistant", "content": response})
+    elapsed = time.perf_counter() - start
+    intent = next((m.get("intent") for m in reversed(chat_history) if m.get("intent")), "unknown")
+    return {"intent": intent, "latency": elapsed, "first_chunk": first_chunk, "response": response}
+
+async def replay(conversation: Dict, room_id: str, stream: bool, results: List[Dict], expected: Dict[str, str],
+                 reconnect_every: int = 0):
+    from src.session_store import sessions
+    from src.utils.env import settings
+
+    chat_history = (await sessions.get(room_id)).history(settings.SESSION_HISTORY_ENTRIES)
+    for i, turn in enumerate(conversation["turns"]):
+        if reconnect_every and i and i % reconnect_every == 0:
+            chat_history = (await sessions.get(room_id)).history(settings.SESSION_HISTORY_ENTRIES)
+        result = await asyncio.create_task(run_turn(room_id, turn["user"], chat_history, stream))
+        result["conversation"] = conversation["id"]
+        result["expected_intent"] = expected.get(turn["user"])
+        results.append(result)
+
+async def run(args) -> Dict:
+    from scripts import local_aws
+    from src.services import bedrock_client, dynamodb_client
+    from src.services.bedrock_governor import governor
+    from src.dynamodb_logger import turn_writer
+    from src.session_store import sessions
+    from src.rag_tool import MODEL_ERROR_RESPONSE, RAG_ERROR_RESPONSE
+    from src.intent_router import get_router
+    from src.utils.env import settings
+
+    conversations = load_conversations(args.conversations)
+    labelled = {t["user"]: t["intent"] for c in conversations for t in c["turns"] if t.get("intent")}
+    router = get_router(settings.INTENT_ROUTER_MODEL_PATH, settings.INTENT_ROUTER_THRESHOLD)  # fit outside the timings
+
+    def classify(message: str) -> str:
+        return labelled.get(message) or router.route(message).intent or "smart_ai_assistant"
+
+    calls = local_aws.CallCounter()
+    bedrock_client.runtime = local_aws.InstrumentedClient(
+        local_aws.FakeBedrockRuntime(classify=classify, token_latency=args.token_latency),
+        "bedrock", calls, latency=args.bedrock_latency, jitter=args.jitter, max_concurrency=args.bedrock_max_concurrency)
+    bedrock_client.agent_runtime = local_aws.InstrumentedClient(
+        local_aws.FakeAgentRuntime(token_latency=args.token_latency),
+        "bedrock", calls, latency=args.kb_latency, jitter=args.jitter, max_concurrency=args.bedrock_max_concurrency)
+    bedrock_client.kb_admin = local_aws.InstrumentedClient(local_aws.FakeBedrockAgent(), "bedrock", calls)
+    ddb, cleanup = dynamodb_backend(args)
+    local_aws.ensure_turns_table(ddb, settings.DYNAMODB_TURNS_TABLE)
+    dynamodb_client.client = local_aws.InstrumentedClient(ddb, "dynamodb", calls, latency=args.dynamodb_latency, jitter=args.jitter)
+
+    try:
+        results: List[Dict] = []
+        semaphore = asyncio.Semaphore(args.concurrency)
+        run_id = int(time.time())
+
+        async def bounded(conversation, rep):
+            async with semaphore:
+                await replay(conversation, f"bench-{run_id}-{conversation['id']}-{rep}", args.stream, results, labelled,
+                             args.reconnect_every)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(bounded(c, rep) for rep in range(args.repeat) for c in conversations))
+        wall = time.perf_counter() - start
+        await turn_writer.drain()
+        stored = sum(len(ddb.query(
+            TableName=settings.DYNAMODB_TURNS_TABLE, KeyConditionExpression="room_id = :r",
+            ExpressionAttributeValues={":r": {"S": f"bench-{run_id}-{c['id']}-{rep}"}})["Items"])
+            for rep in range(args.repeat) for c in conversations)
+    finally:
+        cleanup()
+
+    snapshot = calls.snapshot()
+    by_intent = {}
+    for intent in sorted({r["intent"] for r in results}):
+        turns = [r for r in results if r["intent"] == intent]
+        bedrock = snapshot.get("bedrock", {}).get(intent, {})
+        by_intent[intent] = {
+            "turns": len(turns),
+            "latency_s": latency_summary([r["latency"] for r in turns]),
+            "bedrock_calls": bedrock,
+            "bedrock_calls_per_turn": round(sum(bedrock.values()) / len(turns), 3),
+        }
+    first_chunks = [r["first_chunk"] for r in results if r["first_chunk"] is not None]
+    checked = [r for r in results if r["expected_intent"]]
+    return {
+        "run": {
+            "commit": git_commit(),
+            "started_at": run_id,
+            "python": platform.python_version(),
+            "args": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()},
+            "settings": {k: getattr(settings, k) for k in (
+                "RAG_MODE", "RAG_CACHE_ENABLED", "STREAM_RESPONSES", "SPECULATIVE_DISPATCH",
+                "INTENT_ROUTER_ENABLED", "WRITE_BEHIND_ENABLED", "AWS_IO_MAX_WORKERS",
+                "BEDROCK_CONCURRENCY_INITIAL", "BEDROCK_HEDGE_ENABLED")},
+        },
+        "turns": len(results),
+        "wall_s": round(wall, 3),
+        "throughput_turns_per_s": round(len(results) / wall, 3) if wall else 0.0,
+        "latency_s": latency_summary([r["latency"] for r in results]),
+        "failed_turns": sum(MODEL_ERROR_RESPONSE in r["response"] or RAG_ERROR_RESPONSE in r["response"] for r in results),
+        "first_chunk_s": latency_summary(first_chunks) if first_chunks else None,
+        "intent_accuracy": round(sum(r["intent"] == r["expected_intent"] for r in checked) / len(checked), 4) if checked else None,
+        "by_intent": by_intent,
+        # Classification and other calls made before the turn's intent is known are under "unclassified"
+        "bedrock_calls": snapshot.get("bedrock", {}),
+        "bedrock_calls_total": calls.total("bedrock"),
+        "bedrock_throttled": bedrock_client.runtime.throttled + bedrock_client.agent_runtime.throttled,
+        "bedrock_governor": governor.stats(),
+        "session_store": sessions.stats(),
+        "dynamodb_calls": {op: n for ops in snapshot.get("dynamodb", {}).values() for op, n in ops.items()},
+        "memory": {"written": turn_writer.written, "dropped": turn_writer.dropped,
+                   "stored_turns": stored, "expected_turns": 2 * len(results)},
+    }
+
+def compare(result: Dict, baseline: Dict) -> Dict[str, float]:
+    """Relative change per headline metric (positive = bigger than baseline)."""
+    def rel(new, old):
+        return round((new - old) / old, 4) if old else 0.0
+    changes = {"throughput_turns_per_s": rel(result["throughput_turns_per_s"], baseline["throughput_turns_per_s"]),
+               "bedrock_calls_total": rel(result["bedrock_calls_total"], baseline["bedrock_calls_total"])}
+    for q in ("p50", "p95", "p99"):
+        changes[f"latency_{q}"] = rel(result["latency_s"][q], baseline["latency_s"][q])
+    return changes
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    # Dummy credentials so Settings validates; no real AWS/LiveKit traffic is made
+    for key in ("LIVEKIT_URL", "LIVEKIT_API_KEY", "LIVEKIT_API_SECRET", "BEDROCK_KB_ID",
+                "DEEPGRAM_API_KEY", "ELEVENLABS_API_KEY"):
+        os.environ.setdefault(key, "benchmark")
+    if args.no_answer_cache:
+        os.environ["RAG_CACHE_ENABLED"] = "false"
+
+    result = asyncio.run(run(args))
+    from src.dynamodb_logger import turn_writer
+    turn_writer.close()
+    exit_code = 0
+    if args.baseline:
+        result["baseline"] = {"file": str(args.baseline), "change": compare(result, json.loads(args.baseline.read_text()))}
+        p95_change = result["baseline"]["change"]["latency_p95"]
+        if args.fail_on_regression is not None and p95_change > args.fail_on_regression:
+            exit_code = 1
+    output = json.dumps(result, indent=2, default=str)
+    if args.output:
+        args.output.write_text(output + "\n")
+    print(output)
+
+    latency = result["latency_s"]
+    print(f"\n{result['turns']} turns in {result['wall_s']}s  throughput={result['throughput_turns_per_s']}/s  "
+          f"p50={latency['p50']:.3f}s  p95={latency['p95']:.3f}s  p99={latency['p99']:.3f}s  failed={result['failed_turns']}", file=sys.stderr)
+    for intent, stats in result["by_intent"].items():
+        print(f"  {intent:<20} turns={stats['turns']:<4} p95={stats['latency_s']['p95']:.3f}s  "
+              f"bedrock/turn={stats['bedrock_calls_per_turn']}", file=sys.stderr)
+    if exit_code:
+        print(f"p95 regressed by {p95_change:.1%} (limit {args.fail_on_regression:.1%})", file=sys.stderr)
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+# scripts/eval_intent_router.py
+"""
+Offline evaluation of the local intent router against LLM labels.
+
+Input is JSONL, one utterance per line:
+    {"text": "where is your office", "label": "rag", "history": [{"role": "user", "content": "...", "intent": "rag"}]}
+
+"label" is the Bedrock classifier's answer. Lines without one are labeled live
+with --label-with-llm, which also measures the real LLM classification latency.
+
+    python scripts/eval_intent_router.py --data intents.jsonl
+    python scripts/eval_intent_router.py --data intents.jsonl --label-with-llm --write-labels labeled.jsonl
+    python scripts/eval_intent_router.py --data labeled.jsonl --train models/intent_router.json
+
+With --train the saved model is fitted on every row, but the report is
+k-fold (--folds): each row is routed by a model fitted on the seed set and the
+other folds only, so the accuracy is not measured on the training data.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.intent_router import INTENTS, SEED_EXAMPLES, HashedNgramClassifier, IntentRouter
+
+def load_rows(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+async def label_with_llm(rows):
+    from src.rag_tool import classify_intent_with_context
+    from src.utils.env import settings
+
+    settings.INTENT_ROUTER_ENABLED = False
+    latencies = []
+    for row in rows:
+        if row.get("label"):
+            continue
+        start = time.perf_counter()
+        row["label"] = await classify_intent_with_context(row["text"], list(row.get("history", [])))
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def fit(rows):
+    return HashedNgramClassifier().fit(SEED_EXAMPLES + [(r["text"], r["label"]) for r in rows])
+
+def out_of_fold_models(rows, folds: int, seed: int = 0):
+    """For each row, a model fitted on the seed set and the rows of the other folds."""
+    order = list(range(len(rows)))
+    random.Random(seed).shuffle(order)
+    folds = max(1, min(folds, len(rows)))
+    models = [None] * len(rows)
+    for k in range(folds):
+        held_out = set(order[k::folds])
+        model = fit([row for i, row in enumerate(rows) if i not in held_out])
+        for i in held_out:
+            models[i] = model
+    return models
+
+def evaluate(models, rows, threshold):
+    """Route every row with its own model (the same one for all rows unless k-fold)."""
+    routed = correct_routed = 0
+    confusion = Counter()
+    local_latencies = []
+    for model, row in zip(models, rows):
+        router = IntentRouter(model, threshold)
+        start = time.perf_counter()
+        result = router.route(row["text"], row.get("history", []))
+        local_latencies.append(time.perf_counter() - start)
+        if router.is_confident(result):
+            routed += 1
+            correct_routed += result.intent == row["label"]
+            confusion[(row["label"], result.intent)] += 1
+        else:
+            confusion[(row["label"], "llm_fallback")] += 1
+    n = len(rows)
+    return {
+        "n": n,
+        "coverage": routed / n if n else 0.0,
+        "routed_accuracy": correct_routed / routed if routed else None,
+        # Fallback turns get the LLM label by definition
+        "end_to_end_accuracy": (correct_routed + (n - routed)) / n if n else None,
+        "local_ms_mean": statistics.mean(local_latencies) * 1000 if local_latencies else 0.0,
+        "confusion": {f"{gold}->{pred}": count for (gold, pred), count in sorted(confusion.items())},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", required=True)
+    parser.add_argument("--model", default=os.environ.get("INTENT_ROUTER_MODEL_PATH", "models/intent_router.json"))
+    parser.add_argument("--threshold", type=float, nargs="+", default=[0.7, 0.8, 0.85, 0.9, 0.95])
+    parser.add_argument("--label-with-llm", action="store_true", help="Label unlabeled rows with the Bedrock classifier")
+    parser.add_argument("--write-labels", help="Write the (LLM-)labeled rows to this JSONL path")
+    parser.add_argument("--llm-latency", type=float, default=0.8, help="LLM classify latency (s) if not measured")
+    parser.add_argument("--train", metavar="OUT", help="Fit on seed + labeled rows and save weights to OUT")
+    parser.add_argument("--folds", type=int, default=5, help="Cross-validation folds for the --train report")
+    args = parser.parse_args()
+
+    rows = load_rows(args.data)
+    llm_latency = args.llm_latency
+    if args.label_with_llm:
+        measured = asyncio.run(label_with_llm(rows))
+        if measured:
+            llm_latency = statistics.mean(measured)
+    rows = [r for r in rows if r.get("label") in INTENTS]
+    if args.write_labels:
+        with open(args.write_labels, "w") as f:
+            f.writelines(json.dumps(r) + "\n" for r in rows)
+
+    evaluation = "saved model"
+    if args.train:
+        model = fit(rows)
+        Path(args.train).parent.mkdir(parents=True, exist_ok=True)
+        model.save(args.train)
+        print(f"Saved router weights to {args.train} (trained on {len(rows)} rows + seed set)")
+        # Score rows the model under evaluation never saw
+        models = out_of_fold_models(rows, args.folds)
+        evaluation = f"{max(1, min(args.folds, len(rows)))}-fold"
+    else:
+        model = HashedNgramClassifier.load(args.model) if Path(args.model).exists() else fit([])
+        models = [model] * len(rows)
+
+    report = []
+    for threshold in args.threshold:
+        stats = evaluate(models, rows, threshold)
+        stats["threshold"] = threshold
+        stats["evaluation"] = evaluation
+        stats["llm_latency_s"] = round(llm_latency, 3)
+        stats["latency_saved_per_turn_ms"] = round(stats["coverage"] * llm_latency * 1000 - stats["local_ms_mean"], 1)
+        report.append(stats)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
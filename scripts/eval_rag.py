@@ -0,0 +1,246 @@
+# scripts/eval_rag.py
+"""
+Batch evaluation of the RAG pipeline over a question set.
+
+Every question goes through the same stages as a live turn: normalization
+(analyze), intent classification with its history, build_kb_query and the
+RAG handler (RAG_MODE decides retrieve_and_generate or two-stage). Questions
+run concurrently up to --concurrency; identical KB requests within the run
+are sent once and shared, so re-running a set after a prompt change only pays
+for what changed. The answer cache is off unless --answer-cache is given.
+Bedrock calls still go through the governor, so a large set is paced by
+BEDROCK_REQUESTS_PER_MINUTE / BEDROCK_TOKENS_PER_MINUTE, not throttled.
+
+Input is JSONL, one question per line:
+
+    {"id": "coo", "question": "Who is the COO?", "intent": "rag", "expect": ["Yokesh"]}
+    {"id": "dubai", "question": "What about Dubai?", "history": ["Where is your office located?"]}
+    {"id": "q2", "question": "Any other branches?", "conversation": "office"}
+
+"history" is fixed earlier turns: {"role", "content", "intent"} entries, or
+plain strings for earlier RAG questions. Questions sharing a "conversation"
+run in file order and see the previous questions and the answers produced in
+this run. "intent" is the expected intent and "expect" is a list of phrases
+the answer should contain; both are scored when present.
+
+    python scripts/eval_rag.py --questions questions.jsonl --output answers.jsonl
+    python scripts/eval_rag.py --questions questions.jsonl --concurrency 16 --follow-intent
+    python scripts/eval_rag.py --questions questions.jsonl --local   # against the local stand-ins
+
+Per-question results (answer, intent, enhanced query, retrieval stats, stage
+latencies) go to --output; a JSON summary is printed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from scripts.benchmark import git_commit, latency_summary
+
+DEFAULT_QUESTIONS = Path(__file__).parent / "data" / "eval_questions.jsonl"
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", type=Path, default=DEFAULT_QUESTIONS)
+    parser.add_argument("--output", type=Path, help="Write per-question results here as JSONL")
+    parser.add_argument("--concurrency", type=int, default=8, help="Questions evaluated at the same time")
+    parser.add_argument("--follow-intent", action="store_true",
+                        help="Answer with the handler of the predicted intent (default: the RAG handler for every question)")
+    parser.add_argument("--answer-cache", action="store_true", help="Keep the KB answer cache on")
+    parser.add_argument("--local", action="store_true", help="Use the local Bedrock/DynamoDB stand-ins instead of AWS")
+    parser.add_argument("--limit", type=int, help="Only the first N questions")
+    return parser.parse_args(argv)
+
+def load_questions(path: Path, limit=None) -> List[Dict]:
+    rows = []
+    for n, line in enumerate(path.read_text().splitlines(), 1):
+        if not line.strip():
+            continue
+        row = json.loads(line)
+        row.setdefault("id", f"q{n}")
+        row["history"] = [h if isinstance(h, dict) else {"role": "user", "content": h, "intent": "rag"}
+                          for h in row.get("history", [])]
+        rows.append(row)
+    return rows[:limit] if limit else rows
+
+class KBRequestCache:
+    """Shares one in-flight or finished result per identical KB request for the length of the run."""
+
+    def __init__(self):
+        self._results: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def wrap(self, fn):
+        async def cached(*args, **kwargs):
+            key = fn.__name__ + json.dumps([args, kwargs], sort_keys=True, default=str)
+            future = self._results.get(key)
+            if future is not None:
+                self.hits += 1
+                return await asyncio.shield(future)
+            self.misses += 1
+            future = self._results[key] = asyncio.get_running_loop().create_future()
+            try:
+                result = await fn(*args, **kwargs)
+            except BaseException as e:
+                del self._results[key]  # errors are not cached; waiters see this one
+                future.set_exception(e)
+                future.exception()
+                raise
+            future.set_result(result)
+            return result
+        return cached
+
+def use_local_stand_ins():
+    from src.intent_router import get_router
+    from scripts import local_aws
+    from src.services import bedrock_client, dynamodb_client
+    from src.utils.env import settings
+
+    router = get_router(settings.INTENT_ROUTER_MODEL_PATH, settings.INTENT_ROUTER_THRESHOLD)
+    bedrock_client.runtime = local_aws.FakeBedrockRuntime(classify=lambda m: router.route(m).intent or "smart_ai_assistant")
+    bedrock_client.agent_runtime = local_aws.FakeAgentRuntime()
+    bedrock_client.kb_admin = local_aws.FakeBedrockAgent()
+    dynamodb_client.client = local_aws.FakeDynamoDB()
+    local_aws.ensure_turns_table(dynamodb_client.client, settings.DYNAMODB_TURNS_TABLE)
+
+async def evaluate(row: Dict, history: List[Dict], follow_intent: bool) -> Dict:
+    """One question through normalize → intent → KB query → answer; a fresh task so traces never mix."""
+    from src.models.chat_message import ChatHistory
+    from src.query_normalizer import analyze
+    from src import rag_tool
+
+    question = row["question"]
+    history = ChatHistory(history)
+    timings = {}
+    start = time.perf_counter()
+    features = analyze(question)
+    timings["normalize"] = time.perf_counter() - start
+
+    mark = time.perf_counter()
+    intent = await rag_tool.classify_intent_with_context(question, history)
+    timings["intent"] = time.perf_counter() - mark
+
+    mark = time.perf_counter()
+    trace: Dict = {}
+    rag_tool.retrieval_trace.set(trace)
+    # The live pipeline appends the question with its intent before answering
+    history.append({"role": "user", "content": question, "intent": intent})
+    if follow_intent and intent != "rag":
+        answer = await rag_tool._dispatch(intent, question, history)
+    else:
+        answer = await rag_tool.handle_rag_intent(question, history)
+    timings["answer"] = time.perf_counter() - mark
+    timings["total"] = time.perf_counter() - start
+
+    result = {
+        "id": row["id"],
+        "question": question,
+        "normalized": features.normalized,
+        "tags": sorted(features.tags),
+        "intent": intent,
+        "expected_intent": row.get("intent"),
+        "answer": answer,
+        "no_info": answer == rag_tool.NO_INFO_RESPONSE,
+        "error": answer in (rag_tool.RAG_ERROR_RESPONSE, rag_tool.MODEL_ERROR_RESPONSE),
+        "retrieval": trace,
+        "latency_ms": {stage: round(seconds * 1000, 1) for stage, seconds in timings.items()},
+    }
+    if row.get("expect"):
+        lower = answer.lower()
+        result["expect_found"] = [phrase for phrase in row["expect"] if phrase.lower() in lower]
+        result["expect_score"] = round(len(result["expect_found"]) / len(row["expect"]), 4)
+    if "conversation" in row:
+        result["conversation"] = row["conversation"]
+    return result
+
+async def run(args) -> Dict:
+    from src.services import bedrock_client
+    from src.services.bedrock_governor import governor
+    from src.utils.env import settings
+
+    if args.local:
+        use_local_stand_ins()
+    settings.RAG_CACHE_ENABLED = args.answer_cache
+    kb_cache = KBRequestCache()
+    bedrock_client.retrieve = kb_cache.wrap(bedrock_client.retrieve)
+    bedrock_client.retrieve_and_generate = kb_cache.wrap(bedrock_client.retrieve_and_generate)
+
+    rows = load_questions(args.questions, args.limit)
+    # Questions of one conversation run in order; everything else is independent
+    groups: "OrderedDict[str, List[Dict]]" = OrderedDict()
+    for row in rows:
+        groups.setdefault(row.get("conversation") or f"#{row['id']}", []).append(row)
+
+    semaphore = asyncio.Semaphore(args.concurrency)
+    results: Dict[str, Dict] = {}
+    done = 0
+
+    async def run_group(group: List[Dict]):
+        nonlocal done
+        context: List[Dict] = []
+        for row in group:
+            async with semaphore:
+                result = await asyncio.create_task(evaluate(row, row["history"] + context, args.follow_intent))
+            results[row["id"]] = result
+            context += [{"role": "user", "content": row["question"], "intent": result["intent"]},
+                        {"role": "assistant", "content": result["answer"]}]
+            done += 1
+            if done % 25 == 0:
+                print(f"  {done}/{len(rows)} questions", file=sys.stderr)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run_group(group) for group in groups.values()))
+    wall = time.perf_counter() - start
+    ordered = [results[row["id"]] for row in rows]
+
+    checked = [r for r in ordered if r["expected_intent"]]
+    scored = [r for r in ordered if "expect_score" in r]
+    stages = ("normalize", "intent", "answer", "total")
+    summary = {
+        "git_commit": git_commit(),
+        "questions": len(ordered),
+        "wall_s": round(wall, 3),
+        "settings": {"RAG_MODE": settings.RAG_MODE, "RAG_RETRIEVE_RESULTS": settings.RAG_RETRIEVE_RESULTS,
+                     "RAG_CONTEXT_PASSAGES": settings.RAG_CONTEXT_PASSAGES, "RAG_CACHE_ENABLED": settings.RAG_CACHE_ENABLED,
+                     "local": args.local},
+        "latency_s": {stage: latency_summary([r["latency_ms"][stage] / 1000 for r in ordered]) for stage in stages},
+        "intent_accuracy": round(sum(r["intent"] == r["expected_intent"] for r in checked) / len(checked), 4) if checked else None,
+        "expect_score": round(sum(r["expect_score"] for r in scored) / len(scored), 4) if scored else None,
+        "no_info_rate": round(sum(r["no_info"] for r in ordered) / len(ordered), 4) if ordered else 0.0,
+        "error_rate": round(sum(r["error"] for r in ordered) / len(ordered), 4) if ordered else 0.0,
+        "followups": sum(bool(r["retrieval"].get("followup")) for r in ordered),
+        "kb_requests": {"sent": kb_cache.misses, "shared": kb_cache.hits},
+        "bedrock_governor": governor.stats(),
+    }
+    return {"summary": summary, "results": ordered}
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.local:
+        # Dummy credentials so Settings validates; no real AWS/LiveKit traffic is made
+        for key in ("LIVEKIT_URL", "LIVEKIT_API_KEY", "LIVEKIT_API_SECRET", "BEDROCK_KB_ID",
+                    "DEEPGRAM_API_KEY", "ELEVENLABS_API_KEY"):
+            os.environ.setdefault(key, "eval")
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            f.writelines(json.dumps(r, default=str) + "\n" for r in report["results"])
+    summary = report["summary"]
+    print(json.dumps(summary, indent=2))
+    print(f"\n{summary['questions']} questions in {summary['wall_s']}s  "
+          f"p50={summary['latency_s']['total']['p50']:.3f}s  p95={summary['latency_s']['total']['p95']:.3f}s  "
+          f"no_info={summary['no_info_rate']:.1%}  errors={summary['error_rate']:.1%}  "
+          f"kb sent={summary['kb_requests']['sent']} shared={summary['kb_requests']['shared']}", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+# scripts/load_test.py
+"""
+Concurrent-rooms load test for the async Bedrock/DynamoDB I/O layer.
+
+Simulates N rooms per process, each sending turns through process_user_message
+and save_turn against the local AWS stand-ins (scripts/local_aws.py) with
+a fixed per-call latency. With blocking I/O on the event loop p95 grows
+linearly with rooms; with the shared executor it stays flat until the pool
+(AWS_IO_MAX_WORKERS) is saturated. For full conversation replays with
+per-intent latency and call counts, see scripts/benchmark.py.
+
+Bedrock calls go through the governor (src/services/bedrock_governor.py). By
+default its quotas are lifted and its concurrency starts at the pool size, so
+the numbers measure the I/O path; --quotas keeps the configured
+BEDROCK_REQUESTS_PER_MINUTE / BEDROCK_TOKENS_PER_MINUTE to see how a burst of
+rooms is paced instead. Each level reports the calls the governor queued.
+
+    python scripts/load_test.py --rooms 1 4 16 32 --turns 5 --latency 0.3
+    python scripts/load_test.py --rooms 32 --quotas
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+# Dummy credentials so Settings validates; no real AWS/LiveKit traffic is made
+for _key in ("LIVEKIT_URL", "LIVEKIT_API_KEY", "LIVEKIT_API_SECRET", "BEDROCK_KB_ID",
+             "DEEPGRAM_API_KEY", "ELEVENLABS_API_KEY"):
+    os.environ.setdefault(_key, "load-test")
+# Measure the I/O path, not answer-cache hits on the repeated questions
+os.environ.setdefault("RAG_CACHE_ENABLED", "false")
+
+from scripts import local_aws
+from src.services import bedrock_client, dynamodb_client
+from src.dynamodb_logger import save_turn, turn_writer
+from src.intent_router import get_router
+from src.rag_tool import process_user_message
+from src.services.bedrock_governor import governor
+from src.utils.env import settings
+
+QUESTIONS = [
+    "Where is your office located?",
+    "Who is the COO of Sparkout?",
+    "How do I design a microservices architecture?",
+    "Tell me about your case studies",
+]
+
+async def run_room(room_idx: int, turns: int, latencies: list):
+    room_id = f"load-room-{room_idx}"
+    chat_history = []
+    for turn in range(turns):
+        text = QUESTIONS[(room_idx + turn) % len(QUESTIONS)]
+        start = time.perf_counter()
+        await save_turn(room_id, "user", text)
+        response = await process_user_message(text, chat_history)
+        await save_turn(room_id, "assistant", response)
+        latencies.append(time.perf_counter() - start)
+        chat_history.append({"role": "assistant", "content": response})
+
+async def measure_loop_lag(stop: asyncio.Event, samples: list, interval: float = 0.01):
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        samples.append(max(0.0, time.perf_counter() - expected))
+
+def p95(values):
+    return statistics.quantiles(values, n=20)[-1] if len(values) >= 2 else values[0]
+
+async def run_level(rooms: int, turns: int):
+    latencies, lag = [], []
+    before = governor.stats()
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop, lag))
+    start = time.perf_counter()
+    await asyncio.gather(*(run_room(i, turns, latencies) for i in range(rooms)))
+    wall = time.perf_counter() - start
+    stop.set()
+    await lag_task
+    after = governor.stats()
+    return {
+        "rooms": rooms,
+        "turns": len(latencies),
+        "p50_s": round(statistics.median(latencies), 3),
+        "p95_s": round(p95(latencies), 3),
+        "max_loop_lag_ms": round(max(lag or [0.0]) * 1000, 1),
+        "turns_per_s": round(len(latencies) / wall, 2),
+        "bedrock_queued": after["queued"] - before["queued"],
+        "bedrock_throttled": after["throttled"] - before["throttled"],
+        "bedrock_limit": after["limit"],
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rooms", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds per stubbed Bedrock call")
+    parser.add_argument("--quotas", action="store_true", help="Keep the configured Bedrock quotas and initial concurrency")
+    args = parser.parse_args()
+
+    if not args.quotas:
+        governor.set_quota(requests_per_minute=1_000_000, tokens_per_minute=0)
+        governor.limit = float(max(settings.BEDROCK_CONCURRENCY_INITIAL, settings.AWS_IO_MAX_WORKERS))
+
+    calls = local_aws.CallCounter()
+    bedrock_client.runtime = local_aws.InstrumentedClient(
+        local_aws.FakeBedrockRuntime(classify=lambda message: "rag"), "bedrock", calls, latency=args.latency)
+    bedrock_client.agent_runtime = local_aws.InstrumentedClient(local_aws.FakeAgentRuntime(), "bedrock", calls, latency=args.latency)
+    ddb = local_aws.FakeDynamoDB()
+    local_aws.ensure_turns_table(ddb, settings.DYNAMODB_TURNS_TABLE)
+    dynamodb_client.client = local_aws.InstrumentedClient(ddb, "dynamodb", calls, latency=args.latency / 10)
+    get_router(settings.INTENT_ROUTER_MODEL_PATH, settings.INTENT_ROUTER_THRESHOLD)  # fit once, outside the timings
+
+    results = [await run_level(rooms, args.turns) for rooms in args.rooms]
+    await turn_writer.drain()
+    print(json.dumps(results, indent=2))
+
+    baseline = results[0]["p95_s"]
+    for r in results:
+        print(f"rooms={r['rooms']:>4}  p95={r['p95_s']:.3f}s  ({r['p95_s'] / baseline:.2f}x)  "
+              f"loop_lag_max={r['max_loop_lag_ms']}ms  throughput={r['turns_per_s']}/s  "
+              f"bedrock_queued={r['bedrock_queued']}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
+    turn_writer.close()
@@ -0,0 +1,360 @@
+# scripts/local_aws.py
+"""
+In-process stand-ins for the AWS clients, used by the offline benchmark, load
+test and RAG evaluation instead of real Bedrock/DynamoDB. Tooling only: the
+agent never imports it.
+
+They implement only the boto3 client methods this repo calls, with the same
+request/response shapes. Latency is injected by `InstrumentedClient`, which
+also counts calls per current turn intent, so the same wrapper can sit in front
+of a fake, a moto-mocked client or a DynamoDB Local client:
+
+    calls = CallCounter()
+    bedrock_client.runtime = InstrumentedClient(FakeBedrockRuntime(), "bedrock", calls, latency=0.3)
+    dynamodb_client.client = InstrumentedClient(FakeDynamoDB(), "dynamodb", calls, latency=0.01)
+"""
+import io
+import json
+import math
+import random
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from decimal import Decimal
+from typing import Callable, Dict, List, Optional, Tuple
+from botocore.exceptions import ClientError
+from src.utils.tracing import current_intent
+
+CLASSIFY_MARKER = "Intent (one word only)"
+
+DEFAULT_GENERATIONS = {
+    "greetings": "Hello! Welcome to Sparkout Tech Solutions. How can I help you today?",
+    "smart_ai_assistant": "Start by splitting the problem into small pieces. Build and test each one on its own, then connect them step by step.",
+    "rag": "Sparkout Tech Solutions builds custom software, blockchain and AI products for clients around the world.",
+}
+
+DEFAULT_KB_ANSWER = "Our main office is in Coimbatore, India, and we also have teams in Chennai, Dubai and the United States."
+
+DEFAULT_PASSAGES = [
+    "Sparkout Tech Solutions is headquartered in Coimbatore, Tamil Nadu, India.",
+    "Sparkout has branch offices in Chennai, Dubai and the United States.",
+    "Our case studies include a blockchain supply-chain platform and an AI customer-support assistant.",
+    "The leadership team includes the CEO, the COO and the heads of engineering and delivery.",
+    "Sparkout's portfolio spans fintech, healthcare, logistics and e-commerce clients.",
+    "We offer web, mobile, blockchain, AI/ML and cloud development services.",
+]
+
+class CallCounter:
+    """Thread-safe call counts keyed by (service, intent, operation)."""
+
+    def __init__(self):
+        self._counts: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, service: str, operation: str):
+        key = (service, current_intent() or "unclassified", operation)
+        with self._lock:
+            self._counts[key] += 1
+
+    def total(self, service: Optional[str] = None) -> int:
+        with self._lock:
+            return sum(n for (s, _, _), n in self._counts.items() if service is None or s == service)
+
+    def snapshot(self) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """{service: {intent: {operation: count}}}"""
+        out: Dict[str, Dict[str, Dict[str, int]]] = {}
+        with self._lock:
+            for (service, intent, operation), n in sorted(self._counts.items()):
+                out.setdefault(service, {}).setdefault(intent, {})[operation] = n
+        return out
+
+    def reset(self):
+        with self._lock:
+            self._counts.clear()
+
+class InstrumentedClient:
+    """Proxy that counts every client method call and sleeps `latency` (± `jitter` fraction) before it.
+
+    With `max_concurrency`, calls beyond that many in flight fail with a
+    ThrottlingException, like a Bedrock quota under burst load.
+    """
+
+    def __init__(self, client, service: str, calls: CallCounter, latency: float = 0.0, jitter: float = 0.0,
+                 max_concurrency: int = 0):
+        self._client = client
+        self._service = service
+        self._calls = calls
+        self._latency = latency
+        self._jitter = jitter
+        self._max_concurrency = max_concurrency
+        self._inflight = 0
+        self._lock = threading.Lock()
+        self.throttled = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr) or name.startswith("_"):
+            return attr
+
+        def call(*args, **kwargs):
+            self._calls.record(self._service, name)
+            with self._lock:
+                if self._max_concurrency and self._inflight >= self._max_concurrency:
+                    self.throttled += 1
+                    raise ClientError({"Error": {"Code": "ThrottlingException", "Message": "Too many requests"}}, name)
+                self._inflight += 1
+            try:
+                if self._latency:
+                    time.sleep(self._latency * random.uniform(1 - self._jitter, 1 + self._jitter))
+                return attr(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._inflight -= 1
+        return call
+
+def _words(text: str) -> List[str]:
+    # Keep the whitespace attached so the pieces concatenate back to the original text
+    return re.findall(r"\S+\s*", text)
+
+def _fake_embedding(text: str, dimensions: int) -> List[float]:
+    vector = [0.0] * dimensions
+    for token in re.findall(r"[a-z0-9]+", text.lower()):
+        vector[zlib.crc32(token.encode()) % dimensions] += 1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+class FakeBedrockRuntime:
+    """bedrock-runtime stand-in: intent classification, canned Llama generations and Titan-like embeddings.
+
+    `classify(message)` decides what the intent prompt answers; generations are
+    picked by the turn intent in effect when the call is made.
+    """
+
+    def __init__(self, generations: Optional[Dict[str, str]] = None,
+                 classify: Optional[Callable[[str], str]] = None, token_latency: float = 0.0):
+        self.generations = {**DEFAULT_GENERATIONS, **(generations or {})}
+        self.classify = classify or (lambda message: "smart_ai_assistant")
+        self.token_latency = token_latency
+
+    def _respond(self, body: Dict) -> Dict:
+        if "inputText" in body:
+            return {"embedding": _fake_embedding(body["inputText"], body.get("dimensions", 256)),
+                    "inputTextTokenCount": len(body["inputText"].split())}
+        prompt = body.get("prompt", "")
+        if CLASSIFY_MARKER in prompt:
+            match = re.search(r"CURRENT MESSAGE: (.*)", prompt)
+            generation = self.classify(match.group(1).strip() if match else "")
+        else:
+            generation = self.generations.get(current_intent() or "", self.generations["smart_ai_assistant"])
+        return {
+            "generation": generation,
+            "prompt_token_count": len(prompt.split()),
+            "generation_token_count": len(generation.split()),
+            "stop_reason": "stop",
+        }
+
+    def invoke_model(self, modelId: str, body: str, **kwargs) -> Dict:
+        return {"body": io.BytesIO(json.dumps(self._respond(json.loads(body))).encode()), "contentType": "application/json"}
+
+    def invoke_model_with_response_stream(self, modelId: str, body: str, **kwargs) -> Dict:
+        result = self._respond(json.loads(body))
+
+        def events():
+            pieces = _words(result["generation"])
+            for i, piece in enumerate(pieces):
+                if i and self.token_latency:
+                    time.sleep(self.token_latency)
+                # Same shape as Llama 3 streaming: prompt count first, running generation count, final totals
+                chunk = {"generation": piece, "prompt_token_count": result["prompt_token_count"] if i == 0 else None,
+                         "generation_token_count": i + 1, "stop_reason": None}
+                if i == len(pieces) - 1:
+                    chunk["stop_reason"] = "stop"
+                    chunk["amazon-bedrock-invocationMetrics"] = {
+                        "inputTokenCount": result["prompt_token_count"], "outputTokenCount": i + 1}
+                yield {"chunk": {"bytes": json.dumps(chunk).encode()}}
+        return {"body": events(), "contentType": "application/json"}
+
+class FakeAgentRuntime:
+    """bedrock-agent-runtime stand-in for knowledge-base retrieval and generation."""
+
+    def __init__(self, answer: str = DEFAULT_KB_ANSWER, passages: Optional[List[str]] = None, token_latency: float = 0.0):
+        self.answer = answer
+        self.passages = passages or DEFAULT_PASSAGES
+        self.token_latency = token_latency
+
+    def retrieve_and_generate(self, **kwargs) -> Dict:
+        return {"output": {"text": self.answer}, "citations": [], "sessionId": "local"}
+
+    def retrieve_and_generate_stream(self, **kwargs) -> Dict:
+        def events():
+            for i, piece in enumerate(_words(self.answer)):
+                if i and self.token_latency:
+                    time.sleep(self.token_latency)
+                yield {"output": {"text": piece}}
+        return {"stream": events(), "sessionId": "local"}
+
+    def retrieve(self, retrievalQuery: Dict, retrievalConfiguration: Optional[Dict] = None, **kwargs) -> Dict:
+        limit = (retrievalConfiguration or {}).get("vectorSearchConfiguration", {}).get("numberOfResults", 5)
+        query = _fake_embedding(retrievalQuery.get("text", ""), 256)
+        scored = sorted(
+            ((sum(a * b for a, b in zip(query, _fake_embedding(p, 256))), i, p) for i, p in enumerate(self.passages)),
+            reverse=True,
+        )
+        return {"retrievalResults": [
+            {"content": {"text": p}, "score": round(score, 4), "location": {"s3Location": {"uri": f"s3://local-kb/doc-{i}.txt"}}}
+            for score, i, p in scored[:limit]
+        ]}
+
+class FakeBedrockAgent:
+    """bedrock-agent (control plane) stand-in: one data source whose ingestion job never changes."""
+
+    def list_data_sources(self, knowledgeBaseId: str, **kwargs) -> Dict:
+        return {"dataSourceSummaries": [{"dataSourceId": "local-source", "knowledgeBaseId": knowledgeBaseId}]}
+
+    def list_ingestion_jobs(self, **kwargs) -> Dict:
+        return {"ingestionJobSummaries": [{"ingestionJobId": "local-job", "status": "COMPLETE"}]}
+
+# ---------------------------------------------------------------- DynamoDB
+
+def _scalar(value: Dict):
+    (kind, raw), = value.items()
+    return Decimal(raw) if kind == "N" else raw
+
+_CONDITION = re.compile(
+    r"^\s*(?:begins_with\(\s*(\w+)\s*,\s*(:\w+)\s*\)|(\w+)\s*(=|<=|>=|<|>)\s*(:\w+))\s*$", re.IGNORECASE
+)
+
+def _parse_key_condition(expression: str, values: Dict) -> List[Tuple[str, str, object]]:
+    conditions = []
+    for part in re.split(r"\s+AND\s+", expression, flags=re.IGNORECASE):
+        match = _CONDITION.match(part)
+        if not match:
+            raise ValueError(f"Unsupported key condition: {part!r}")
+        if match.group(1):
+            conditions.append((match.group(1), "begins_with", _scalar(values[match.group(2)])))
+        else:
+            conditions.append((match.group(3), match.group(4), _scalar(values[match.group(5)])))
+    return conditions
+
+def _matches(item: Dict, conditions) -> bool:
+    for attr, op, operand in conditions:
+        if attr not in item:
+            return False
+        value = _scalar(item[attr])
+        ok = {
+            "begins_with": lambda: isinstance(value, str) and value.startswith(operand),
+            "=": lambda: value == operand,
+            "<": lambda: value < operand,
+            "<=": lambda: value <= operand,
+            ">": lambda: value > operand,
+            ">=": lambda: value >= operand,
+        }[op]()
+        if not ok:
+            return False
+    return True
+
+class FakeDynamoDB:
+    """Low-level DynamoDB client stand-in (attribute-value wire format) for get/put/update/query/batch writes.
+
+    `unprocessed_rate` returns that fraction of batch writes as UnprocessedItems,
+    like a throttled partition, to exercise the retry path.
+    """
+
+    def __init__(self, unprocessed_rate: float = 0.0, seed: int = 0):
+        self._tables: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self.unprocessed_rate = unprocessed_rate
+
+    def create_table(self, TableName: str, KeySchema: List[Dict], **kwargs) -> Dict:
+        with self._lock:
+            hash_key = next(k["AttributeName"] for k in KeySchema if k["KeyType"] == "HASH")
+            range_key = next((k["AttributeName"] for k in KeySchema if k["KeyType"] == "RANGE"), None)
+            self._tables.setdefault(TableName, {"hash": hash_key, "range": range_key, "items": {}})
+        return {"TableDescription": {"TableName": TableName, "TableStatus": "ACTIVE"}}
+
+    def list_tables(self, **kwargs) -> Dict:
+        return {"TableNames": sorted(self._tables)}
+
+    def describe_table(self, TableName: str) -> Dict:
+        table = self._table(TableName)
+        return {"Table": {"TableName": TableName, "TableStatus": "ACTIVE", "ItemCount": len(table["items"])}}
+
+    def _table(self, name: str) -> Dict:
+        if name not in self._tables:
+            raise ValueError(f"Requested resource not found: table {name}")
+        return self._tables[name]
+
+    @staticmethod
+    def _key(table: Dict, item: Dict) -> Tuple:
+        return (_scalar(item[table["hash"]]), _scalar(item[table["range"]]) if table["range"] else None)
+
+    def get_item(self, TableName: str, Key: Dict, **kwargs) -> Dict:
+        with self._lock:
+            table = self._table(TableName)
+            item = table["items"].get(self._key(table, Key))
+        return {"Item": dict(item)} if item else {}
+
+    def put_item(self, TableName: str, Item: Dict, **kwargs) -> Dict:
+        with self._lock:
+            table = self._table(TableName)
+            table["items"][self._key(table, Item)] = dict(Item)
+        return {}
+
+    def update_item(self, TableName: str, Key: Dict, UpdateExpression: str, ExpressionAttributeValues: Dict, **kwargs) -> Dict:
+        if not UpdateExpression.strip().upper().startswith("SET "):
+            raise ValueError(f"Unsupported update expression: {UpdateExpression!r}")
+        with self._lock:
+            table = self._table(TableName)
+            item = table["items"].setdefault(self._key(table, Key), dict(Key))
+            for assignment in UpdateExpression.strip()[4:].split(","):
+                attr, placeholder = (s.strip() for s in assignment.split("="))
+                item[attr] = ExpressionAttributeValues[placeholder]
+        return {}
+
+    def query(self, TableName: str, KeyConditionExpression: str, ExpressionAttributeValues: Dict,
+              Limit: Optional[int] = None, ScanIndexForward: bool = True, ExclusiveStartKey: Optional[Dict] = None, **kwargs) -> Dict:
+        conditions = _parse_key_condition(KeyConditionExpression, ExpressionAttributeValues)
+        with self._lock:
+            table = self._table(TableName)
+            matched = sorted((k, dict(v)) for k, v in table["items"].items() if _matches(v, conditions))
+        if not ScanIndexForward:
+            matched.reverse()
+        if ExclusiveStartKey:
+            start = self._key(table, ExclusiveStartKey)
+            keys = [k for k, _ in matched]
+            matched = matched[keys.index(start) + 1:] if start in keys else []
+        page = matched[:Limit] if Limit else matched
+        response = {"Items": [item for _, item in page], "Count": len(page)}
+        if Limit and len(matched) > Limit:
+            last = page[-1][1]
+            response["LastEvaluatedKey"] = {k: last[k] for k in (table["hash"], table["range"]) if k}
+        return response
+
+    def batch_write_item(self, RequestItems: Dict[str, List[Dict]], **kwargs) -> Dict:
+        unprocessed: Dict[str, List[Dict]] = {}
+        with self._lock:
+            for name, requests in RequestItems.items():
+                table = self._table(name)
+                for request in requests:
+                    if self.unprocessed_rate and self._random.random() < self.unprocessed_rate:
+                        unprocessed.setdefault(name, []).append(request)
+                    elif "PutRequest" in request:
+                        item = request["PutRequest"]["Item"]
+                        table["items"][self._key(table, item)] = dict(item)
+                    else:
+                        table["items"].pop(self._key(table, request["DeleteRequest"]["Key"]), None)
+        return {"UnprocessedItems": unprocessed}
+
+def ensure_turns_table(client, name: str):
+    """Create the per-turn history table (room_id HASH, sk RANGE) on a fake, moto or DynamoDB Local client."""
+    if name in client.list_tables().get("TableNames", []):
+        return
+    client.create_table(
+        TableName=name,
+        KeySchema=[{"AttributeName": "room_id", "KeyType": "HASH"}, {"AttributeName": "sk", "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": "room_id", "AttributeType": "S"}, {"AttributeName": "sk", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
@@ -0,0 +1,135 @@
+# scripts/migrate_dynamodb.py
+"""
+Migrate conversation memory from the legacy layout (one item per room with an
+ever-growing `messages` list) to one item per turn.
+
+    legacy:  DYNAMODB_TABLE        room_id (HASH)             messages=[{role, text, timestamp}, ...]
+    new:     DYNAMODB_TURNS_TABLE  room_id (HASH) + sk (RANGE)  one item per turn, sk = TURN#<timestamp>#<seq>
+
+The new table is created (on-demand billing) with --create-table. Re-running is
+safe: turn keys are derived from the legacy timestamp and list position, so
+items are overwritten rather than duplicated, and turns a room's SUMMARY item
+already covers (compacted by --compact or by the agent) are not copied again.
+Rooms longer than HISTORY_TURN_LIMIT can be rolled into a summary with --compact.
+
+    python scripts/migrate_dynamodb.py --create-table
+    python scripts/migrate_dynamodb.py --room some-room --dry-run
+"""
+import argparse
+import asyncio
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import boto3
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.utils.env import settings
+from src.dynamodb_logger import SUMMARY_SK, TURN_PREFIX, turn_sort_key
+
+def normalize_timestamp(value: str) -> str:
+    """Legacy items used isoformat(), which drops '.000000'; turn keys need the fixed-width form."""
+    try:
+        return datetime.fromisoformat(value).strftime("%Y-%m-%dT%H:%M:%S.%f")
+    except (TypeError, ValueError):
+        return "0000-00-00T00:00:00.000000"
+
+def create_turns_table(dynamodb, name: str):
+    existing = dynamodb.meta.client.list_tables()["TableNames"]
+    if name in existing:
+        print(f"Table {name} already exists")
+        return
+    table = dynamodb.create_table(
+        TableName=name,
+        KeySchema=[{"AttributeName": "room_id", "KeyType": "HASH"}, {"AttributeName": "sk", "KeyType": "RANGE"}],
+        AttributeDefinitions=[{"AttributeName": "room_id", "AttributeType": "S"}, {"AttributeName": "sk", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    table.wait_until_exists()
+    print(f"Created table {name}")
+
+def legacy_rooms(table, room=None):
+    if room:
+        item = table.get_item(Key={"room_id": room}).get("Item")
+        if item:
+            yield item
+        return
+    kwargs = {}
+    while True:
+        page = table.scan(**kwargs)
+        yield from page.get("Items", [])
+        if "LastEvaluatedKey" not in page:
+            return
+        kwargs["ExclusiveStartKey"] = page["LastEvaluatedKey"]
+
+def turn_items(room_id, messages):
+    for position, message in enumerate(messages):
+        timestamp = normalize_timestamp(message.get("timestamp"))
+        yield {
+            "room_id": room_id,
+            "sk": turn_sort_key(timestamp, seq=position),
+            "timestamp": timestamp,
+            "role": message.get("role", "user"),
+            "text": message.get("text", ""),
+        }
+
+def summarized_through(table, room_id) -> str:
+    """Sort key of the newest turn already rolled into the room's summary; "" if it has none."""
+    try:
+        item = table.get_item(Key={"room_id": room_id, "sk": SUMMARY_SK}).get("Item")
+    except table.meta.client.exceptions.ResourceNotFoundException:
+        return ""  # dry run before --create-table
+    return item.get("through", "") if item else ""
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default=settings.DYNAMODB_TABLE)
+    parser.add_argument("--target", default=settings.DYNAMODB_TURNS_TABLE)
+    parser.add_argument("--room", help="Migrate a single room")
+    parser.add_argument("--create-table", action="store_true", help="Create the target table if missing")
+    parser.add_argument("--compact", action="store_true", help="Summarize turns beyond HISTORY_TURN_LIMIT after copying")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    dynamodb = boto3.resource("dynamodb", region_name=settings.AWS_REGION)
+    if args.create_table and not args.dry_run:
+        create_turns_table(dynamodb, args.target)
+    source, target = dynamodb.Table(args.source), dynamodb.Table(args.target)
+
+    rooms = turns = skipped = 0
+    migrated = []
+    for item in legacy_rooms(source, args.room):
+        items = list(turn_items(item["room_id"], item.get("messages", [])))
+        # Compaction deleted these after summarizing them; copying them again would bring them back
+        through = summarized_through(target, item["room_id"])
+        summarized = sum(turn["sk"] <= through for turn in items)
+        items = [turn for turn in items if turn["sk"] > through]
+        rooms += 1
+        turns += len(items)
+        skipped += summarized
+        if args.dry_run:
+            print(f"[dry-run] {item['room_id']}: {len(items)} turns ({summarized} already summarized)")
+            continue
+        if not items:
+            print(f"{item['room_id']}: nothing to copy ({summarized} turns already summarized)")
+            continue
+        with target.batch_writer(overwrite_by_pkeys=["room_id", "sk"]) as batch:
+            for turn in items:
+                batch.put_item(Item=turn)
+        migrated.append(item["room_id"])
+        print(f"{item['room_id']}: {len(items)} turns → {args.target}")
+
+    if args.compact and migrated:
+        from src.dynamodb_logger import compact_room
+
+        async def compact_all():
+            for room_id in migrated:
+                await compact_room(room_id)
+        asyncio.run(compact_all())
+
+    print(f"Done: {rooms} rooms, {turns} turns, {skipped} already summarized{' (dry run)' if args.dry_run else ''}. "
+          f"Turn keys use prefix {TURN_PREFIX!r}.")
+
+if __name__ == "__main__":
+    main()
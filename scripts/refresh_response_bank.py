@@ -0,0 +1,108 @@
+# scripts/refresh_response_bank.py
+"""
+Refresh the response bank offline: optionally generate extra greeting variants
+with Llama, then synthesize every banked reply with ElevenLabs for one voice
+and write the clips the agent plays without a TTS call (see src/response_bank.py).
+
+    python scripts/refresh_response_bank.py
+    python scripts/refresh_response_bank.py --voice-id EXAVITQu4vr4xnSDxMaL --force
+    python scripts/refresh_response_bank.py --generate-greetings 3 --dry-run
+
+Clips that already exist for the voice are kept unless --force is given, and
+clips whose text is no longer in the bank are removed from the manifest.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import urllib.request
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from src.response_bank import DEFAULT_BANK, clip_id, normalize
+from src.utils.env import settings
+
+TTS_URL = "https://api.elevenlabs.io/v1/text-to-speech/{voice_id}?output_format=pcm_{sample_rate}"
+
+def load_bank(path: Path):
+    bank = {k: list(v) for k, v in DEFAULT_BANK.items()}
+    if path.exists():
+        bank.update({k: list(v) for k, v in json.loads(path.read_text()).items() if v})
+    return bank
+
+async def generate_greetings(count: int):
+    from src.rag_tool import GREETING_SYSTEM_PROMPT, invoke_general_model
+    variants = []
+    for _ in range(count):
+        text = await invoke_general_model(GREETING_SYSTEM_PROMPT, "User said: 'Hello'\n\nReply warmly and offer help:",
+                                          max_gen_len=settings.MAX_TOKENS_GREETING, temperature=0.8, purpose="greetings")
+        variants.append(" ".join(text.split()))
+    return variants
+
+def synthesize(text: str, voice_id: str, sample_rate: int, model_id: str) -> bytes:
+    request = urllib.request.Request(
+        TTS_URL.format(voice_id=voice_id, sample_rate=sample_rate),
+        data=json.dumps({"text": text, "model_id": model_id}).encode(),
+        headers={"xi-api-key": settings.ELEVENLABS_API_KEY, "Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request, timeout=60) as response:
+        return response.read()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--voice-id", default=settings.ELEVENLABS_VOICE_ID)
+    parser.add_argument("--bank", default=settings.RESPONSE_BANK_PATH, help="JSON file of replies by category")
+    parser.add_argument("--audio-dir", default=settings.RESPONSE_AUDIO_DIR)
+    parser.add_argument("--sample-rate", type=int, default=settings.RESPONSE_AUDIO_SAMPLE_RATE)
+    parser.add_argument("--model-id", default=settings.RESPONSE_BANK_TTS_MODEL)
+    parser.add_argument("--generate-greetings", type=int, default=0, help="add N Llama-written greeting variants")
+    parser.add_argument("--force", action="store_true", help="re-synthesize clips that already exist")
+    parser.add_argument("--dry-run", action="store_true", help="print what would change, call no TTS")
+    args = parser.parse_args()
+
+    bank_path = Path(args.bank)
+    bank = load_bank(bank_path)
+    if args.generate_greetings:
+        known = {normalize(text) for text in bank["greeting"]}
+        for text in asyncio.run(generate_greetings(args.generate_greetings)):
+            if text and normalize(text) not in known:
+                known.add(normalize(text))
+                bank["greeting"].append(text)
+                print(f"+ greeting: {text}")
+        if not args.dry_run:
+            bank_path.parent.mkdir(parents=True, exist_ok=True)
+            bank_path.write_text(json.dumps(bank, indent=2) + "\n")
+
+    voice_dir = Path(args.audio_dir) / args.voice_id
+    manifest_path = voice_dir / "manifest.json"
+    manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+    if manifest.get("sample_rate", args.sample_rate) != args.sample_rate:
+        args.force = True  # existing clips are at another rate
+    wanted = {clip_id(text): text for replies in bank.values() for text in replies}
+    clips = {}
+    synthesized = 0
+    for cid, text in wanted.items():
+        pcm_path = voice_dir / f"{cid}.pcm"
+        if pcm_path.exists() and cid in manifest.get("clips", {}) and not args.force:
+            clips[cid] = text
+            continue
+        print(f"{'would synthesize' if args.dry_run else 'synthesizing'} {cid}: {text}")
+        if args.dry_run:
+            continue
+        voice_dir.mkdir(parents=True, exist_ok=True)
+        pcm_path.write_bytes(synthesize(text, args.voice_id, args.sample_rate, args.model_id))
+        clips[cid] = text
+        synthesized += 1
+
+    stale = sorted(set(manifest.get("clips", {})) - set(wanted))
+    for cid in stale:
+        print(f"{'would remove' if args.dry_run else 'removing'} {cid}: {manifest['clips'][cid]}")
+        if not args.dry_run:
+            (voice_dir / f"{cid}.pcm").unlink(missing_ok=True)
+    if not args.dry_run:
+        manifest_path.write_text(json.dumps({"sample_rate": args.sample_rate, "voice_id": args.voice_id, "clips": clips}, indent=2) + "\n")
+    print(f"voice {args.voice_id}: {len(wanted)} replies, {synthesized} synthesized, {len(stale)} removed")
+
+if __name__ == "__main__":
+    main()
@@ -48,27 +48,45 @@ sys.path.append(str(Path(__file__).parent.parent))
 # Now use ABSOLUTE imports (not relative dots)
 from livekit import agents, rtc
 from livekit.agents import Agent
-from livekit.plugins.deepgram import STT
-from livekit.plugins.elevenlabs import TTS
 
 # These are now absolute imports → WILL WORK
 from src.utils.env import settings
-from src.dynamodb_logger import load_history, save_turn
-from src.rag_tool import process_user_message
+from src.utils.logger import log
+from src.utils.tracing import count, observe, set_turn_context, span
+from src.dynamodb_logger import compactions, save_turn, turn_writer
+from src.early_turn import EarlyTurn
+from src.passage_cache import passage_cache
+from src.rag_tool import process_user_message, stream_user_message
+from src.response_bank import response_bank
+from src.session_store import sessions
+from src.turn_manager import RoomTurns
+from src.startup import load_plugins
+from src.worker_pool import serve, track_job
 
 import asyncio
+import time
 
 async def entrypoint(ctx: agents.JobContext):
     await ctx.connect_auto()
+    track_job(ctx)
+
+    async def end_room():
+        await compactions.end_room(ctx.room.name)
+        passage_cache.drop_room(ctx.room.name)  # its passages and any early retrieval still running
+    # A running compaction finishes first, then queued turn writes are flushed before the job exits
+    ctx.add_shutdown_callback(end_room)
+    ctx.add_shutdown_callback(turn_writer.drain)
 
     async def on_participant_connected(participant: rtc.RemoteParticipant):
         room_id = ctx.room.name
+        set_turn_context(room_id=room_id)
         
-        # Load conversation from DynamoDB
-        history = await load_history(room_id)
-        chat_history = [{"role": m["role"], "content": m["text"]} for m in history]
+        # Room state from memory on a reconnect or second participant, else Redis or DynamoDB
+        session = await sessions.get(room_id)
+        chat_history = session.history(settings.SESSION_HISTORY_ENTRIES)
 
         # Agent with Deepgram VAD + STT (Silero not needed)
+        STT, TTS = load_plugins()
         agent = Agent(
             stt=STT(),
             tts=TTS(voice_id=settings.ELEVENLABS_VOICE_ID),
@@ -78,34 +96,104 @@ async def entrypoint(ctx: agents.JobContext):
             interrupt_silence_duration=0.7,
         )
 
+        turns = RoomTurns(room_id)
+        early = EarlyTurn(room_id, chat_history, settings.EARLY_START_MIN_WORDS, settings.EARLY_START_MAX_STARTS)
+
+        def say(content, clip=None):
+            # Banked replies play their pre-synthesized audio: no TTS request
+            if clip is not None:
+                count("response_bank_audio")
+                return agent.say(content, audio=clip.frames(), allow_interruptions=True)
+            return agent.say(content, allow_interruptions=True)
+
+        async def run_turn(text: str, early_start=None):
+            spoken = []
+            try:
+                with span("turn", streaming=settings.STREAM_RESPONSES):
+                    # Memory
+                    await save_turn(room_id, "user", text)
+                    chat_history.append({"role": "user", "content": text})
+
+                    turn_start = time.perf_counter()
+                    # Intent already classified on the interim transcript, if it held up
+                    intent = await early_start.wait_intent() if early_start else None
+                    if settings.STREAM_RESPONSES:
+                        # Speak sentence by sentence while the model is still generating
+                        sentences = stream_user_message(text, chat_history, room_id, intent=intent).__aiter__()
+                        first = await anext(sentences, None)
+                        if first is not None:
+                            observe("first_sentence", time.perf_counter() - turn_start)
+                            spoken.append(first)
+                        clip = response_bank.audio_for(first) if first else None
+
+                        async def speak_stream():
+                            if first is not None:
+                                yield first
+                            async for sentence in sentences:
+                                spoken.append(sentence)
+                                yield sentence
+
+                        speech = say(first, clip) if clip else say(speak_stream())
+                    else:
+                        # YOUR FULL ENTERPRISE RAG + INTENT + GROUNDING
+                        response = await process_user_message(text, chat_history, room_id, intent=intent)
+                        spoken.append(response)
+                        speech = say(response, response_bank.audio_for(response))
+
+                    turns.set_speech(speech)
+                    with span("tts"):
+                        await speech
+                    response = " ".join(spoken)
+                    interrupted = bool(getattr(speech, "interrupted", False))
+
+                    await save_turn(room_id, "assistant", response, partial=interrupted)
+                    chat_history.append({"role": "assistant", "content": response, "partial": interrupted})
+                    log.debug("Assistant replied", room_id=room_id, text=response, partial=interrupted)
+            except asyncio.CancelledError:
+                # Superseded by a newer transcription: keep what was already handed to TTS, if anything was
+                if spoken:
+                    response = " ".join(spoken)
+                    await save_turn(room_id, "assistant", response, partial=True)
+                    chat_history.append({"role": "assistant", "content": response, "partial": True})
+                raise
+
+        speech_ended = None
+
+        @agent.on("user_stopped_speaking")
+        def on_user_stopped_speaking():
+            nonlocal speech_ended
+            speech_ended = time.perf_counter()
+
         @agent.on("user_transcribed")
         async def on_user_transcribed(transcription):
+            nonlocal speech_ended
             text = transcription.text.strip()
             if not text:
                 return
+            if not getattr(transcription, "is_final", True):
+                # Interim: start classification/retrieval on a stable prefix while the caller talks
+                if settings.EARLY_START_ENABLED:
+                    early.on_interim(text)
+                return
 
-            print(f"\nUSER: {text}")
-
-            # Memory
-            await save_turn(room_id, "user", text)
-            chat_history.append({"role": "user", "content": text})
-
-            # YOUR FULL ENTERPRISE RAG + INTENT + GROUNDING
-            response = await process_user_message(text, chat_history)
-
-            await save_turn(room_id, "assistant", response)
-            chat_history.append({"role": "assistant", "content": response})
-
-            print(f"ASSISTANT: {response}\n")
+            set_turn_context(room_id=room_id)
+            if speech_ended is not None:
+                # End of the caller's speech to the final transcript: endpointing silence plus STT finalization
+                observe("stt", time.perf_counter() - speech_ended, room_id=room_id)
+                speech_ended = None
+            log.debug("User said", room_id=room_id, text=text)
+            early_start = early.take(text) if settings.EARLY_START_ENABLED else None
 
-            await agent.say(response, allow_interruptions=True)
+            if settings.BARGE_IN_CANCEL:
+                await turns.start(run_turn(text, early_start))
+            else:
+                await run_turn(text, early_start)
 
         await agent.start(ctx.room, participant)
 
     ctx.room.on("participant_connected", on_participant_connected)
-    print("SPARKOUT VOICE AGENT IS LIVE AND READY!")
-    print("Go to: https://aws-voice-agent-fnvtbjkm.livekit.cloud → Join room → Speak!")
+    log.info("SPARKOUT VOICE AGENT IS LIVE AND READY!", room_id=ctx.room.name,
+             join="https://aws-voice-agent-fnvtbjkm.livekit.cloud")
 
 if __name__ == "__main__":
-    from livekit.agents.cli import run_app
-    run_app(entrypoint)
\ No newline at end of file
+    serve(entrypoint)
\ No newline at end of file
@@ -0,0 +1,195 @@
+# src/answer_cache.py
+"""
+Answer cache for knowledge-base questions.
+
+Exact lookups are keyed on the normalized enhanced KB query. With semantic
+lookup enabled, a miss falls back to a cosine-similarity search over Titan
+embeddings of the cached queries. Entries expire after a TTL, the least
+recently used entry is evicted past the size bound, and the whole cache is
+dropped when the knowledge base finishes a new ingestion job (checked with
+bedrock:ListDataSources / bedrock:ListIngestionJobs). Each drop bumps the
+cache generation; callers read it before the lookup and pass it to put(), so
+an answer generated from the old KB contents is not stored after the drop.
+
+One cache serves every room of a worker process; with the thread job
+executor those rooms run on different threads, so entry updates hold a lock.
+"""
+import asyncio
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+from .services import bedrock_client
+from .utils.env import settings
+from .utils.logger import log
+
+def cache_key(query: str) -> str:
+    key = re.sub(r"[^\w\s]", " ", query.lower())
+    return re.sub(r"\s+", " ", key).strip()
+
+@dataclass
+class _Entry:
+    answer: str
+    created_at: float
+    embedding: Optional[List[float]] = None
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    semantic_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+    stale_puts: int = 0  # answers started before an invalidation, not stored
+
+class AnswerCache:
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 3600,
+                 embed: Optional[Callable[[str], Awaitable[List[float]]]] = None,
+                 similarity_threshold: float = 0.92,
+                 kb_marker: Optional[Callable[[], Awaitable[Optional[str]]]] = None,
+                 kb_check_seconds: float = 300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.embed = embed
+        self.similarity_threshold = similarity_threshold
+        self.kb_marker = kb_marker
+        self.kb_check_seconds = kb_check_seconds
+        self.counters = CacheStats()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.generation = 0  # bumped by invalidate()
+        self._kb_version: Optional[str] = None
+        self._last_kb_check = 0.0
+        self._kb_check_task: Optional[asyncio.Task] = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _expired(self, entry: _Entry, now: float) -> bool:
+        return now - entry.created_at > self.ttl_seconds
+
+    def _lookup_exact(self, key: str, now: float) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry, now):
+                del self._entries[key]
+                self.counters.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return entry.answer
+
+    def _lookup_similar(self, embedding: List[float], now: float) -> Optional[str]:
+        best_key, best_score = None, self.similarity_threshold
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if self._expired(entry, now):
+                    del self._entries[key]
+                    self.counters.expirations += 1
+                    continue
+                if entry.embedding is None:
+                    continue
+                # Titan embeddings are requested normalized, so the dot product is the cosine
+                score = sum(a * b for a, b in zip(embedding, entry.embedding))
+                if score >= best_score:
+                    best_key, best_score = key, score
+            if best_key is None:
+                return None
+            self._entries.move_to_end(best_key)
+            return self._entries[best_key].answer
+
+    async def get(self, query: str) -> Optional[str]:
+        self._maybe_check_kb()
+        key = cache_key(query)
+        now = time.monotonic()
+        answer = self._lookup_exact(key, now)
+        if answer is not None:
+            self.counters.hits += 1
+            return answer
+        if self.embed is not None and self._entries:
+            try:
+                answer = self._lookup_similar(await self.embed(key), now)
+            except Exception as e:
+                log.error("Answer cache embedding failed", error=str(e))
+                answer = None
+            if answer is not None:
+                self.counters.hits += 1
+                self.counters.semantic_hits += 1
+                return answer
+        self.counters.misses += 1
+        return None
+
+    async def put(self, query: str, answer: str, generation: Optional[int] = None):
+        """Store an answer; dropped if the cache was invalidated since `generation` was read."""
+        key = cache_key(query)
+        embedding = None
+        if self.embed is not None:
+            try:
+                embedding = await self.embed(key)
+            except Exception as e:
+                log.error("Answer cache embedding failed", error=str(e))
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                self.counters.stale_puts += 1
+                return
+            self._entries[key] = _Entry(answer, time.monotonic(), embedding)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters.evictions += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+            self.counters.invalidations += 1
+
+    def _maybe_check_kb(self):
+        if self.kb_marker is None or time.monotonic() - self._last_kb_check < self.kb_check_seconds:
+            return
+        task = self._kb_check_task
+        # A check started by a room whose loop has since closed will never finish
+        if task is None or task.done() or task.get_loop().is_closed():
+            self._last_kb_check = time.monotonic()
+            self._kb_check_task = asyncio.create_task(self.check_kb_resync())
+
+    async def check_kb_resync(self) -> bool:
+        """Drop every cached answer if the KB has completed a new ingestion job since the last check."""
+        try:
+            marker = await self.kb_marker()
+        except Exception as e:
+            log.error("KB resync check failed", error=str(e))
+            return False
+        changed = self._kb_version is not None and marker != self._kb_version
+        self._kb_version = marker
+        if changed:
+            log.info("Knowledge base resynced, clearing answer cache", entries=len(self._entries))
+            self.invalidate()
+        return changed
+
+    def stats(self) -> Dict:
+        lookups = self.counters.hits + self.counters.misses
+        return {
+            **self.counters.__dict__,
+            "size": len(self._entries),
+            "hit_rate": round(self.counters.hits / lookups, 3) if lookups else 0.0,
+        }
+
+def _embed(text: str) -> Awaitable[List[float]]:
+    return bedrock_client.embed_text(text, settings.RAG_CACHE_EMBED_MODEL_ID)
+
+def _kb_marker() -> Awaitable[Optional[str]]:
+    return bedrock_client.latest_ingestion_marker(settings.BEDROCK_KB_ID)
+
+answer_cache = AnswerCache(
+    max_entries=settings.RAG_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.RAG_CACHE_TTL_SECONDS,
+    embed=_embed if settings.RAG_CACHE_SEMANTIC else None,
+    similarity_threshold=settings.RAG_CACHE_SIMILARITY,
+    kb_marker=_kb_marker,
+    kb_check_seconds=settings.RAG_CACHE_KB_CHECK_SECONDS,
+)
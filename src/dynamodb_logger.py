@@ -1,42 +1,196 @@
-import boto3
-import json
+import asyncio
+import itertools
+import threading
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
+from weakref import WeakKeyDictionary
+from .services import dynamodb_client
+from .services.write_behind import SharedWriteBehind
+from .session_store import sessions
 from .utils.env import settings
 from .utils.logger import log
+from .utils.tracing import span
 
-dynamodb = boto3.resource('dynamodb', region_name=settings.AWS_REGION)
-table = dynamodb.Table(settings.DYNAMODB_TABLE)
+# One item per turn: room_id (HASH) + sk (RANGE). Turn keys sort chronologically;
+# the rolling summary of compacted turns lives under a fixed key in the same partition.
+TURN_PREFIX = "TURN#"
+SUMMARY_SK = "SUMMARY"
+SUMMARY_PREFIX = "Summary of earlier conversation: "
 
-async def load_history(room_id: str) -> List[Dict]:
+_seq = itertools.count()
+
+# Turn writes leave the response path: batched across the process's rooms, flushed on size or time
+turn_writer = SharedWriteBehind(
+    settings.DYNAMODB_TURNS_TABLE,
+    max_batch=settings.WRITE_BEHIND_MAX_BATCH,
+    flush_interval=settings.WRITE_BEHIND_FLUSH_SECONDS,
+)
+
+def turn_sort_key(timestamp: str, seq: Optional[int] = None) -> str:
+    # Fixed-width timestamp + per-process sequence keeps keys unique and lexicographically ordered
+    return f"{TURN_PREFIX}{timestamp}#{next(_seq) if seq is None else seq:06d}"
+
+def _now() -> str:
+    return datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S.%f")
+
+async def _load_summary(room_id: str) -> Optional[Dict]:
+    return await dynamodb_client.get_item(settings.DYNAMODB_TURNS_TABLE, {"room_id": room_id, "sk": SUMMARY_SK})
+
+async def _load_recent_turns(room_id: str, limit: int) -> List[Dict]:
+    items = await dynamodb_client.query(
+        settings.DYNAMODB_TURNS_TABLE,
+        "room_id = :r AND begins_with(sk, :p)",
+        {":r": room_id, ":p": TURN_PREFIX},
+        limit=limit,
+        newest_first=True,
+    )
+    return list(reversed(items))
+
+async def load_history(room_id: str, limit: Optional[int] = None) -> List[Dict]:
+    """Last `limit` turns (oldest first), preceded by the summary of older turns if there is one."""
+    limit = limit or settings.HISTORY_TURN_LIMIT
     try:
-        response = table.get_item(Key={"room_id": room_id})
-        if "Item" in response:
-            messages = response["Item"].get("messages", [])
-            log.info("Loaded conversation history", room_id=room_id, count=len(messages))
-            return messages
+        # A reconnect must see turns this process has queued but not written yet
+        with span("dynamodb", op="load_history", room_id=room_id):
+            await turn_writer.flush()
+            summary, turns = await asyncio.gather(_load_summary(room_id), _load_recent_turns(room_id, limit))
+        messages = [{"role": t["role"], "text": t["text"], "timestamp": t.get("timestamp"), "partial": t.get("partial", False)}
+                    for t in turns]
+        if summary and summary.get("summary"):
+            messages.insert(0, {"role": "system", "text": f"{SUMMARY_PREFIX}{summary['summary']}",
+                                "timestamp": summary.get("updated_at")})
+        log.info("Loaded conversation history", room_id=room_id, count=len(turns), summarized=bool(summary))
+        return messages
     except Exception as e:
         log.error("Failed to load history", error=str(e))
     return []
 
-async def save_turn(room_id: str, role: str, text: str):
-    timestamp = datetime.utcnow().isoformat()
+async def save_turn(room_id: str, role: str, text: str, partial: bool = False):
+    """Persist one turn; `partial` marks an assistant answer cut off by a barge-in."""
+    timestamp = _now()
     item = {
         "room_id": room_id,
+        "sk": turn_sort_key(timestamp),
         "timestamp": timestamp,
         "role": role,
         "text": text
     }
+    if partial:
+        item["partial"] = True
+    sessions.record(room_id, role, text, timestamp, partial)
+    try:
+        if settings.WRITE_BEHIND_ENABLED:
+            turn_writer.enqueue(item)
+        else:
+            with span("dynamodb", op="put_turn", room_id=room_id):
+                await dynamodb_client.put_item(settings.DYNAMODB_TURNS_TABLE, item)
+        log.info("Saved turn", role=role, room_id=room_id, partial=partial)
+    except Exception as e:
+        log.error("Failed to save to DynamoDB", error=str(e))
+        return
+    compactions.turn_saved(room_id)
+
+class CompactionScheduler:
+    """Starts compact_room for a room after every HISTORY_COMPACT_EVERY saved turns.
+
+    Rooms of the thread job executor run on their own event loops, so the
+    per-room turn counts and compaction tasks are kept per loop (dropped with
+    the loop) under a lock, and end_room() forgets a room when its job ends.
+    """
+
+    def __init__(self):
+        self._loops: "WeakKeyDictionary[asyncio.AbstractEventLoop, Tuple[Dict[str, int], Dict[str, asyncio.Task]]]" = WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _state(self) -> Tuple[Dict[str, int], Dict[str, asyncio.Task]]:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            state = self._loops.get(loop)
+            if state is None:
+                state = self._loops[loop] = ({}, {})
+            return state
+
+    def turn_saved(self, room_id: str):
+        counts, tasks = self._state()
+        with self._lock:
+            counts[room_id] = counts.get(room_id, 0) + 1
+            running = tasks.get(room_id)
+            if counts[room_id] < settings.HISTORY_COMPACT_EVERY or (running is not None and not running.done()):
+                return
+            counts[room_id] = 0
+            task = tasks[room_id] = asyncio.create_task(compact_room(room_id))
+
+        def finished(_):
+            with self._lock:
+                if tasks.get(room_id) is task:
+                    del tasks[room_id]
+        task.add_done_callback(finished)
+
+    async def end_room(self, room_id: str, timeout: float = 5.0):
+        """Forget the room; a running compaction gets `timeout` seconds to finish before the loop closes."""
+        counts, tasks = self._state()
+        with self._lock:
+            counts.pop(room_id, None)
+            task = tasks.pop(room_id, None)
+        if task is None or task.done():
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(task), timeout)
+        except asyncio.TimeoutError:
+            task.cancel()  # safe: a rerun skips turns the summary already covers
+
+    def tracked_rooms(self) -> int:
+        with self._lock:
+            return sum(len(counts) for counts, _ in self._loops.values())
+
+compactions = CompactionScheduler()
+
+async def _summarize(previous_summary: str, turns: List[Dict]) -> str:
+    from .rag_tool import MODEL_ERROR_RESPONSE, invoke_general_model  # lazy: rag_tool is the heavier module
+
+    transcript = "\n".join(f"{t['role'].capitalize()}: {t['text']}" for t in turns)
+    system_prompt = """You maintain a running summary of a voice conversation with Sparkout Tech Solutions' assistant.
+Merge the previous summary and the new transcript into at most 6 short sentences.
+Keep names, locations, companies, topics the caller asked about and any commitments made. No preamble."""
+    user_prompt = f"Previous summary:\n{previous_summary or '(none)'}\n\nNew transcript:\n{transcript}\n\nUpdated summary:"
+    summary = await invoke_general_model(system_prompt, user_prompt, max_gen_len=300, temperature=0.0, purpose="summary")
+    if summary == MODEL_ERROR_RESPONSE:
+        raise RuntimeError("summary generation failed")  # keep the turns rather than lose them
+    return summary
+
+async def compact_room(room_id: str, keep: Optional[int] = None):
+    """Roll every turn except the newest `keep` into the room's summary item and delete them."""
+    keep = keep or settings.HISTORY_TURN_LIMIT
     try:
-        table.update_item(
-            Key={"room_id": room_id},
-            UpdateExpression="SET messages = list_append(if_not_exists(messages, :empty), :msg), last_updated = :ts",
-            ExpressionAttributeValues={
-                ":msg": [item],
-                ":empty": [],
-                ":ts": timestamp
-            }
+        await turn_writer.flush()
+        turns = await dynamodb_client.query(
+            settings.DYNAMODB_TURNS_TABLE,
+            "room_id = :r AND begins_with(sk, :p)",
+            {":r": room_id, ":p": TURN_PREFIX},
+            limit=100_000,
         )
-        log.info("Saved turn", role=role, room_id=room_id)
+        old = turns[:-keep] if len(turns) > keep else []
+        if not old:
+            return
+        previous = await _load_summary(room_id) or {}
+        # Turns at or before `through` are already in the summary (a previous run died before deleting them)
+        fresh = [t for t in old if t["sk"] > previous.get("through", "")]
+        if fresh:
+            summary = await _summarize(previous.get("summary", ""), fresh)
+            await dynamodb_client.put_item(settings.DYNAMODB_TURNS_TABLE, {
+                "room_id": room_id,
+                "sk": SUMMARY_SK,
+                "summary": summary,
+                "through": fresh[-1]["sk"],
+                "turn_count": int(previous.get("turn_count", 0)) + len(fresh),
+                "updated_at": _now(),
+            })
+            sessions.set_summary(room_id, f"{SUMMARY_PREFIX}{summary}")
+        keys = [{"room_id": room_id, "sk": t["sk"]} for t in old]
+        for i in range(0, len(keys), 25):
+            unprocessed = await dynamodb_client.batch_write(settings.DYNAMODB_TURNS_TABLE, delete_keys=keys[i:i + 25])
+            if unprocessed:
+                log.error("Compaction left turns undeleted", room_id=room_id, count=len(unprocessed))
+        log.info("Compacted conversation history", room_id=room_id, summarized=len(old), kept=len(turns) - len(old))
     except Exception as e:
-        log.error("Failed to save to DynamoDB", error=str(e))
\ No newline at end of file
+        log.error("Failed to compact history", room_id=room_id, error=str(e))
@@ -0,0 +1,169 @@
+# src/early_turn.py
+"""
+Early start on interim transcripts.
+
+Deepgram sends interim transcripts while the caller is still talking; the
+final one only arrives after the endpointing silence. EarlyTurn watches the
+interims of a room and, once a prefix of at least EARLY_START_MIN_WORDS words
+has stayed the same across two interims, starts intent classification on it
+and, for a RAG question in two-stage mode, the knowledge-base retrieval for its
+query (registered in passage_cache, where retrieve_passages picks it up).
+A longer stable prefix restarts the work, up to EARLY_START_MAX_STARTS times
+per utterance; an interim that revises the prefix cancels it.
+
+When the final transcript arrives, take() reconciles:
+
+  - same words as the prefix: the intent and the retrieval are both used,
+  - the prefix plus more words, and the local router is confident about the
+    full text and agrees with the early intent: the intent is used, the
+    retrieval is cancelled,
+  - anything else: everything is cancelled and the turn runs as usual.
+
+Every final turn records the `early_hidden` stage: seconds of the work it used
+that ran before the final transcript, i.e. latency hidden behind the speech.
+"""
+import asyncio
+import re
+import time
+from typing import Dict, List, Optional
+from . import rag_tool
+from .intent_router import get_router
+from .models.chat_message import ChatHistory
+from .passage_cache import passage_cache, topic_of
+from .utils.env import settings
+from .utils.logger import log
+from .utils.tracing import count, observe
+
+_WORD = re.compile(r"[a-z0-9']+")
+
+def words(text: str) -> List[str]:
+    return _WORD.findall(text.lower())
+
+def common_prefix(a: List[str], b: List[str]) -> List[str]:
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return a[:n]
+
+class EarlyStart:
+    """Work started on one stable prefix."""
+    __slots__ = ("words", "text", "started_at", "intent", "intent_done_at", "query", "retrieval_done_at", "task")
+
+    def __init__(self, prefix: List[str]):
+        self.words = prefix
+        self.text = " ".join(prefix)
+        self.started_at = time.perf_counter()
+        self.intent: Optional[asyncio.Future] = None
+        self.intent_done_at: Optional[float] = None
+        self.query: Optional[str] = None
+        self.retrieval_done_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    async def wait_intent(self) -> Optional[str]:
+        """The early intent, or None if classifying the prefix failed."""
+        try:
+            return await asyncio.shield(self.intent)
+        except Exception:
+            return None
+
+class EarlyTurn:
+    def __init__(self, room_id: str, chat_history: List[Dict], min_words: int = 3, max_starts: int = 3):
+        self.room_id = room_id
+        self.chat_history = chat_history
+        self.min_words = min_words
+        self.max_starts = max_starts
+        self._last: List[str] = []
+        self._start: Optional[EarlyStart] = None
+        self._starts = 0  # in the current utterance
+
+    def on_interim(self, text: str):
+        current = words(text)
+        stable = common_prefix(self._last, current)
+        self._last = current
+        start = self._start
+        if start is not None and current[:len(start.words)] != start.words:
+            self.cancel()  # the caller's words were revised under the running start
+            start = None
+        if len(stable) < self.min_words or self._starts >= self.max_starts:
+            return
+        if start is not None and len(stable) <= len(start.words):
+            return
+        self._begin(stable)
+
+    def _begin(self, prefix: List[str]):
+        self.cancel()
+        start = EarlyStart(prefix)
+        start.intent = asyncio.get_running_loop().create_future()
+        start.task = asyncio.create_task(self._run(start))
+        self._start = start
+        self._starts += 1
+        count("early_start")
+
+    async def _run(self, start: EarlyStart):
+        try:
+            intent = await rag_tool.classify_intent_with_context(start.text, self.chat_history)
+        except Exception as e:
+            start.intent.set_exception(e)
+            start.intent.exception()
+            return
+        start.intent_done_at = time.perf_counter()
+        start.intent.set_result(intent)
+        if intent != "rag" or settings.RAG_MODE != "two_stage":
+            return
+        # The query the turn will build: agent.py and rag_tool each append the user entry before build_kb_query
+        history = ChatHistory(list(self.chat_history) + [{"role": "user", "content": start.text},
+                                                         {"role": "user", "content": start.text, "intent": intent}])
+        query, context = rag_tool.build_kb_query(start.text, history)
+        if context and passage_cache.get(self.room_id, topic_of(query)) is not None:
+            return  # a follow-up that the room's cached passages already answer
+        start.query = query
+        retrieval = asyncio.create_task(rag_tool.kb_retrieve(query))
+        passage_cache.put_prefetched(self.room_id, query, retrieval)
+        try:
+            await retrieval
+        except Exception:
+            return
+        start.retrieval_done_at = time.perf_counter()
+
+    def cancel(self):
+        start, self._start = self._start, None
+        if start is None:
+            return
+        start.task.cancel()
+        if start.query is not None:
+            passage_cache.drop_prefetched(self.room_id)
+
+    def take(self, text: str) -> Optional[EarlyStart]:
+        """Reconcile the running early start with the final transcript; the start to use, if any."""
+        final_at = time.perf_counter()
+        start, self._start = self._start, None
+        self._last, self._starts = [], 0
+        final = words(text)
+        reuse = None
+        if start is None:
+            pass
+        elif final == start.words:
+            reuse = "all"
+        elif final[:len(start.words)] == start.words and start.intent.done() and not start.intent.exception():
+            router = get_router(settings.INTENT_ROUTER_MODEL_PATH, settings.INTENT_ROUTER_THRESHOLD)
+            routed = router.route(text, self.chat_history)
+            # An unconfident (or deferred) route is no evidence the extra words kept the intent
+            if router.is_confident(routed) and routed.intent == start.intent.result():
+                reuse = "intent"
+        if start is not None and reuse != "all":
+            if reuse is None:
+                start.task.cancel()
+            if start.query is not None:
+                passage_cache.drop_prefetched(self.room_id)
+
+        hidden = 0.0
+        if reuse is not None:
+            done = start.retrieval_done_at if reuse == "all" and start.query is not None else start.intent_done_at
+            hidden = min(done or final_at, final_at) - start.started_at
+        observe("early_hidden", hidden)
+        count("early_start_hit" if reuse else "early_start_miss" if start else "early_start_none")
+        log.debug("Early start reconciled", room_id=self.room_id, reuse=reuse, hidden_ms=round(hidden * 1000, 1),
+                  prefix=start.text if start else None)
+        return start if reuse else None
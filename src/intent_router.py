@@ -0,0 +1,161 @@
+# src/intent_router.py
+"""
+Local first-stage intent router.
+
+Regex rules catch the obvious cases (pure greetings, Sparkout mentions); a
+hashed n-gram logistic-regression model scores the rest. Only when neither is
+confident does classify_intent_with_context fall back to the Bedrock classifier.
+"""
+import json
+import math
+import re
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+INTENTS = ["greetings", "rag", "smart_ai_assistant"]
+N_FEATURES = 1 << 18
+
+_GREETING = re.compile(
+    r"^(hi+|hello+|hey+|hiya|howdy|namaste|vanakkam|greetings|good\s+(morning|afternoon|evening|day))"
+    r"(\s+(there|team|everyone|all|buddy|friend|sparkout))?\s*[!.,]*\s*$"
+)
+_SPARKOUT = re.compile(r"\b(spa?r?k\s?out|saprkout|sprakout|sparkot)\b")
+_COMPANY = re.compile(
+    r"\b(your|ur)\s+(company|companys|firm|team|office|offices|branch|branches|clients|services|projects|"
+    r"case stud(y|ies)|founder|ceo|coo|cto|employees|portfolio|location|address)\b"
+    r"|\bcase stud(y|ies)\b|\bwho (founded|owns|runs) (you|your)\b"
+)
+# Short follow-ups that lean on the previous turn ("what about there?") need the LLM's context rule
+_REFERENTIAL = re.compile(r"\b(it|that|this|those|these|there|they|them|he|she|same|above|more|else)\b")
+
+# Seed set used when no trained weights are on disk. Refresh with scripts/eval_intent_router.py --train.
+SEED_EXAMPLES: List[Tuple[str, str]] = [
+    ("hi", "greetings"), ("hello", "greetings"), ("hey there", "greetings"), ("good morning", "greetings"),
+    ("hello how are you", "greetings"), ("hi good evening", "greetings"), ("hey buddy", "greetings"),
+    ("hi there how is it going", "greetings"), ("good afternoon team", "greetings"), ("hello nice to meet you", "greetings"),
+    ("where is your office located", "rag"), ("do you have a branch in bangalore", "rag"),
+    ("who is the coo", "rag"), ("who is the ceo of the company", "rag"), ("tell me about your case studies", "rag"),
+    ("what services do you offer", "rag"), ("what projects have you done", "rag"), ("who are your clients", "rag"),
+    ("what is your office address", "rag"), ("how many employees work at your company", "rag"),
+    ("do you build blockchain solutions for clients", "rag"), ("what technologies does your team use", "rag"),
+    ("can you share a case study on fintech", "rag"), ("who is the lead architect", "rag"),
+    ("when was the company founded", "rag"), ("what industries do you serve", "rag"),
+    ("do you have offices in the usa", "rag"), ("what is your contact number", "rag"),
+    ("which projects were mentioned earlier", "rag"), ("what does your company do", "rag"),
+    ("what is kubernetes", "smart_ai_assistant"), ("how do i design a microservices architecture", "smart_ai_assistant"),
+    ("explain rest vs graphql", "smart_ai_assistant"), ("what is the difference between sql and nosql", "smart_ai_assistant"),
+    ("how does machine learning work", "smart_ai_assistant"), ("what are best practices for api security", "smart_ai_assistant"),
+    ("how should i structure a react project", "smart_ai_assistant"), ("explain event driven architecture", "smart_ai_assistant"),
+    ("what is a vector database", "smart_ai_assistant"), ("how do i scale a web application", "smart_ai_assistant"),
+    ("what is docker used for", "smart_ai_assistant"), ("explain how blockchain consensus works", "smart_ai_assistant"),
+    ("what cloud provider is best for startups", "smart_ai_assistant"), ("how do large language models work", "smart_ai_assistant"),
+    ("what is ci cd", "smart_ai_assistant"), ("how can i improve database performance", "smart_ai_assistant"),
+    ("what is the capital of france", "smart_ai_assistant"), ("tell me a joke", "smart_ai_assistant"),
+]
+
+def _tokens(text: str) -> List[str]:
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+def featurize(text: str) -> Dict[int, float]:
+    """Hashed word uni/bigrams plus char trigrams, L2-normalized."""
+    words = _tokens(text)
+    grams = [f"w:{w}" for w in words] + [f"b:{a}_{b}" for a, b in zip(words, words[1:])]
+    padded = f" {' '.join(words)} "
+    grams += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+    feats: Dict[int, float] = {}
+    for g in grams:
+        idx = zlib.crc32(g.encode()) % N_FEATURES
+        feats[idx] = feats.get(idx, 0.0) + 1.0
+    norm = math.sqrt(sum(v * v for v in feats.values())) or 1.0
+    return {k: v / norm for k, v in feats.items()}
+
+class HashedNgramClassifier:
+    """Multinomial logistic regression over hashed n-grams, trained with plain SGD."""
+
+    def __init__(self, labels: List[str] = INTENTS):
+        self.labels = list(labels)
+        self.weights: List[Dict[int, float]] = [{} for _ in self.labels]
+        self.bias = [0.0] * len(self.labels)
+
+    def _scores(self, feats: Dict[int, float]) -> List[float]:
+        return [b + sum(w.get(i, 0.0) * v for i, v in feats.items()) for w, b in zip(self.weights, self.bias)]
+
+    def predict_proba(self, text: str) -> Dict[str, float]:
+        scores = self._scores(featurize(text))
+        top = max(scores)
+        exp = [math.exp(s - top) for s in scores]
+        total = sum(exp)
+        return {label: e / total for label, e in zip(self.labels, exp)}
+
+    def fit(self, examples: Iterable[Tuple[str, str]], epochs: int = 40, lr: float = 0.5, l2: float = 1e-4):
+        data = [(featurize(text), self.labels.index(label)) for text, label in examples]
+        for _ in range(epochs):
+            for feats, target in data:
+                scores = self._scores(feats)
+                top = max(scores)
+                exp = [math.exp(s - top) for s in scores]
+                total = sum(exp)
+                for k, e in enumerate(exp):
+                    grad = e / total - (1.0 if k == target else 0.0)
+                    w = self.weights[k]
+                    for i, v in feats.items():
+                        w[i] = w.get(i, 0.0) * (1 - lr * l2) - lr * grad * v
+                    self.bias[k] -= lr * grad
+        return self
+
+    def save(self, path: str):
+        payload = {"labels": self.labels, "bias": self.bias,
+                   "weights": [{str(i): round(v, 6) for i, v in w.items() if abs(v) > 1e-6} for w in self.weights]}
+        Path(path).write_text(json.dumps(payload))
+
+    @classmethod
+    def load(cls, path: str) -> "HashedNgramClassifier":
+        payload = json.loads(Path(path).read_text())
+        model = cls(payload["labels"])
+        model.bias = payload["bias"]
+        model.weights = [{int(i): v for i, v in w.items()} for w in payload["weights"]]
+        return model
+
+@dataclass
+class RouteResult:
+    intent: str
+    confidence: float
+    source: str  # "rule", "model" or "defer"
+
+class IntentRouter:
+    def __init__(self, model: HashedNgramClassifier, threshold: float = 0.8):
+        self.model = model
+        self.threshold = threshold
+
+    def route(self, message: str, chat_history: Optional[List[Dict]] = None) -> RouteResult:
+        text = re.sub(r"\s+", " ", message.lower()).strip()
+        if _GREETING.match(text) and len(text.split()) <= 5:
+            return RouteResult("greetings", 0.99, "rule")
+        if _SPARKOUT.search(text) or _COMPANY.search(text):
+            return RouteResult("rag", 0.95, "rule")
+
+        has_previous_intent = any(e.get('intent') for e in (chat_history or [])[-6:])
+        if has_previous_intent and len(text.split()) <= 8 and _REFERENTIAL.search(text):
+            return RouteResult("", 0.0, "defer")
+
+        proba = self.model.predict_proba(text)
+        intent = max(proba, key=proba.get)
+        return RouteResult(intent, proba[intent], "model")
+
+    def is_confident(self, result: RouteResult) -> bool:
+        return result.source != "defer" and result.confidence >= self.threshold
+
+_router: Optional[IntentRouter] = None
+
+def get_router(model_path: Optional[str] = None, threshold: float = 0.8) -> IntentRouter:
+    """Process-wide router; loads trained weights if present, otherwise fits the seed set (~tens of ms)."""
+    global _router
+    if _router is None:
+        if model_path and Path(model_path).exists():
+            model = HashedNgramClassifier.load(model_path)
+        else:
+            model = HashedNgramClassifier().fit(SEED_EXAMPLES)
+        _router = IntentRouter(model, threshold)
+    return _router
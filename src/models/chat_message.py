@@ -0,0 +1,91 @@
+# src/models/chat_message.py
+from typing import Dict, Iterable, Optional
+from ..query_normalizer import QueryFeatures, analyze
+
+class ChatHistory(list):
+    """Chat history ({"role", "content", "intent"} dicts) that annotates turns as they are appended.
+
+    User entries get a "features" key (normalized text + keyword tags), and the
+    newest RAG question of each topic group is indexed, so finding the earlier
+    question a follow-up refers to does not rescan or re-normalize the history.
+    Appends are indexed incrementally; any other mutation triggers a rebuild on
+    the next lookup. Change an entry's intent with set_intent() to keep it indexed.
+
+    With `max_entries`, the oldest turns are dropped as new ones arrive (a
+    leading system summary is kept), so a long call does not grow it without limit.
+    """
+
+    def __init__(self, entries: Iterable[Dict] = (), max_entries: Optional[int] = None):
+        super().__init__()
+        self._latest: Dict[str, int] = {}
+        self._dirty = False
+        self.max_entries = max_entries
+        self.extend(entries)
+
+    def append(self, entry: Dict):
+        super().append(entry)
+        self._index(len(self) - 1, entry)
+        if self.max_entries and len(self) > self.max_entries:
+            start = 1 if self[0].get("role") == "system" else 0
+            del self[start:start + len(self) - self.max_entries]
+
+    def extend(self, entries: Iterable[Dict]):
+        for entry in entries:
+            self.append(entry)
+
+    def _mutator(name):
+        method = getattr(list, name)
+
+        def wrapper(self, *args, **kwargs):
+            self._dirty = True
+            return method(self, *args, **kwargs)
+        wrapper.__name__ = name
+        return wrapper
+
+    insert = _mutator("insert")
+    pop = _mutator("pop")
+    remove = _mutator("remove")
+    clear = _mutator("clear")
+    sort = _mutator("sort")
+    reverse = _mutator("reverse")
+    __setitem__ = _mutator("__setitem__")
+    __delitem__ = _mutator("__delitem__")
+    __iadd__ = _mutator("__iadd__")
+    del _mutator
+
+    def _index(self, position: int, entry: Dict):
+        if entry.get("role") != "user":
+            return
+        features = entry.get("features")
+        if not isinstance(features, QueryFeatures):
+            features = entry["features"] = analyze(entry.get("content", ""))
+        # Only RAG questions of 5+ words with a topic keyword can anchor a follow-up
+        if entry.get("intent") == "rag" and features.word_count >= 5 and features.topic_group:
+            self._latest[features.topic_group] = position
+
+    def _rebuild(self):
+        self._latest = {}
+        for position, entry in enumerate(self):
+            self._index(position, entry)
+        self._dirty = False
+
+    def set_intent(self, entry: Dict, intent: str):
+        """Update the intent of an entry already in the history (e.g. after speculative classification)."""
+        entry["intent"] = intent
+        self._dirty = True
+
+    def related_rag_entry(self, message: QueryFeatures) -> Optional[Dict]:
+        """Newest earlier RAG question whose topic group the message continues, if any."""
+        if self._dirty:
+            self._rebuild()
+        if "case_study" in message.tags:
+            return None  # a new case-study question starts a fresh topic
+        candidates = [self._latest[group] for group in ("location", "case") if group in self._latest and group in message.tags]
+        return self[max(candidates)] if candidates else None
+
+def set_entry_intent(chat_history, entry: Dict, intent: str):
+    """Set an entry's intent whether the history is a ChatHistory or a plain list."""
+    if isinstance(chat_history, ChatHistory):
+        chat_history.set_intent(entry, intent)
+    else:
+        entry["intent"] = intent
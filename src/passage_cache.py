@@ -0,0 +1,137 @@
+# src/passage_cache.py
+"""
+Per-room passage cache and local reranker for the two-stage RAG mode.
+
+Stage one (bedrock retrieve) results are kept per room and topic so related
+follow-ups reuse them; stage two trims them to a compact, query-ranked context.
+"""
+import asyncio
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "do", "does", "did", "you", "your", "we", "our", "i", "me",
+    "of", "in", "on", "at", "to", "for", "and", "or", "what", "who", "where", "which", "how", "when", "tell", "about",
+    "can", "could", "please", "have", "has", "it", "that", "this", "there", "with", "sparkout", "tech", "solutions",
+}
+TOPIC_KEYWORDS = {
+    "location": ["branch", "office", "location", "address"],
+    "portfolio": ["case study", "project", "client", "service"],
+}
+
+@dataclass
+class Passage:
+    text: str
+    score: float = 0.0
+    source: str = ""
+
+def topic_of(query: str) -> str:
+    """Coarse topic used as the cache key; mirrors the related-keyword groups in build_kb_query."""
+    lower = query.lower()
+    for topic, keywords in TOPIC_KEYWORDS.items():
+        if any(kw in lower for kw in keywords):
+            return topic
+    return "general"
+
+def query_key(query: str) -> str:
+    """Case- and punctuation-insensitive form of a KB query."""
+    return " ".join(re.findall(r"[a-z0-9']+", query.lower()))
+
+def _terms(text: str) -> List[str]:
+    return [t for t in re.findall(r"[a-z0-9]+", text.lower()) if t not in STOPWORDS and len(t) > 1]
+
+def rerank(query: str, passages: List[Passage], top_k: int = 5, max_chars: int = 3000) -> List[Passage]:
+    """Order passages by query-term overlap (BM25-style saturation) blended with the KB score, within a char budget."""
+    terms = set(_terms(query))
+    if not passages:
+        return []
+    doc_terms = [_terms(p.text) for p in passages]
+    df = {t: sum(1 for d in doc_terms if t in d) for t in terms}
+    n = len(passages)
+
+    def lexical(words: List[str]) -> float:
+        if not words:
+            return 0.0
+        score = 0.0
+        for t in terms:
+            tf = words.count(t)
+            if tf:
+                idf = math.log(1 + (n - df[t] + 0.5) / (df[t] + 0.5))
+                score += idf * tf * 2.2 / (tf + 1.2 * (0.25 + 0.75 * len(words) / 120))
+        return score
+
+    ranked = sorted(zip(passages, doc_terms), key=lambda pw: lexical(pw[1]) + 2.0 * pw[0].score, reverse=True)
+    selected, used = [], 0
+    for passage, _ in ranked:
+        if len(selected) >= top_k:
+            break
+        if used + len(passage.text) > max_chars:
+            if selected:
+                continue
+            passage = Passage(passage.text[:max_chars], passage.score, passage.source)
+        selected.append(passage)
+        used += len(passage.text)
+    return selected
+
+class PassageCache:
+    def __init__(self, max_rooms: int = 1000, ttl_seconds: float = 900):
+        self.max_rooms = max_rooms
+        self.ttl_seconds = ttl_seconds
+        self._rooms: "OrderedDict[str, Dict[str, tuple]]" = OrderedDict()
+        self._lock = threading.Lock()  # shared by the rooms (threads) of a worker process
+        self._prefetched: Dict[str, Tuple[str, asyncio.Task]] = {}  # room -> (query key, early retrieval)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, room_id: str, topic: str) -> Optional[List[Passage]]:
+        with self._lock:
+            topics = self._rooms.get(room_id)
+            cached = topics.get(topic) if topics else None
+            if cached is None or time.monotonic() - cached[0] > self.ttl_seconds:
+                self.misses += 1
+                return None
+            self._rooms.move_to_end(room_id)
+            self.hits += 1
+            return cached[1]
+
+    def put(self, room_id: str, topic: str, passages: List[Passage]):
+        with self._lock:
+            self._rooms.setdefault(room_id, {})[topic] = (time.monotonic(), passages)
+            self._rooms.move_to_end(room_id)
+            while len(self._rooms) > self.max_rooms:
+                self._rooms.popitem(last=False)
+
+    def drop_room(self, room_id: str):
+        with self._lock:
+            self._rooms.pop(room_id, None)
+        self.drop_prefetched(room_id)
+
+    def put_prefetched(self, room_id: str, query: str, task: asyncio.Task):
+        """Register a retrieval started before the turn (src/early_turn.py); replaces the room's previous one."""
+        with self._lock:
+            previous = self._prefetched.get(room_id)
+            self._prefetched[room_id] = (query_key(query), task)
+        if previous is not None and previous[1] is not task:
+            previous[1].cancel()
+
+    def take_prefetched(self, room_id: str, query: str) -> Optional[asyncio.Task]:
+        """The room's early retrieval if it was for `query`; it is handed out once."""
+        with self._lock:
+            entry = self._prefetched.get(room_id)
+            if entry is None or entry[0] != query_key(query):
+                return None
+            del self._prefetched[room_id]
+            return entry[1]
+
+    def drop_prefetched(self, room_id: str):
+        with self._lock:
+            entry = self._prefetched.pop(room_id, None)
+        if entry is not None:
+            entry[1].cancel()
+
+passage_cache = PassageCache()
@@ -0,0 +1,144 @@
+# src/prompt_builder.py
+"""
+Prompt assembly for the Llama 3 calls.
+
+Static segments (each system prompt wrapped in the Llama 3 chat framing) are
+built once and cached with their token counts; per-turn parts (history,
+retrieved passages) are added within explicit token budgets so a prompt plus
+its output cap always fits LLM_CONTEXT_TOKENS. Output caps are per intent.
+
+Token counts use the Llama 3 tokenizer when PROMPT_TOKENIZER_PATH points at a
+tokenizer.json and the `tokenizers` package is installed; otherwise a local
+estimate that slightly over-counts English text.
+"""
+import json
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, Dict, List, Sequence, Tuple
+from .utils.env import settings
+from .utils.logger import log
+from .utils.tracing import count
+
+try:
+    from tokenizers import Tokenizer
+except ImportError:  # optional: exact counts
+    Tokenizer = None
+
+_EOT = "<|eot_id|>"
+# begin_of_text + three headers (start, role, end, "\n\n") + two eot markers
+FRAMING_TOKENS = 1 + 3 * 4 + 2
+
+# Roughly BPE granularity: short words are one token, longer ones split every few characters
+_PIECE = re.compile(r"\w{1,4}|[^\w\s]")
+
+def _header(role: str) -> str:
+    return f"<|start_header_id|>{role}<|end_header_id|>\n\n"
+
+_ASSISTANT_SUFFIX = f"{_EOT}{_header('assistant')}"
+
+def _load_tokenizer():
+    if Tokenizer is None or not settings.PROMPT_TOKENIZER_PATH:
+        return None
+    try:
+        return Tokenizer.from_file(settings.PROMPT_TOKENIZER_PATH)
+    except Exception as e:
+        log.warning("Could not load tokenizer, estimating token counts", path=settings.PROMPT_TOKENIZER_PATH, error=str(e))
+        return None
+
+_tokenizer = _load_tokenizer()
+
+def count_tokens(text: str) -> int:
+    """Uncached: per-turn text rarely repeats, so only the static segments below keep their counts."""
+    if _tokenizer is not None:
+        return len(_tokenizer.encode(text, add_special_tokens=False).ids)
+    return len(_PIECE.findall(text))
+
+def output_cap(kind: str) -> int:
+    """max_gen_len for a call purpose: 'intent', 'greetings', 'rag' or 'smart_ai_assistant'."""
+    return {
+        "intent": settings.MAX_TOKENS_INTENT,
+        "greetings": settings.MAX_TOKENS_GREETING,
+        "rag": settings.MAX_TOKENS_RAG,
+        "smart_ai_assistant": settings.MAX_TOKENS_SMART,
+    }.get(kind, settings.MAX_TOKENS_SMART)
+
+@dataclass(frozen=True)
+class Segment:
+    text: str
+    tokens: int
+
+@lru_cache(maxsize=64)
+def system_segment(system_prompt: str) -> Segment:
+    """Cached '<begin><system>…<eot><user>' prefix; identical bytes every call for the same system prompt."""
+    return Segment(f"<|begin_of_text|>{_header('system')}{system_prompt}{_EOT}{_header('user')}", count_tokens(system_prompt))
+
+@lru_cache(maxsize=64)
+def static_tokens(template: str) -> int:
+    """Token count of a static template (placeholders included), computed once."""
+    return count_tokens(template)
+
+def llama3_body(system_prompt: str, user_prompt: str, max_gen_len: int, temperature: float) -> Tuple[str, int]:
+    """Request body for a Llama 3 InvokeModel call and its estimated prompt tokens.
+
+    max_gen_len is clamped so prompt + output stay inside the context window.
+    """
+    prefix = system_segment(system_prompt)
+    prompt_tokens = prefix.tokens + count_tokens(user_prompt) + FRAMING_TOKENS
+    room = settings.LLM_CONTEXT_TOKENS - prompt_tokens
+    if room < max_gen_len:
+        log.warning("Prompt near context limit, lowering output cap", prompt_tokens=prompt_tokens, max_gen_len=max_gen_len)
+        max_gen_len = max(room, 16)
+    prompt = "".join((prefix.text, user_prompt, _ASSISTANT_SUFFIX))
+    return json.dumps({"prompt": prompt, "max_gen_len": max_gen_len, "temperature": temperature, "top_p": 0.9}), prompt_tokens
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """Cut `text` at a word boundary so it fits `max_tokens` (kept as-is when it already does)."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    while text and count_tokens(text + " …") > max_tokens:
+        ratio = max_tokens / count_tokens(text + " …")
+        cut = text[:int(len(text) * ratio * 0.95)]
+        text = cut.rsplit(" ", 1)[0] if " " in cut else cut
+    return text + " …"
+
+def history_block(entries: Sequence[Dict], budget: int, format_entry: Callable[[Dict], str]) -> str:
+    """Format entries oldest→newest, keeping the newest ones that fit in `budget` tokens.
+
+    The first entry that does not fit is shortened into the remaining budget
+    instead of dropped, so one long answer cannot blank out the whole history.
+    """
+    lines: List[str] = []
+    used = 0
+    for entry in reversed(entries):
+        line = format_entry(entry)
+        tokens = count_tokens(line)
+        if used + tokens > budget:
+            if budget - used >= 32:
+                lines.append(truncate_tokens(line.rstrip("\n"), budget - used - 1) + "\n")
+            break
+        lines.append(line)
+        used += tokens
+    return "".join(reversed(lines))
+
+def fit_texts(texts: Sequence[str], budget: int) -> int:
+    """How many of `texts` (in order) fit in `budget` tokens."""
+    used = 0
+    for i, text in enumerate(texts):
+        used += count_tokens(text)
+        if used > budget:
+            return i
+    return len(texts)
+
+def record_usage(purpose: str, result: Dict, estimated_prompt_tokens: int, max_gen_len: int):
+    """Log input/output tokens of a Llama call (the response, or the merged stream chunks) and count them."""
+    metrics = result.get("amazon-bedrock-invocationMetrics") or {}
+    input_tokens = result.get("prompt_token_count") or metrics.get("inputTokenCount")
+    output_tokens = result.get("generation_token_count") or metrics.get("outputTokenCount")
+    log.info("LLM usage", purpose=purpose, input_tokens=input_tokens, output_tokens=output_tokens,
+             estimated_input_tokens=estimated_prompt_tokens, max_gen_len=max_gen_len, stop_reason=result.get("stop_reason"))
+    count("llm_input_tokens", input_tokens or estimated_prompt_tokens)
+    if output_tokens:
+        count("llm_output_tokens", output_tokens)
+    if result.get("stop_reason") == "length":
+        count("llm_output_truncated")
@@ -0,0 +1,81 @@
+# src/query_normalizer.py
+"""
+Single-pass query normalization and keyword features for the KB query builder.
+
+Everything is compiled once at import: one regex alternation covers the typo
+corrections, the vague-word and topic-keyword vocabulary and the punctuation /
+whitespace clean-up, all matched on word boundaries. So 'branch' is no longer
+rewritten by the 'branc' correction, and 'it' no longer matches inside 'with'.
+"""
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, FrozenSet
+
+CORRECTIONS = {
+    'saprkout': 'sparkout', 'sprakout': 'sparkout', 'sparkot': 'sparkout', 'menctioned': 'mentioned',
+    'mentionned': 'mentioned', 'studys': 'studies', 'studie': 'study', 'servies': 'services', 'serrvice': 'service',
+    'projet': 'project', 'projets': 'projects', 'branc': 'branch', 'loction': 'location', 'adress': 'address',
+}
+
+VAGUE_WORDS = ['where', 'location', 'address', 'there', 'here', 'you', 'u', 'exact', 'which', 'that', 'this', 'it', 'they', 'what', 'how']
+
+# Topic groups used to decide whether a follow-up continues an earlier RAG question.
+# An earlier question belongs to the location group when it names a place ("anchor").
+LOCATION_ANCHORS = ['branch', 'branches', 'office', 'offices', 'location', 'locations']
+LOCATION_KEYWORDS = LOCATION_ANCHORS + ['address', 'addresses', 'clients']
+CASE_KEYWORDS = ['case study', 'case studies', 'project', 'projects', 'client', 'clients', 'service', 'services']
+
+def _term_tags() -> Dict[str, FrozenSet[str]]:
+    tags: Dict[str, set] = {}
+    for tag, words in (("vague", VAGUE_WORDS), ("anchor", LOCATION_ANCHORS),
+                       ("location", LOCATION_KEYWORDS), ("case", CASE_KEYWORDS),
+                       ("case_study", ['case study', 'case studies'])):
+        for word in words:
+            tags.setdefault(word, set()).add(tag)
+    return {word: frozenset(t) for word, t in tags.items()}
+
+_TAGS = _term_tags()
+_TERMS = sorted(set(CORRECTIONS) | set(_TAGS), key=len, reverse=True)  # longest first: 'projets' before 'projet'
+_TOKEN = re.compile(r"\b(?P<term>%s)\b|(?P<dots>\.{2,})|(?P<marks>\?{2,})|(?P<space>\s+)" % "|".join(map(re.escape, _TERMS)))
+
+@dataclass(frozen=True)
+class QueryFeatures:
+    normalized: str
+    word_count: int
+    tags: FrozenSet[str]
+
+    @property
+    def is_vague(self) -> bool:
+        return "vague" in self.tags
+
+    @property
+    def mentions_sparkout(self) -> bool:
+        return "sparkout" in self.normalized
+
+    @property
+    def topic_group(self) -> str:
+        """Group an earlier RAG question belongs to: 'location', 'case' or '' (cannot anchor a follow-up)."""
+        if "anchor" in self.tags:
+            return "location"
+        return "case" if "case" in self.tags else ""
+
+@lru_cache(maxsize=2048)
+def analyze(query: str) -> QueryFeatures:
+    """Normalize `query` and collect its keyword tags in one regex pass."""
+    tags = set()
+
+    def replace(match):
+        term = match.group("term")
+        if term is not None:
+            term = CORRECTIONS.get(term, term)
+            tags.update(_TAGS.get(term, ()))
+            return term
+        if match.group("dots"):
+            return "."
+        if match.group("marks"):
+            return "?"
+        return " "
+
+    normalized = _TOKEN.sub(replace, query.lower()).strip()
+    return QueryFeatures(normalized, len(normalized.split()), frozenset(tags))
@@ -1,20 +1,37 @@
 # src/rag_tool.py
-import os
-import json
 import re
-import boto3
-import traceback
-from botocore.exceptions import ClientError
-from typing import List, Dict
+import time
+import asyncio
+import contextvars
+from botocore.exceptions import BotoCoreError, ClientError
+from typing import AsyncIterator, List, Dict, Optional
+from . import speculation
+from .answer_cache import answer_cache
+from .intent_router import get_router
+from .models.chat_message import ChatHistory, set_entry_intent
+from .passage_cache import Passage, passage_cache, rerank, topic_of
+from .prompt_builder import (FRAMING_TOKENS, count_tokens, fit_texts, history_block, llama3_body, output_cap,
+                             record_usage, static_tokens, system_segment)
+from .query_normalizer import analyze
+from .response_bank import MODEL_ERROR_RESPONSE, NO_INFO_RESPONSE, RAG_ERROR_RESPONSE, response_bank
+from .services import bedrock_client
 from .utils.env import settings
 from .utils.logger import log
+from .utils.tracing import count, observe, set_turn_context, span
+from .utils.text_stream import scrub_stream, sentence_chunks
 
-# ================== YOUR EXACT BOTO3 CLIENTS ==================
-bedrock = boto3.client('bedrock-runtime', region_name=settings.AWS_REGION)
-bedrock_agent = boto3.client('bedrock-agent-runtime', region_name=settings.AWS_REGION)
+# ================== BEDROCK (async, via the shared AWS I/O pool) ==================
 kb_id = settings.BEDROCK_KB_ID
 MODEL_ID = settings.BEDROCK_MODEL_ID
 
+# Set to a dict by scripts/eval_rag.py: the current task's RAG call records its query and retrieval stats there
+retrieval_trace: contextvars.ContextVar[Optional[Dict]] = contextvars.ContextVar("retrieval_trace", default=None)
+
+def _trace(**fields):
+    trace = retrieval_trace.get()
+    if trace is not None:
+        trace.update(fields)
+
 # bedrock = boto3.client('bedrock-runtime', region_name=os.environ['REGION'])
 # bedrock_agent = boto3.client('bedrock-agent-runtime', region_name=os.environ['REGION'])
 # dynamodb = boto3.resource('dynamodb', region_name=os.environ['REGION'])
@@ -24,56 +41,54 @@ MODEL_ID = settings.BEDROCK_MODEL_ID
 # max_history = 10
 
 # ================== YOUR FULL UNCHANGED LOGIC ==================
-def invoke_general_model(system_prompt, user_prompt, max_gen_len=512, temperature=0.0):
-    formatted_prompt = f"<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n\n{system_prompt}<|eot_id|><|start_header_id|>user<|end_header_id|>\n\n{user_prompt}<|eot_id|><|start_header_id|>assistant<|end_header_id|>\n\n"
-    body = json.dumps({"prompt": formatted_prompt, "max_gen_len": max_gen_len, "temperature": temperature, "top_p": 0.9})
+META_PHRASES = ["according to the retrieved information","according to the retrieved documents","according to the information","according to the documents","according to the search results","based on the search results","based on the retrieved information","based on the retrieved documents","based on the retrieved","based on the documents","based on the information","the retrieved documents mention","the retrieved information shows","the retrieved documents show","the documents mention","the documents show","the search results show","the information shows","i found that","i found information","it is mentioned that","it appears that","from the documents","from the retrieved information","from the search results","as per the documents","as mentioned in","so refer to","please refer to","you can refer to","refer to the"]
+
+async def invoke_general_model(system_prompt, user_prompt, max_gen_len=512, temperature=0.0, purpose="general"):
+    body, prompt_tokens = llama3_body(system_prompt, user_prompt, max_gen_len, temperature)
     try:
-        response = bedrock.invoke_model(modelId=MODEL_ID, contentType='application/json', accept='application/json', body=body)
-        result = json.loads(response['body'].read())
+        with span("llm", max_gen_len=max_gen_len, purpose=purpose):
+            result = await bedrock_client.invoke_model(purpose, prompt_tokens + max_gen_len, modelId=MODEL_ID,
+                                                       contentType='application/json', accept='application/json', body=body)
+        record_usage(purpose, result, prompt_tokens, max_gen_len)
         return result['generation'].strip()
-    except ClientError as e:
-        log.error(f"[ERROR] InvokeModel failed: {str(e)}")
-        return "I'm having trouble thinking right now."
+    except (ClientError, BotoCoreError) as e:
+        log.error("InvokeModel failed", error=str(e))
+        count("llm_error")
+        return MODEL_ERROR_RESPONSE
+
+async def stream_general_model(system_prompt, user_prompt, max_gen_len=512, temperature=0.0, purpose="general") -> AsyncIterator[str]:
+    """Token-level streaming counterpart of invoke_general_model."""
+    body, prompt_tokens = llama3_body(system_prompt, user_prompt, max_gen_len, temperature)
+    started = False
+    usage = {}
+    t0 = time.perf_counter()
+    try:
+        async for chunk in bedrock_client.invoke_model_stream(purpose, prompt_tokens + max_gen_len, modelId=MODEL_ID,
+                                                              contentType='application/json', accept='application/json', body=body):
+            # Token counts arrive spread over the chunks (prompt count first, final totals last)
+            usage.update((k, v) for k, v in chunk.items() if k != 'generation' and v is not None)
+            text = chunk.get('generation', '')
+            if not started:
+                text = text.lstrip()
+            if text:
+                if not started:
+                    observe("llm_first_token", time.perf_counter() - t0, max_gen_len=max_gen_len)
+                started = True
+                yield text
+        observe("llm_stream", time.perf_counter() - t0, max_gen_len=max_gen_len)
+        record_usage(purpose, usage, prompt_tokens, max_gen_len)
+    except (ClientError, BotoCoreError) as e:
+        log.error("InvokeModelWithResponseStream failed", error=str(e))
+        count("llm_error")
+        if not started:
+            yield MODEL_ERROR_RESPONSE
 
 def normalize_query(query):
-    print(f"[NORMALIZE] Original query: '{query}'")
-    corrections = {'saprkout': 'sparkout','sprakout': 'sparkout','sparkot': 'sparkout','menctioned': 'mentioned','mentionned': 'mentioned','studys': 'studies','studie': 'study','servies': 'services','serrvice': 'service','projet': 'project','projets': 'projects','branc': 'branch','loction': 'location','adress': 'address'}
-    normalized = query.lower()
-    for wrong, correct in corrections.items():
-        if wrong in normalized:
-            normalized = normalized.replace(wrong, correct)
-            print(f"[NORMALIZE] Fixed: '{wrong}' → '{correct}'")
-    normalized = re.sub(r'\.{2,}', '.', normalized)
-    normalized = re.sub(r'\?+', '?', normalized)
-    normalized = re.sub(r'\s+', ' ', normalized).strip()
-    print(f"[NORMALIZE] Normalized query: '{normalized}'")
+    normalized = analyze(query).normalized
+    log.debug("Normalized query", original=query, normalized=normalized)
     return normalized
 
-def classify_intent_with_context(message, chat_history):
-    print(f"\n{'='*80}")
-    print(f"[STEP 1] CONTEXT-AWARE INTENT CLASSIFICATION")
-    print(f"{'='*80}")
-    print(f"[STEP 1] Current message: '{message}'")
-    print(f"[STEP 1] Message length: {len(message)} characters")
-    print(f"[STEP 1] Chat history entries: {len(chat_history)}")
-    
-    context_prompt = ""
-    if len(chat_history) >= 2:
-        recent_history = chat_history[-6:]
-        print(f"[STEP 1] Building context from last {len(recent_history)} messages...")
-        context_prompt = "=== RECENT CONVERSATION ===\n"
-        for idx, entry in enumerate(recent_history, 1):
-            role = entry.get('role', 'unknown').capitalize()
-            content = entry.get('content', '')
-            intent_tag = f" [Previous Intent: {entry.get('intent', 'unknown')}]" if role == 'User' and 'intent' in entry else ""
-            context_prompt += f"{role}{intent_tag}: {content}\n"
-            print(f"[STEP 1]   Message {idx}: {role} - '{content[:50]}...'")
-        context_prompt += "===========================\n\n"
-        print(f"[STEP 1] Context built successfully")
-    else:
-        print(f"[STEP 1] No previous conversation")
-
-    intent_system_prompt = """You are an expert intent classifier for Sparkout Tech Solutions voice agent.
+INTENT_SYSTEM_PROMPT = """You are an expert intent classifier for Sparkout Tech Solutions voice agent.
 
 CLASSIFICATION RULES:
 
@@ -104,14 +119,41 @@ OUTPUT FORMAT:
 Reply with EXACTLY ONE WORD ONLY: greetings OR rag OR smart_ai_assistant
 No explanations, no punctuation."""
 
+def _intent_history_line(entry):
+    role = entry.get('role', 'unknown').capitalize()
+    intent_tag = f" [Previous Intent: {entry.get('intent', 'unknown')}]" if role == 'User' and 'intent' in entry else ""
+    return f"{role}{intent_tag}: {entry.get('content', '')}\n"
+
+async def classify_intent_with_context(message, chat_history):
+    with span("intent") as s:
+        intent, source = await _classify_intent(message, chat_history)
+        s.set(intent=intent, source=source)
+    return intent
+
+async def _classify_intent(message, chat_history):
+    log.debug("Classifying intent", message=message, history=len(chat_history))
+    
+    if settings.INTENT_ROUTER_ENABLED:
+        router = get_router(settings.INTENT_ROUTER_MODEL_PATH, settings.INTENT_ROUTER_THRESHOLD)
+        routed = router.route(message, chat_history)
+        if router.is_confident(routed):
+            log.debug("Local router intent", intent=routed.intent, source=routed.source, confidence=round(routed.confidence, 2))
+            return routed.intent, routed.source
+        log.debug("Local router unsure, asking LLM", source=routed.source, confidence=round(routed.confidence, 2))
+    
+    context_prompt = ""
+    if len(chat_history) >= 2:
+        recent = history_block(chat_history[-6:], settings.PROMPT_HISTORY_TOKENS, _intent_history_line)
+        if recent:
+            context_prompt = f"=== RECENT CONVERSATION ===\n{recent}===========================\n\n"
+
     intent_user_prompt = f"""{context_prompt}CURRENT MESSAGE: {message}
 
 Based on the conversation history above (if any) and the current message, classify the intent.
 
 Intent (one word only):"""
     
-    print(f"[STEP 1] Calling LLM for intent classification...")
-    intent_output = invoke_general_model(intent_system_prompt, intent_user_prompt, max_gen_len=50, temperature=0.0)
+    intent_output = await invoke_general_model(INTENT_SYSTEM_PROMPT, intent_user_prompt, max_gen_len=output_cap("intent"), temperature=0.0, purpose="intent")
     
     intent = intent_output.strip().lower()
     intent = re.sub(r'^(intent:|output:|label:|classification:|answer:)\s*', '', intent).strip()
@@ -119,96 +161,68 @@ Intent (one word only):"""
     intent = intent.split()[0] if intent else "smart_ai_assistant"
     intent = intent.replace(' ', '_').replace('-', '_')
     
-    print(f"[STEP 1] LLM raw output: '{intent_output}'")
-    print(f"[STEP 1] Parsed intent: '{intent}'")
+    log.debug("LLM intent output", raw=intent_output, parsed=intent)
     
     valid_intents = ["greetings", "rag", "smart_ai_assistant"]
     if intent not in valid_intents:
-        print(f"[STEP 1] WARNING: Invalid intent '{intent}', defaulting to 'smart_ai_assistant'")
+        log.warning("Invalid intent, defaulting to smart_ai_assistant", intent=intent)
         intent = "smart_ai_assistant"
     
-    print(f"[STEP 1] FINAL INTENT: '{intent}'")
-    print(f"{'='*80}\n")
-    return intent
+    return intent, "llm"
 
-def handle_greeting_intent(message):
-    print(f"\n{'='*80}")
-    print(f"[STEP 2] HANDLING GREETING INTENT")
-    print(f"{'='*80}")
-    greeting_system_prompt = """You are a friendly assistant at Sparkout Tech Solutions.
+GREETING_SYSTEM_PROMPT = """You are a friendly assistant at Sparkout Tech Solutions.
 Respond warmly to greetings in 2-3 sentences.
 Mention that you can help with information about Sparkout's services, projects, or general technical questions."""
-    greeting_user_prompt = f"User said: '{message}'\n\nReply warmly and offer help:"
-    response_text = invoke_general_model(greeting_system_prompt, greeting_user_prompt, max_gen_len=200, temperature=0.3)
-    print(f"[STEP 2] Greeting response: '{response_text}'")
-    print(f"{'='*80}\n")
+
+async def handle_greeting_intent(message):
+    banked = response_bank.reply_for_greeting(message)
+    if banked is not None:
+        count("response_bank_hit")
+        return banked
+    with span("handler", intent="greetings"):
+        greeting_user_prompt = f"User said: '{message}'\n\nReply warmly and offer help:"
+        response_text = await invoke_general_model(GREETING_SYSTEM_PROMPT, greeting_user_prompt, max_gen_len=output_cap("greetings"), temperature=0.3, purpose="greetings")
+    log.debug("Greeting response", response=response_text)
     return response_text
 
-def handle_rag_intent(message, chat_history):
-    print(f"\n{'='*80}")
-    print(f"[STEP 3] HANDLING RAG INTENT (KNOWLEDGE BASE)")
-    print(f"{'='*80}")
-    print(f"[STEP 3] Original query: '{message}'")
-    
-    message_cleaned = normalize_query(message)
+def _context_line(entry):
+    return f"{entry.get('role', '').capitalize()}: {entry.get('content', '')}\n"
+
+def build_kb_query(message, chat_history):
+    """Normalize/enhance the question against chat history.
+
+    Returns (enhanced_query, conversation_context); the context is non-empty only
+    for follow-ups related to an earlier RAG question.
+    """
+    features = analyze(message)
+    message_cleaned = features.normalized
     enhanced_query = message_cleaned
+    should_enhance = features.word_count <= 10 or features.is_vague
     
-    vague_indicators = ['where', 'location', 'address', 'there', 'here', 'you', 'u', 'exact', 'which', 'that', 'this', 'it', 'they', 'what', 'how']
-    message_lower = message_cleaned.lower()
-    has_vague_word = any(word in message_lower for word in vague_indicators)
-    should_enhance = len(message_cleaned.split()) <= 10 or has_vague_word
-    
-    is_related = False
     previous_rag_message = ""
     if len(chat_history) >= 2:
-        for i in range(len(chat_history) - 1, -1, -1):
-            entry = chat_history[i]
-            if entry.get('role') == 'user' and entry.get('intent') == 'rag':
-                previous_message = entry.get('content', '')
-                previous_cleaned = normalize_query(previous_message)
-                if 'case study' in message_lower:
-                    break
-                if len(previous_cleaned.split()) < 5:
-                    continue
-                related_keywords = ['branch', 'office', 'location', 'address','clients'] if any(kw in previous_cleaned for kw in ['branch', 'office', 'location']) else ['case study', 'project', 'client', 'service']
-                is_related = any(kw in message_lower for kw in related_keywords) and any(kw in previous_cleaned for kw in related_keywords)
-                if is_related:
-                    previous_rag_message = previous_cleaned
-                    break
+        history = chat_history if isinstance(chat_history, ChatHistory) else ChatHistory(chat_history)
+        previous = history.related_rag_entry(features)
+        if previous is not None:
+            previous_rag_message = previous["features"].normalized
+    is_related = bool(previous_rag_message)
     
-    if should_enhance and is_related and previous_rag_message:
+    if should_enhance and is_related:
         enhanced_query = f"{previous_rag_message} {message_cleaned}"
-    elif should_enhance and 'sparkout' not in message_lower:
+    elif should_enhance and not features.mentions_sparkout:
         enhanced_query = f"Sparkout Tech Solutions {message_cleaned}"
-    elif 'sparkout' not in message_lower and len(message_cleaned.split()) < 8:
+    elif not features.mentions_sparkout and features.word_count < 8:
         enhanced_query = f"Sparkout {message_cleaned}"
     
     conversation_context = ""
-    if is_related and len(chat_history) >= 2:
-        recent_history = chat_history[-2:]
-        conversation_context = "Previous conversation:\n"
-        for entry in recent_history:
-            role = entry.get('role', '').capitalize()
-            content = entry.get('content', '')
-            conversation_context += f"{role}: {content}\n"
-        conversation_context += f"\nCurrent question: {message}\n\n"
+    if is_related:
+        recent = history_block(chat_history[-2:], settings.PROMPT_HISTORY_TOKENS, _context_line)
+        conversation_context = f"Previous conversation:\n{recent}\nCurrent question: {message}\n\n"
     
-    print(f"[STEP 3] Final KB query: '{enhanced_query}'")
-    
-    rag_model_arn = f"arn:aws:bedrock:{settings.AWS_REGION}::foundation-model/{MODEL_ID}"
-    
-    try:
-        bedrock_input = {
-            "input": {"text": enhanced_query},
-            "retrieveAndGenerateConfiguration": {
-                "type": "KNOWLEDGE_BASE",
-                "knowledgeBaseConfiguration": {
-                    "knowledgeBaseId": kb_id,
-                    "modelArn": rag_model_arn,
-                    "retrievalConfiguration": {"vectorSearchConfiguration": {"numberOfResults": 20, "overrideSearchType": "SEMANTIC"}},
-                    "generationConfiguration": {
-                        "promptTemplate": {
-                            "textPromptTemplate": f'''{conversation_context}You are a knowledgeable representative of Sparkout Tech Solutions.
+    log.debug("Final KB query", query=enhanced_query, related=is_related)
+    return enhanced_query, conversation_context
+
+RAG_PROMPT_TEMPLATE = '''You are a knowledgeable representative of Sparkout Tech Solutions.
 
 READ THE INFORMATION BELOW CAREFULLY. If it contains the answer, YOU MUST USE IT.
 
@@ -249,45 +263,144 @@ $search_results$
 USER QUESTION: $query$
 
 YOUR ANSWER (Use the retrieved information above):'''
-                        },
-                        "inferenceConfig": {"textInferenceConfig": {"temperature": 0.1, "topP": 0.9, "maxTokens": 1500}}
-                    }
+
+def build_rag_request(enhanced_query, conversation_context=""):
+    rag_model_arn = f"arn:aws:bedrock:{settings.AWS_REGION}::foundation-model/{MODEL_ID}"
+    return {
+        "input": {"text": enhanced_query},
+        "retrieveAndGenerateConfiguration": {
+            "type": "KNOWLEDGE_BASE",
+            "knowledgeBaseConfiguration": {
+                "knowledgeBaseId": kb_id,
+                "modelArn": rag_model_arn,
+                "retrievalConfiguration": {"vectorSearchConfiguration": {"numberOfResults": 20, "overrideSearchType": "SEMANTIC"}},
+                "generationConfiguration": {
+                    "promptTemplate": {
+                        "textPromptTemplate": conversation_context + RAG_PROMPT_TEMPLATE
+                    },
+                    "inferenceConfig": {"textInferenceConfig": {"temperature": 0.1, "topP": 0.9, "maxTokens": output_cap("rag")}}
                 }
             }
         }
+    }
+
+RAG_SYSTEM_PROMPT = "You are a knowledgeable representative of Sparkout Tech Solutions. Answer in 2-4 conversational sentences."
+
+async def retrieve_passages(enhanced_query, is_followup, room_id=None):
+    """Stage one of the two-stage mode.
+
+    Uses the retrieval src/early_turn.py started for this exact query while the
+    caller was still speaking, else (for related follow-ups) the room's cached
+    passages for the topic, else the knowledge base.
+    """
+    topic = topic_of(enhanced_query)
+    prefetched = passage_cache.take_prefetched(room_id, enhanced_query) if room_id else None
+    if prefetched is not None:
+        try:
+            passages = await prefetched
+            count("early_retrieval_used")
+            passage_cache.put(room_id, topic, passages)
+            return passages
+        except Exception as e:
+            log.warning("Early retrieval failed, retrieving again", error=str(e))
+    if is_followup and room_id:
+        cached = passage_cache.get(room_id, topic)
+        if cached is not None:
+            log.debug("Reusing cached passages", topic=topic, count=len(cached))
+            return cached
+    passages = await kb_retrieve(enhanced_query)
+    if room_id:
+        passage_cache.put(room_id, topic, passages)
+    return passages
+
+async def kb_retrieve(enhanced_query) -> List[Passage]:
+    with span("kb", mode="retrieve"):
+        response = await bedrock_client.retrieve(
+            knowledgeBaseId=kb_id,
+            retrievalQuery={"text": enhanced_query},
+            retrievalConfiguration={"vectorSearchConfiguration": {"numberOfResults": settings.RAG_RETRIEVE_RESULTS, "overrideSearchType": "SEMANTIC"}},
+        )
+    return [
+        Passage(r.get('content', {}).get('text', ''), r.get('score', 0.0), r.get('location', {}).get('s3Location', {}).get('uri', ''))
+        for r in response.get('retrievalResults', [])
+    ]
+
+async def build_two_stage_prompt(enhanced_query, conversation_context="", room_id=None):
+    """Stage two: rerank/trim the passages locally and fill the grounding template with a compact context."""
+    passages = await retrieve_passages(enhanced_query, bool(conversation_context), room_id)
+    selected = rerank(enhanced_query, passages, settings.RAG_CONTEXT_PASSAGES, settings.RAG_CONTEXT_CHARS)
+    # Whatever the char budget let through must also fit the model context next to the prompt and output cap
+    budget = (settings.LLM_CONTEXT_TOKENS - FRAMING_TOKENS - output_cap("rag") - system_segment(RAG_SYSTEM_PROMPT).tokens
+              - static_tokens(RAG_PROMPT_TEMPLATE) - count_tokens(enhanced_query) - count_tokens(conversation_context))
+    selected = selected[:fit_texts([p.text for p in selected], budget)]
+    log.debug("Reranked passages", used=len(selected), retrieved=len(passages), chars=sum(len(p.text) for p in selected))
+    _trace(retrieved=len(passages), used=len(selected), context_chars=sum(len(p.text) for p in selected),
+           top_score=max((p.score for p in passages), default=None), sources=sorted({p.source for p in selected if p.source}))
+    search_results = "\n\n".join(f"[{i}] {p.text.strip()}" for i, p in enumerate(selected, 1))
+    return (conversation_context + RAG_PROMPT_TEMPLATE).replace("$search_results$", search_results).replace("$query$", enhanced_query)
+
+def clean_rag_response(response_text):
+    # Your exact cleaning logic (meta-phrases)
+    response_lower = response_text.lower()
+    for phrase in META_PHRASES:
+        if phrase in response_lower:
+            idx = response_lower.find(phrase)
+            response_text = response_text[:idx].strip()
+            response_text = re.sub(r'[.,;:]+$', '', response_text).strip() + '.'
+            response_text = response_text[0].upper() + response_text[1:]
+            break
+    
+    if not response_text or len(response_text) < 10:
+        response_text = NO_INFO_RESPONSE
+    return response_text
+
+async def handle_rag_intent(message, chat_history, room_id=None):
+    with span("handler", intent="rag") as s:
+        response_text, source = await _handle_rag_intent(message, chat_history, room_id)
+        s.set(source=source)
+    log.debug("RAG response", response=response_text, source=source)
+    return response_text
+
+async def _handle_rag_intent(message, chat_history, room_id=None):
+    enhanced_query, conversation_context = build_kb_query(message, chat_history)
+    _trace(query=enhanced_query, followup=bool(conversation_context))
+    # Answers that depend on earlier turns are not reusable across conversations
+    cacheable = settings.RAG_CACHE_ENABLED and not conversation_context
+    # Read before the lookup: a KB resync during this turn must not let its answer into the cache
+    generation = answer_cache.generation
+    if cacheable:
+        cached = await answer_cache.get(enhanced_query)
+        if cached is not None:
+            count("answer_cache_hit")
+            _trace(source="cache")
+            return cached, "cache"
+        count("answer_cache_miss")
+    
+    try:
+        if settings.RAG_MODE == "two_stage":
+            prompt = await build_two_stage_prompt(enhanced_query, conversation_context, room_id)
+            raw_text = await invoke_general_model(RAG_SYSTEM_PROMPT, prompt, max_gen_len=output_cap("rag"), temperature=0.1, purpose="rag")
+        else:
+            # RetrieveAndGenerate reports no token usage (only output text and citations): nothing for record_usage
+            with span("kb", mode="retrieve_and_generate"):
+                retrieve_response = await bedrock_client.retrieve_and_generate(**build_rag_request(enhanced_query, conversation_context))
+            raw_text = retrieve_response.get('output', {}).get('text', '')
+            references = [r for c in retrieve_response.get('citations', []) for r in c.get('retrievedReferences', [])]
+            _trace(used=len(references), sources=sorted({r.get('location', {}).get('s3Location', {}).get('uri', '') for r in references} - {''}))
         
-        print(f"[STEP 3] Calling Bedrock retrieve_and_generate...")
-        retrieve_response = bedrock_agent.retrieve_and_generate(**bedrock_input)
-        
-        response_text = retrieve_response.get('output', {}).get('text', '').strip()
-        
-        # Your exact cleaning logic (meta-phrases)
-        meta_phrases = ["according to the retrieved information","according to the retrieved documents","according to the information","according to the documents","according to the search results","based on the search results","based on the retrieved information","based on the retrieved documents","based on the retrieved","based on the documents","based on the information","the retrieved documents mention","the retrieved information shows","the retrieved documents show","the documents mention","the documents show","the search results show","the information shows","i found that","i found information","it is mentioned that","it appears that","from the documents","from the retrieved information","from the search results","as per the documents","as mentioned in","so refer to","please refer to","you can refer to","refer to the"]
-        response_lower = response_text.lower()
-        for phrase in meta_phrases:
-            if phrase in response_lower:
-                idx = response_lower.find(phrase)
-                response_text = response_text[:idx].strip()
-                response_text = re.sub(r'[.,;:]+$', '', response_text).strip() + '.'
-                response_text = response_text[0].upper() + response_text[1:]
-                break
-        
-        if not response_text or len(response_text) < 10:
-            response_text = "I don't have specific information about that."
-        
-        print(f"[STEP 3] Final RAG response: '{response_text}'")
-        print(f"{'='*80}\n")
-        return response_text
+        response_text = clean_rag_response(raw_text.strip())
+        if cacheable and response_text not in (NO_INFO_RESPONSE, MODEL_ERROR_RESPONSE):
+            await answer_cache.put(enhanced_query, response_text, generation)
+        _trace(source=settings.RAG_MODE, raw=raw_text)
+        return response_text, settings.RAG_MODE
         
     except Exception as e:
         log.error("RAG failed", error=str(e))
-        return "I couldn't retrieve information right now. Please try again."
+        count("rag_error")
+        _trace(source="error", error=str(e))
+        return RAG_ERROR_RESPONSE, "error"
 
-def handle_smart_ai_assistant_intent(message):
-    print(f"\n{'='*80}")
-    print(f"[STEP 4] HANDLING SMART AI ASSISTANT")
-    print(f"{'='*80}")
-    smart_system_prompt = """You are a helpful technical assistant at Sparkout Tech Solutions.
+SMART_SYSTEM_PROMPT = """You are a helpful technical assistant at Sparkout Tech Solutions.
 
 1. General Technical & Project Questions:
    - Provide clear, structured explanations
@@ -303,19 +416,180 @@ def handle_smart_ai_assistant_intent(message):
    - If unrelated to projects/architecture/technology, respond:
      "That's out of scope. Please ask about our company or project guidance."
 """
-    response_text = invoke_general_model(smart_system_prompt, f"Question: {message}\n\nProvide a helpful response:", max_gen_len=1024, temperature=0.3)
-    print(f"[STEP 4] Response: '{response_text[:300]}...'")
-    print(f"{'='*80}\n")
+
+async def handle_smart_ai_assistant_intent(message):
+    with span("handler", intent="smart_ai_assistant"):
+        response_text = await invoke_general_model(SMART_SYSTEM_PROMPT, f"Question: {message}\n\nProvide a helpful response:", max_gen_len=output_cap("smart_ai_assistant"), temperature=0.3, purpose="smart_ai_assistant")
+    log.debug("Smart assistant response", response=response_text[:300])
     return response_text
 
+# ================== SPECULATIVE DISPATCH ==================
+async def _dispatch(intent, message, chat_history, room_id=None):
+    if intent == "greetings":
+        return await handle_greeting_intent(message)
+    elif intent == "rag":
+        return await handle_rag_intent(message, chat_history, room_id)
+    else:
+        return await handle_smart_ai_assistant_intent(message)
+
+async def _classify_speculatively(message, chat_history, room_id, start):
+    """Classify while the most likely handler already runs.
+
+    `start(intent)` launches that handler and returns something with .cancel().
+    Returns (intent, speculative_handle) on a win, (intent, None) otherwise; in
+    both cases the user turn has been appended to chat_history with its final intent.
+    """
+    stats = speculation.stats_for(room_id)
+    stats.turns += 1
+    guess = speculation.predict_handler(message, chat_history)
+    if guess is None:
+        intent = await classify_intent_with_context(message, chat_history)
+        set_turn_context(intent=intent)
+        chat_history.append({"role": "user", "content": message, "intent": intent})
+        return intent, None
+
+    # The classifier sees the history as it was; the handler sees the new turn, as in the sequential path
+    history_before = list(chat_history)
+    entry = {"role": "user", "content": message, "intent": guess}
+    chat_history.append(entry)
+    stats.attempts += 1
+    handle = start(guess)
+    started = time.perf_counter()
+    try:
+        intent = await classify_intent_with_context(message, history_before)
+    except BaseException:
+        handle.cancel()
+        raise
+    elapsed = time.perf_counter() - started
+    set_entry_intent(chat_history, entry, intent)
+    set_turn_context(intent=intent)
+
+    # Win rate is hit / (hit + miss); each miss is one discarded handler call, its duration the wasted spend
+    if intent == guess:
+        stats.wins += 1
+        stats.saved_seconds += elapsed
+        count("speculation_hit")
+        observe("speculation_saved", elapsed, intent=guess)
+        result = (intent, handle)
+    else:
+        handle.cancel()
+        stats.losses += 1
+        stats.wasted_bedrock_calls += 1
+        stats.wasted_seconds += elapsed
+        count("speculation_miss")
+        observe("speculation_wasted", elapsed, intent=guess)
+        result = (intent, None)
+    log.info("Speculative dispatch", room_id=room_id, guess=guess, intent=intent, **stats.as_dict())
+    return result
+
 # ================== LIVEKIT MAIN FUNCTION ==================
-async def process_user_message(message: str, chat_history: List[Dict]) -> str:
-    intent = classify_intent_with_context(message, chat_history)
+def _known_intent(message, chat_history, intent):
+    set_turn_context(intent=intent)
+    chat_history.append({"role": "user", "content": message, "intent": intent})
+
+async def process_user_message(message: str, chat_history: List[Dict], room_id: Optional[str] = None,
+                               intent: Optional[str] = None) -> str:
+    """Classify (unless `intent` is already known, e.g. from an interim transcript) and answer."""
+    if intent is not None:
+        _known_intent(message, chat_history, intent)
+        return await _dispatch(intent, message, chat_history, room_id)
+    if settings.SPECULATIVE_DISPATCH:
+        intent, task = await _classify_speculatively(
+            message, chat_history, room_id,
+            lambda guess: asyncio.create_task(_dispatch(guess, message, chat_history, room_id)),
+        )
+        if task is not None:
+            return await task
+        return await _dispatch(intent, message, chat_history, room_id)
+
+    intent = await classify_intent_with_context(message, chat_history)
+    set_turn_context(intent=intent)
     chat_history.append({"role": "user", "content": message, "intent": intent})
+    return await _dispatch(intent, message, chat_history, room_id)
+
+# ================== STREAMING MODE (LLM → TTS) ==================
+async def stream_rag_intent(message, chat_history, room_id=None) -> AsyncIterator[str]:
+    enhanced_query, conversation_context = build_kb_query(message, chat_history)
+    cacheable = settings.RAG_CACHE_ENABLED and not conversation_context
+    generation = answer_cache.generation
+    if cacheable:
+        cached = await answer_cache.get(enhanced_query)
+        if cached is not None:
+            count("answer_cache_hit")
+            yield cached
+            return
+        count("answer_cache_miss")
+    
+    pieces = []
+    try:
+        if settings.RAG_MODE == "two_stage":
+            prompt = await build_two_stage_prompt(enhanced_query, conversation_context, room_id)
+            tokens = stream_general_model(RAG_SYSTEM_PROMPT, prompt, max_gen_len=output_cap("rag"), temperature=0.1, purpose="rag")
+        else:
+            tokens = bedrock_client.retrieve_and_generate_stream(**build_rag_request(enhanced_query, conversation_context))
+        async for text in scrub_stream(tokens, META_PHRASES, fallback=NO_INFO_RESPONSE):
+            pieces.append(text)
+            yield text
+    except Exception as e:
+        log.error("RAG stream failed", error=str(e))
+        count("rag_error")
+        if not pieces:
+            yield RAG_ERROR_RESPONSE
+        return
     
+    response_text = "".join(pieces)
+    if cacheable and response_text and response_text not in (NO_INFO_RESPONSE, MODEL_ERROR_RESPONSE):
+        await answer_cache.put(enhanced_query, response_text, generation)
+
+async def _banked(text: str) -> AsyncIterator[str]:
+    yield text
+
+def _dispatch_stream(intent, message, chat_history, room_id=None) -> AsyncIterator[str]:
     if intent == "greetings":
-        return handle_greeting_intent(message)
+        banked = response_bank.reply_for_greeting(message)
+        if banked is not None:
+            count("response_bank_hit")
+            return _banked(banked)
+        return stream_general_model(GREETING_SYSTEM_PROMPT, f"User said: '{message}'\n\nReply warmly and offer help:", max_gen_len=output_cap("greetings"), temperature=0.3, purpose="greetings")
     elif intent == "rag":
-        return handle_rag_intent(message, chat_history)
+        return stream_rag_intent(message, chat_history, room_id)
+    else:
+        return stream_general_model(SMART_SYSTEM_PROMPT, f"Question: {message}\n\nProvide a helpful response:", max_gen_len=output_cap("smart_ai_assistant"), temperature=0.3, purpose="smart_ai_assistant")
+
+async def stream_user_message(message: str, chat_history: List[Dict], room_id: Optional[str] = None,
+                              intent: Optional[str] = None) -> AsyncIterator[str]:
+    """Streaming counterpart of process_user_message: yields speakable sentence chunks while generation runs."""
+    if intent is not None:
+        _known_intent(message, chat_history, intent)
+        tokens = _dispatch_stream(intent, message, chat_history, room_id)
+    elif settings.SPECULATIVE_DISPATCH:
+        intent, prefetched = await _classify_speculatively(
+            message, chat_history, room_id,
+            lambda guess: speculation.PrefetchedStream(_dispatch_stream(guess, message, chat_history, room_id)),
+        )
+        tokens = prefetched if prefetched is not None else _dispatch_stream(intent, message, chat_history, room_id)
     else:
-        return handle_smart_ai_assistant_intent(message)
\ No newline at end of file
+        intent = await classify_intent_with_context(message, chat_history)
+        set_turn_context(intent=intent)
+        chat_history.append({"role": "user", "content": message, "intent": intent})
+        tokens = _dispatch_stream(intent, message, chat_history, room_id)
+
+    async for sentence in _speakable(tokens):
+        yield sentence
+
+async def _speakable(tokens: AsyncIterator[str]) -> AsyncIterator[str]:
+    """sentence_chunks, except a banked reply (yielded whole) stays one chunk so its cached audio can play."""
+    iterator = tokens.__aiter__()
+    first = await anext(iterator, None)
+    if first is None:
+        return
+    if response_bank.is_banked(first):
+        yield first.strip()
+        return
+
+    async def rest():
+        yield first
+        async for token in iterator:
+            yield token
+    async for sentence in sentence_chunks(rest()):
+        yield sentence
@@ -0,0 +1,159 @@
+# src/response_bank.py
+"""
+Canned replies with pre-synthesized audio.
+
+Short greetings, thanks and goodbyes are answered from the bank instead of a
+Llama call, and fixed fallback messages (KB/model errors, no information, out
+of scope) come from here too. Audio for every banked text is synthesized
+offline by scripts/refresh_response_bank.py for ELEVENLABS_VOICE_ID and
+loaded into memory at start-up, so these replies play with no model and no
+TTS call:
+
+    RESPONSE_AUDIO_DIR/<voice id>/manifest.json   {"sample_rate": 24000, "clips": {clip id: text}}
+    RESPONSE_AUDIO_DIR/<voice id>/<clip id>.pcm   16-bit mono PCM
+
+Clip ids are a hash of the normalized text, so editing a reply simply misses
+the cache (and falls back to live TTS) until the bank is refreshed.
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional
+from .utils.env import settings
+from .utils.logger import log
+
+NO_INFO_RESPONSE = "I don't have specific information about that."
+MODEL_ERROR_RESPONSE = "I'm having trouble thinking right now."
+RAG_ERROR_RESPONSE = "I couldn't retrieve information right now. Please try again."
+OUT_OF_SCOPE_RESPONSE = "That's out of scope. Please ask about our company or project guidance."
+
+DEFAULT_BANK: Dict[str, List[str]] = {
+    "greeting": [
+        "Hello! Welcome to Sparkout Tech Solutions. I can tell you about our services and projects, or help with a technical question. What would you like to know?",
+        "Hi there! Thanks for calling Sparkout Tech Solutions. Ask me about our services, our projects, or any technology question you have.",
+        "Hey! Great to hear from you. I can help with information about Sparkout's services and case studies, or with general technical guidance.",
+    ],
+    "thanks": [
+        "You're welcome! Is there anything else you'd like to know about Sparkout?",
+        "Happy to help! Let me know if you have any other questions.",
+    ],
+    "farewell": [
+        "Thanks for talking with Sparkout Tech Solutions. Have a great day!",
+        "Goodbye! Feel free to call again whenever you have questions.",
+    ],
+    "no_info": [NO_INFO_RESPONSE],
+    "model_error": [MODEL_ERROR_RESPONSE],
+    "rag_error": [RAG_ERROR_RESPONSE],
+    "out_of_scope": [OUT_OF_SCOPE_RESPONSE],
+}
+
+# Checked in this order: "hi, thanks, bye" is a goodbye
+_SOCIAL = [
+    ("farewell", ["bye", "goodbye", "good bye", "good night", "see you", "talk later", "take care"]),
+    ("thanks", ["thanks", "thank you", "thank u", "thx", "appreciate it"]),
+    ("greeting", ["hi", "hii", "hello", "hey", "hola", "namaste", "greetings", "good morning", "good afternoon",
+                  "good evening", "howdy", "yo"]),
+]
+_SOCIAL_RE = [(category, re.compile(r"\b(?:%s)\b" % "|".join(map(re.escape, words)))) for category, words in _SOCIAL]
+_WORD = re.compile(r"[a-z']+")
+FRAME_MS = 20
+
+def normalize(text: str) -> str:
+    return " ".join(_WORD.findall(text.lower()))
+
+def clip_id(text: str) -> str:
+    return hashlib.sha1(normalize(text).encode()).hexdigest()[:16]
+
+class AudioClip:
+    __slots__ = ("pcm", "sample_rate")
+
+    def __init__(self, pcm: bytes, sample_rate: int):
+        self.pcm = pcm
+        self.sample_rate = sample_rate
+
+    @property
+    def duration(self) -> float:
+        return len(self.pcm) / 2 / self.sample_rate
+
+    async def frames(self) -> AsyncIterator:
+        """The clip as 20 ms LiveKit audio frames."""
+        from livekit import rtc
+        samples = self.sample_rate * FRAME_MS // 1000
+        step = samples * 2
+        for start in range(0, len(self.pcm), step):
+            chunk = self.pcm[start:start + step]
+            yield rtc.AudioFrame(chunk, self.sample_rate, 1, len(chunk) // 2)
+
+class ResponseBank:
+    def __init__(self, bank_path: str, audio_dir: str, voice_id: str, max_social_words: int = 8):
+        self.bank_path = Path(bank_path)
+        self.audio_dir = Path(audio_dir)
+        self.voice_id = voice_id
+        self.max_social_words = max_social_words
+        self.replies: Dict[str, List[str]] = {k: list(v) for k, v in DEFAULT_BANK.items()}
+        self._clips: Dict[str, AudioClip] = {}
+        self._ids: Optional[set] = None
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def load(self):
+        """Read the text bank override and this voice's audio; idempotent, run by the start-up prewarm."""
+        with self._lock:
+            if self._loaded:
+                return
+            if self.bank_path.exists():
+                try:
+                    self.replies.update({k: list(v) for k, v in json.loads(self.bank_path.read_text()).items() if v})
+                except (OSError, ValueError) as e:
+                    log.warning("Could not read response bank, using defaults", path=str(self.bank_path), error=str(e))
+                self._ids = None
+            voice_dir = self.audio_dir / self.voice_id
+            manifest_path = voice_dir / "manifest.json"
+            if manifest_path.exists():
+                manifest = json.loads(manifest_path.read_text())
+                for cid in manifest.get("clips", {}):
+                    pcm_path = voice_dir / f"{cid}.pcm"
+                    if pcm_path.exists():
+                        self._clips[cid] = AudioClip(pcm_path.read_bytes(), manifest.get("sample_rate", settings.RESPONSE_AUDIO_SAMPLE_RATE))
+            missing = [text for text in self.texts() if clip_id(text) not in self._clips]
+            log.info("Response bank loaded", voice_id=self.voice_id, clips=len(self._clips), missing_audio=len(missing))
+            self._loaded = True
+
+    def texts(self) -> List[str]:
+        return [text for replies in self.replies.values() for text in replies]
+
+    def is_banked(self, text: str) -> bool:
+        if self._ids is None:
+            self._ids = {clip_id(t) for t in self.texts()}
+        return clip_id(text) in self._ids
+
+    def social_category(self, message: str) -> Optional[str]:
+        """'greeting', 'thanks' or 'farewell' for a short social message; None when it asks for anything more."""
+        lower = message.lower()
+        if len(lower.split()) > self.max_social_words:
+            return None
+        for category, pattern in _SOCIAL_RE:
+            if pattern.search(lower):
+                return category
+        return None
+
+    def pick(self, category: str) -> str:
+        return random.choice(self.replies[category])
+
+    def reply_for_greeting(self, message: str) -> Optional[str]:
+        """Banked reply for a greetings-intent message, or None to generate one."""
+        if not settings.RESPONSE_BANK_ENABLED:
+            return None
+        category = self.social_category(message)
+        return self.pick(category) if category else None
+
+    def audio_for(self, text: str) -> Optional[AudioClip]:
+        """Pre-synthesized audio for `text` when it is (verbatim, up to case and punctuation) a banked reply."""
+        if not settings.RESPONSE_BANK_ENABLED or not self._clips:
+            return None
+        return self._clips.get(clip_id(text))
+
+response_bank = ResponseBank(settings.RESPONSE_BANK_PATH, settings.RESPONSE_AUDIO_DIR, settings.ELEVENLABS_VOICE_ID)
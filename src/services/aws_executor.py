@@ -0,0 +1,121 @@
+# src/services/aws_executor.py
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from botocore.config import Config
+from ..utils.env import settings
+from ..utils.tracing import observe
+
+# One bounded pool per process, shared by Bedrock and DynamoDB.
+# The HTTP connection pool is sized to match so threads never wait on a socket.
+boto_config = Config(
+    max_pool_connections=settings.AWS_IO_MAX_WORKERS,
+    retries={"max_attempts": 3, "mode": "standard"},
+    tcp_keepalive=True,
+)
+# Bedrock throttles and transient faults are retried by the governor (src/services/bedrock_governor.py),
+# which needs to see them; a botocore retry underneath would multiply its attempts
+bedrock_config = Config(
+    max_pool_connections=settings.AWS_IO_MAX_WORKERS,
+    retries={"total_max_attempts": 1, "mode": "standard"},
+    tcp_keepalive=True,
+)
+
+_executor = ThreadPoolExecutor(max_workers=settings.AWS_IO_MAX_WORKERS, thread_name_prefix="aws-io")
+
+# boto3's default session is not thread-safe, so clients are created one at a time
+_client_lock = threading.Lock()
+
+class LazyClient:
+    """boto3 client created on first use (or by the startup prewarm) instead of at import.
+
+    Importing a module that holds one no longer resolves credentials or builds
+    endpoints. Every call stamps `last_used`, which the keepalive reads to ping
+    services whose pooled connections would otherwise idle out.
+    """
+
+    def __init__(self, service: str, config: Config = boto_config):
+        self.service = service
+        self.config = config
+        self.last_used = 0.0
+        self._client = None
+
+    @property
+    def created(self) -> bool:
+        return self._client is not None
+
+    def resolve(self):
+        if self._client is None:
+            with _client_lock:
+                if self._client is None:
+                    import boto3
+                    started = time.perf_counter()
+                    self._client = boto3.client(self.service, region_name=settings.AWS_REGION, config=self.config)
+                    observe("client_init", time.perf_counter() - started, service=self.service)
+        return self._client
+
+    def __getattr__(self, name):
+        self.last_used = time.monotonic()
+        return getattr(self.resolve(), name)
+
+def submit_blocking(fn, *args, **kwargs) -> Future:
+    """Start a blocking boto3 call on the shared AWS pool; its Future completes when the pool thread is done."""
+    # Carry the caller's context (turn room/intent labels) onto the worker thread
+    ctx = contextvars.copy_context()
+    return _executor.submit(partial(ctx.run, fn, *args, **kwargs))
+
+async def run_blocking(fn, *args, **kwargs):
+    """Run a blocking boto3 call on the shared AWS pool without stalling the event loop."""
+    return await asyncio.wrap_future(submit_blocking(fn, *args, **kwargs))
+
+class _Raised:
+    __slots__ = ("error",)
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+_DONE = object()
+
+async def stream_blocking(fn, *args, **kwargs):
+    """Iterate a blocking iterator (e.g. a boto3 EventStream) on the AWS pool, yielding items as they arrive.
+
+    Closing the async generator early stops the pool thread at the next event.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def put(item):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            stop.set()  # loop already closed
+
+    def pump():
+        try:
+            for item in fn(*args, **kwargs):
+                if stop.is_set():
+                    break
+                put(item)
+        except Exception as e:
+            put(_Raised(e))
+        finally:
+            put(_DONE)
+
+    loop.run_in_executor(_executor, contextvars.copy_context().run, pump)
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Raised):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+
+def shutdown(wait: bool = True):
+    _executor.shutdown(wait=wait)
@@ -0,0 +1,86 @@
+# src/services/bedrock_client.py
+import json
+from typing import AsyncIterator, Dict, List, Optional
+from .aws_executor import LazyClient, bedrock_config, run_blocking
+from .bedrock_governor import governor
+from ..utils.load import load
+
+# Runtime and KB calls go through the governor: admission, throttle retries, optional hedging.
+# `purpose` picks the priority (see bedrock_governor.PRIORITIES); `tokens` is the estimated
+# prompt + output size charged to the tokens-per-minute bucket.
+runtime = LazyClient('bedrock-runtime', bedrock_config)
+agent_runtime = LazyClient('bedrock-agent-runtime', bedrock_config)
+# Control plane, only used to notice knowledge-base resyncs
+kb_admin = LazyClient('bedrock-agent')
+
+def _invoke_model_sync(**kwargs) -> Dict:
+    # The response body is a streaming socket read, so it stays on the worker thread too
+    response = runtime.invoke_model(**kwargs)
+    return json.loads(response['body'].read())
+
+async def invoke_model(purpose: str = "general", tokens: int = 0, **kwargs) -> Dict:
+    with load.bedrock_call():
+        return await governor.call(_invoke_model_sync, kwargs, purpose, tokens, hedge=True)
+
+def _retrieve_and_generate_sync(**kwargs) -> Dict:
+    return agent_runtime.retrieve_and_generate(**kwargs)
+
+async def retrieve_and_generate(purpose: str = "rag", tokens: int = 0, **kwargs) -> Dict:
+    with load.bedrock_call():
+        return await governor.call(_retrieve_and_generate_sync, kwargs, purpose, tokens)
+
+def _retrieve_sync(**kwargs) -> Dict:
+    return agent_runtime.retrieve(**kwargs)
+
+async def retrieve(purpose: str = "rag", **kwargs) -> Dict:
+    with load.bedrock_call():
+        return await governor.call(_retrieve_sync, kwargs, purpose, hedge=True)
+
+def _invoke_model_stream_sync(**kwargs):
+    response = runtime.invoke_model_with_response_stream(**kwargs)
+    for event in response['body']:
+        if 'chunk' in event:
+            yield json.loads(event['chunk']['bytes'])
+
+async def invoke_model_stream(purpose: str = "general", tokens: int = 0, **kwargs) -> AsyncIterator[Dict]:
+    """Yield decoded model chunks (for Llama 3: {"generation": ..., "stop_reason": ...})."""
+    with load.bedrock_call():
+        async for chunk in governor.stream(_invoke_model_stream_sync, kwargs, purpose, tokens):
+            yield chunk
+
+def _retrieve_and_generate_stream_sync(**kwargs):
+    response = agent_runtime.retrieve_and_generate_stream(**kwargs)
+    for event in response['stream']:
+        text = event.get('output', {}).get('text')
+        if text:
+            yield text
+
+async def retrieve_and_generate_stream(purpose: str = "rag", tokens: int = 0, **kwargs) -> AsyncIterator[str]:
+    """Yield generated answer text pieces from the streaming knowledge-base API."""
+    with load.bedrock_call():
+        async for text in governor.stream(_retrieve_and_generate_stream_sync, kwargs, purpose, tokens):
+            yield text
+
+async def embed_text(text: str, model_id: str, dimensions: int = 256) -> List[float]:
+    """Normalized Titan text embedding."""
+    body = json.dumps({"inputText": text, "dimensions": dimensions, "normalize": True})
+    result = await invoke_model("embed", modelId=model_id, contentType='application/json', accept='application/json', body=body)
+    return result['embedding']
+
+def _latest_ingestion_marker_sync(kb_id: str) -> Optional[str]:
+    markers = []
+    for source in kb_admin.list_data_sources(knowledgeBaseId=kb_id).get('dataSourceSummaries', []):
+        jobs = kb_admin.list_ingestion_jobs(
+            knowledgeBaseId=kb_id,
+            dataSourceId=source['dataSourceId'],
+            filters=[{"attribute": "STATUS", "operator": "EQ", "values": ["COMPLETE"]}],
+            sortBy={"attribute": "STARTED_AT", "order": "DESCENDING"},
+            maxResults=1,
+        ).get('ingestionJobSummaries', [])
+        if jobs:
+            markers.append(f"{source['dataSourceId']}:{jobs[0]['ingestionJobId']}")
+    return "|".join(sorted(markers)) or None
+
+async def latest_ingestion_marker(kb_id: str) -> Optional[str]:
+    """Identifier of the latest completed ingestion job per data source; changes whenever the KB is resynced."""
+    return await run_blocking(_latest_ingestion_marker_sync, kb_id)
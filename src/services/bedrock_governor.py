@@ -0,0 +1,323 @@
+# src/services/bedrock_governor.py
+"""
+Process-wide admission control for Bedrock calls.
+
+Every Bedrock runtime / knowledge-base call goes through one governor:
+
+  - token buckets for requests and tokens per minute, sized to the account
+    quotas divided across the worker processes sharing them (run_worker
+    passes the supervisor's worker count; 1 when running in-process),
+  - an AIMD concurrency limit: +1/limit per success while the limit is in use,
+    halved (at most once per second) when Bedrock throttles,
+  - priority admission: intent classification and greetings (short, on the
+    critical path of every turn) go ahead of answers, and answers ahead of
+    background work (summaries, embeddings); low priorities also leave a
+    slice of each bucket for high ones,
+  - throttled calls are retried with jittered backoff instead of failing the
+    turn (botocore's own retries are off for Bedrock so throttles are seen here),
+    and so are transient faults (5xx, model stream errors, dropped connections,
+    read timeouts), which do not lower the concurrency limit,
+  - optional hedging: a unary call still running past the recent latency
+    percentile for its purpose is duplicated if there is spare capacity, and
+    the first answer wins.
+
+Rooms run on different event loops under the thread job executor, so state is
+guarded by a threading lock and waiters are woken on their own loop.
+"""
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import AsyncIterator, Callable, Deque, Dict, List, Optional
+from botocore.exceptions import BotoCoreError, ClientError
+from .aws_executor import stream_blocking, submit_blocking
+from ..utils.env import settings
+from ..utils.logger import log
+from ..utils.retry import backoff_delays, is_throttle, is_transient
+from ..utils.tracing import count, observe
+
+PRIORITIES = {"intent": 0, "greetings": 0, "rag": 1, "smart_ai_assistant": 1, "general": 1, "summary": 2, "embed": 2}
+LATENCY_SAMPLES = 200
+MIN_HEDGE_SAMPLES = 20
+
+class TokenBucket:
+    """Thread-safe bucket that hands out reservations: callers take tokens now and sleep off any debt."""
+
+    def __init__(self, per_minute: float, burst_seconds: float = 6.0):
+        self.rate = per_minute / 60.0
+        self.capacity = max(self.rate * burst_seconds, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, cost: float, keep: float = 0.0) -> float:
+        """Take `cost` tokens; seconds to wait before using them. `keep` is a level the caller must not dip below."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= cost
+            return max(keep - self._tokens, 0.0) / self.rate
+
+    def try_take(self, cost: float) -> bool:
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens < cost:
+                return False
+            self._tokens -= cost
+            return True
+
+@dataclass
+class GovernorStats:
+    admitted: int = 0
+    queued: int = 0
+    throttled: int = 0
+    transient: int = 0
+    retried: int = 0
+    failed: int = 0
+    hedged: int = 0
+    hedge_wins: int = 0
+
+class BedrockGovernor:
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float, initial_limit: int, max_limit: int,
+                 retries: int = 4, hedge: bool = False, hedge_percentile: float = 95, reserve_fraction: float = 0.1):
+        self.set_quota(requests_per_minute, tokens_per_minute)
+        self.limit = float(initial_limit)
+        self.max_limit = max_limit
+        self.retries = retries
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.reserve_fraction = reserve_fraction
+        self.inflight = 0
+        self.counters = GovernorStats()
+        self._lock = threading.Lock()
+        self._waiters: List[tuple] = []  # heap of (priority, seq, loop, future)
+        self._seq = itertools.count()
+        self._last_decrease = 0.0
+        self._latency: Dict[str, Deque[float]] = {}
+
+    def set_quota(self, requests_per_minute: float, tokens_per_minute: float, workers: int = 1):
+        """Size the buckets to account quotas shared by `workers` processes; 0 tokens_per_minute disables that bucket."""
+        workers = max(workers, 1)
+        self.workers = workers
+        self.requests = TokenBucket(requests_per_minute / workers)
+        self.tokens = TokenBucket(tokens_per_minute / workers) if tokens_per_minute else None
+
+    # ---- admission ----
+    async def _wait_for_buckets(self, priority: int, tokens: int):
+        keep = 0.0
+        if priority > 0:
+            keep = self.requests.capacity * self.reserve_fraction
+        wait = self.requests.reserve(1, keep)
+        if self.tokens is not None and tokens:
+            wait = max(wait, self.tokens.reserve(tokens, self.tokens.capacity * self.reserve_fraction if priority > 0 else 0.0))
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    async def acquire(self, priority: int):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self.inflight < int(self.limit) and not self._waiters:
+                self.inflight += 1
+                self.counters.admitted += 1
+                return
+            future = loop.create_future()
+            heapq.heappush(self._waiters, (priority, next(self._seq), loop, future))
+            self.counters.queued += 1
+        started = time.perf_counter()
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Granted just as we were cancelled: hand the slot back
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        observe("bedrock_queue", time.perf_counter() - started)
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.inflight >= int(self.limit) or self._waiters:
+                return False
+            self.inflight += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.inflight -= 1
+            self._wake()
+
+    def _wake(self):
+        # Called with the lock held
+        while self._waiters and self.inflight < int(self.limit):
+            _, _, loop, future = heapq.heappop(self._waiters)
+            if future.cancelled():
+                continue
+            self.inflight += 1
+            self.counters.admitted += 1
+            try:
+                loop.call_soon_threadsafe(self._grant, future)
+            except RuntimeError:  # the waiter's loop has closed
+                self.inflight -= 1
+
+    def _grant(self, future: asyncio.Future):
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+    # ---- AIMD ----
+    def _on_success(self, purpose: str, seconds: float):
+        with self._lock:
+            if self.inflight >= int(self.limit) - 1:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+                self._wake()
+            self._latency.setdefault(purpose, deque(maxlen=LATENCY_SAMPLES)).append(seconds)
+
+    def _on_throttle(self):
+        count("bedrock_throttled")
+        with self._lock:
+            self.counters.throttled += 1
+            now = time.monotonic()
+            # In-flight calls of the same burst throttle together; cut once per congestion event
+            if now - self._last_decrease >= 1.0:
+                self.limit = max(1.0, self.limit / 2)
+                self._last_decrease = now
+                log.warning("Bedrock throttled, lowering concurrency", limit=round(self.limit, 1))
+
+    def _retry_delay(self, error: BaseException, delays) -> Optional[float]:
+        """Backoff before retrying a failed call, or None when `error` must be raised."""
+        if is_throttle(error):
+            self._on_throttle()
+        elif is_transient(error):
+            count("bedrock_transient_error")
+            with self._lock:
+                self.counters.transient += 1
+            log.warning("Bedrock call failed, retrying", error=str(error))
+        else:
+            return None
+        delay = next(delays, None)
+        with self._lock:
+            if delay is None:
+                self.counters.failed += 1
+            else:
+                self.counters.retried += 1
+        return delay
+
+    def hedge_after(self, purpose: str) -> Optional[float]:
+        """Latency percentile of recent calls for `purpose`, or None while there are too few samples."""
+        with self._lock:
+            samples = sorted(self._latency.get(purpose, ()))
+        if len(samples) < MIN_HEDGE_SAMPLES:
+            return None
+        return samples[min(int(len(samples) * self.hedge_percentile / 100), len(samples) - 1)]
+
+    # ---- calls ----
+    def _submit(self, fn: Callable, kwargs: Dict) -> asyncio.Future:
+        """Start a unary call that holds an acquired slot until its pool thread finishes.
+
+        A caller that stops waiting (a hedge loser, a cancelled turn) does not
+        stop the thread, so the slot is released by the thread's completion.
+        """
+        try:
+            job = submit_blocking(fn, **kwargs)
+        except BaseException:
+            self.release()  # the pool is shutting down
+            raise
+        job.add_done_callback(lambda _: self.release())
+        return asyncio.wrap_future(job)
+
+    async def call(self, fn: Callable, kwargs: Dict, purpose: str = "general", tokens: int = 0, hedge: bool = False):
+        """Run a unary blocking Bedrock call under admission control, retrying throttles and transient faults."""
+        priority = PRIORITIES.get(purpose, 1)
+        delays = backoff_delays(self.retries + 1, base_delay=0.2, max_delay=2.0)
+        while True:
+            await self._wait_for_buckets(priority, tokens)
+            await self.acquire(priority)
+            started = time.perf_counter()
+            try:
+                if hedge and self.hedge:
+                    result = await self._hedged(fn, kwargs, purpose, tokens)
+                else:
+                    result = await self._submit(fn, kwargs)
+            except (ClientError, BotoCoreError) as e:
+                delay = self._retry_delay(e, delays)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            self._on_success(purpose, time.perf_counter() - started)
+            return result
+
+    async def _hedged(self, fn: Callable, kwargs: Dict, purpose: str, tokens: int):
+        first = self._submit(fn, kwargs)
+        threshold = self.hedge_after(purpose)
+        if threshold is None:
+            return await first
+        done, _ = await asyncio.wait({first}, timeout=threshold)
+        # Only duplicate with spare concurrency and quota; a hedge must never queue or throttle others
+        if done or not self.try_acquire():
+            return await first
+        if not self.requests.try_take(1) or (self.tokens is not None and tokens and not self.tokens.try_take(tokens)):
+            self.release()
+            return await first
+        with self._lock:
+            self.counters.hedged += 1
+        count("bedrock_hedged")
+        second = self._submit(fn, kwargs)
+        pending = {first, second}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None or not pending:
+                    if task is second:
+                        with self._lock:
+                            self.counters.hedge_wins += 1
+                    # The loser keeps its slot until its thread finishes (see _submit)
+                    for other in pending:
+                        other.add_done_callback(lambda t: t.cancelled() or t.exception())
+                    return task.result()
+
+    async def stream(self, fn: Callable, kwargs: Dict, purpose: str = "general", tokens: int = 0) -> AsyncIterator:
+        """Admission-controlled stream_blocking; a throttle or transient fault before the first item is retried."""
+        priority = PRIORITIES.get(purpose, 1)
+        delays = backoff_delays(self.retries + 1, base_delay=0.2, max_delay=2.0)
+        while True:
+            await self._wait_for_buckets(priority, tokens)
+            await self.acquire(priority)
+            started = time.perf_counter()
+            yielded = False
+            try:
+                async for item in stream_blocking(fn, **kwargs):
+                    yielded = True
+                    yield item
+            except (ClientError, BotoCoreError) as e:
+                delay = None if yielded else self._retry_delay(e, delays)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            finally:
+                self.release()
+            self._on_success(purpose, time.perf_counter() - started)
+            return
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {**asdict(self.counters), "limit": round(self.limit, 2), "inflight": self.inflight,
+                    "waiting": len(self._waiters), "workers": self.workers}
+
+# Full account quotas until run_worker learns how many supervised processes share them
+governor = BedrockGovernor(
+    requests_per_minute=settings.BEDROCK_REQUESTS_PER_MINUTE,
+    tokens_per_minute=settings.BEDROCK_TOKENS_PER_MINUTE,
+    initial_limit=settings.BEDROCK_CONCURRENCY_INITIAL,
+    max_limit=settings.BEDROCK_CONCURRENCY_MAX,
+    retries=settings.BEDROCK_THROTTLE_RETRIES,
+    hedge=settings.BEDROCK_HEDGE_ENABLED,
+    hedge_percentile=settings.BEDROCK_HEDGE_PERCENTILE,
+)
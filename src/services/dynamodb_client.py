@@ -0,0 +1,59 @@
+# src/services/dynamodb_client.py
+from typing import Dict, List, Optional
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from .aws_executor import LazyClient, run_blocking
+
+# Low-level client: unlike boto3 resources it is safe to share across the pool threads
+client = LazyClient('dynamodb')
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+def serialize(item: Dict) -> Dict:
+    return {k: _serializer.serialize(v) for k, v in item.items()}
+
+def deserialize(item: Dict) -> Dict:
+    return {k: _deserializer.deserialize(v) for k, v in item.items()}
+
+async def get_item(table: str, key: Dict) -> Optional[Dict]:
+    response = await run_blocking(client.get_item, TableName=table, Key=serialize(key))
+    item = response.get("Item")
+    return deserialize(item) if item else None
+
+async def update_item(table: str, key: Dict, update_expression: str, values: Dict) -> Dict:
+    return await run_blocking(
+        client.update_item,
+        TableName=table,
+        Key=serialize(key),
+        UpdateExpression=update_expression,
+        ExpressionAttributeValues=serialize(values),
+    )
+
+async def put_item(table: str, item: Dict) -> Dict:
+    return await run_blocking(client.put_item, TableName=table, Item=serialize(item))
+
+async def query(table: str, key_condition: str, values: Dict, limit: int, newest_first: bool = False) -> List[Dict]:
+    """Paginated query that stops once `limit` items have been collected."""
+    items: List[Dict] = []
+    kwargs = {
+        "TableName": table,
+        "KeyConditionExpression": key_condition,
+        "ExpressionAttributeValues": serialize(values),
+        "ScanIndexForward": not newest_first,
+    }
+    while len(items) < limit:
+        response = await run_blocking(client.query, Limit=limit - len(items), **kwargs)
+        items.extend(deserialize(i) for i in response.get("Items", []))
+        if "LastEvaluatedKey" not in response:
+            break
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+    return items
+
+async def batch_write(table: str, puts: List[Dict] = (), delete_keys: List[Dict] = ()) -> List[Dict]:
+    """One BatchWriteItem call (max 25 requests). Returns the raw UnprocessedItems requests for the table."""
+    requests = [{"PutRequest": {"Item": serialize(i)}} for i in puts]
+    requests += [{"DeleteRequest": {"Key": serialize(k)}} for k in delete_keys]
+    if not requests:
+        return []
+    response = await run_blocking(client.batch_write_item, RequestItems={table: requests})
+    return response.get("UnprocessedItems", {}).get(table, [])
@@ -0,0 +1,66 @@
+# src/services/redis_client.py
+"""
+Optional Redis tier for the session store, shared by the workers of a host.
+
+SESSION_REDIS_URL selects it: empty disables the tier, "local://" uses the
+in-process LocalRedis stand-in (tests, benchmark, single-process runs), any
+other URL needs the `redis` package. The synchronous client is used through
+the AWS I/O pool: its connection pool is thread-safe, where an asyncio client
+would be bound to one room's event loop.
+"""
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from .aws_executor import run_blocking
+from ..utils.env import settings
+from ..utils.logger import log
+
+try:
+    import redis
+except ImportError:  # optional: only needed for a real Redis URL
+    redis = None
+
+class LocalRedis:
+    """get/set/delete with expiry, in process memory."""
+
+    def __init__(self):
+        self._items: Dict[str, Tuple[float, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or (item[0] and item[0] < time.monotonic()):
+                self._items.pop(key, None)
+                return None
+            return item[1]
+
+    def set(self, key: str, value, ex: Optional[int] = None):
+        with self._lock:
+            self._items[key] = (time.monotonic() + ex if ex else 0.0, value.encode() if isinstance(value, str) else value)
+        return True
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            return sum(self._items.pop(key, None) is not None for key in keys)
+
+def connect(url: str):
+    if not url:
+        return None
+    if url.startswith("local://"):
+        return LocalRedis()
+    if redis is None:
+        log.warning("SESSION_REDIS_URL is set but the redis package is not installed; Redis tier disabled")
+        return None
+    return redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+client = connect(settings.SESSION_REDIS_URL)
+
+async def get(key: str) -> Optional[bytes]:
+    return await run_blocking(client.get, key)
+
+async def put(key: str, value: str, ttl_seconds: int):
+    await run_blocking(client.set, key, value, ex=ttl_seconds)
+
+async def delete(key: str):
+    await run_blocking(client.delete, key)
@@ -0,0 +1,176 @@
+# src/services/write_behind.py
+import asyncio
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional
+from . import dynamodb_client
+from ..utils.logger import log
+from ..utils.retry import backoff_delays, retry_async
+
+class WriteBehindQueue:
+    """Write-behind buffer for DynamoDB puts, bound to the event loop it is used on.
+
+    Items from every room go into one FIFO and are written with BatchWriteItem
+    when a batch fills up or `flush_interval` has passed since the first queued
+    item. A single flusher writes batches in FIFO order and finishes retrying a
+    batch's unprocessed items before starting the next, so a room's turn never
+    lands ahead of an earlier batch; within a batch the sort key carries order.
+    """
+
+    def __init__(self, table: str, max_batch: int = 25, flush_interval: float = 0.25, attempts: int = 5):
+        self.table = table
+        self.max_batch = min(max_batch, 25)  # BatchWriteItem hard limit
+        self.flush_interval = flush_interval
+        self.attempts = attempts
+        self.written = 0
+        self.dropped = 0
+        self._pending: Deque[Dict] = deque()
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._force = False
+        self._closing = False
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def enqueue(self, item: Dict):
+        if self._closing:
+            raise RuntimeError("write-behind queue is draining")
+        self._pending.append(item)
+        self._idle.clear()
+        if len(self._pending) == 1 or len(self._pending) >= self.max_batch:
+            self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def flush(self):
+        """Write everything queued so far without waiting for the timer."""
+        if not self._pending and self._idle.is_set():
+            return
+        self._force = True
+        self._wakeup.set()
+        await self._idle.wait()
+
+    async def drain(self, timeout: float = 10.0):
+        """Stop accepting items and flush the rest; call on shutdown."""
+        self._closing = True
+        self._wakeup.set()
+        if self._task is not None and not self._task.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(self._task), timeout)
+            except asyncio.TimeoutError:
+                log.error("Write-behind drain timed out", pending=len(self._pending))
+        log.info("Write-behind queue drained", written=self.written, dropped=self.dropped)
+
+    async def _run(self):
+        while True:
+            if not self._pending:
+                self._force = False
+                self._idle.set()
+                if self._closing:
+                    return
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            if len(self._pending) < self.max_batch and not (self._closing or self._force):
+                # Give the batch up to flush_interval to fill
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            batch = [self._pending.popleft() for _ in range(min(self.max_batch, len(self._pending)))]
+            try:
+                await self._write(batch)
+                self.written += len(batch)
+            except Exception as e:
+                self.dropped += len(batch)
+                log.error("Write-behind batch failed", table=self.table, count=len(batch), error=str(e))
+
+    async def _write(self, items: List[Dict]):
+        delays = backoff_delays(self.attempts)
+        while True:
+            unprocessed = await retry_async(dynamodb_client.batch_write, self.table, puts=items, attempts=self.attempts)
+            if not unprocessed:
+                return
+            # Throttled partitions come back as UnprocessedItems; resend just those before moving on
+            items = [dynamodb_client.deserialize(r["PutRequest"]["Item"]) for r in unprocessed]
+            delay = next(delays, None)
+            if delay is None:
+                raise RuntimeError(f"{len(items)} items still unprocessed after {self.attempts} attempts")
+            await asyncio.sleep(delay)
+
+class SharedWriteBehind:
+    """WriteBehindQueue interface shared by every room of the process.
+
+    With the thread job executor each room runs on its own event loop, and
+    asyncio events and tasks cannot cross loops. One WriteBehindQueue
+    therefore lives on a background loop (thread "write-behind"), started on
+    first use. Rooms hand it items with call_soon_threadsafe, so turns from
+    all rooms are batched together in the order they were enqueued.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._args, self._kwargs = args, kwargs
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[WriteBehindQueue] = None
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def _start(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                self._queue = WriteBehindQueue(*self._args, **self._kwargs)
+                self._thread = threading.Thread(target=loop.run_forever, name="write-behind", daemon=True)
+                self._thread.start()
+                self._loop = loop
+            return self._loop
+
+    def _call(self, coro_fn) -> "asyncio.Future":
+        """Run coro_fn() on the background loop; a future the calling loop can await."""
+        return asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro_fn(), self._start()))
+
+    def __len__(self):
+        return len(self._queue) if self._queue is not None else 0
+
+    @property
+    def written(self) -> int:
+        return self._queue.written if self._queue is not None else 0
+
+    @property
+    def dropped(self) -> int:
+        return self._queue.dropped if self._queue is not None else 0
+
+    def enqueue(self, item: Dict):
+        if self._closed:
+            raise RuntimeError("write-behind queue is closed")
+        self._start().call_soon_threadsafe(self._queue.enqueue, item)
+
+    async def flush(self):
+        """Write everything enqueued so far (by any room) without waiting for the timer."""
+        if self._loop is None:
+            return
+        await self._call(lambda: self._queue.flush())
+
+    async def drain(self, timeout: float = 10.0):
+        """Flush what is queued; call from a job's shutdown callback. Other rooms keep enqueueing."""
+        if self._loop is None:
+            return
+        try:
+            await asyncio.wait_for(self.flush(), timeout)
+        except asyncio.TimeoutError:
+            log.error("Write-behind drain timed out", pending=len(self))
+
+    def close(self, timeout: float = 10.0):
+        """Write the rest and stop the background loop; call once when the worker process exits."""
+        with self._lock:
+            loop, self._closed = self._loop, True
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._queue.drain(timeout), loop).result(timeout + 1)
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join(timeout)
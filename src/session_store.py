@@ -0,0 +1,256 @@
+# src/session_store.py
+"""
+Two-tier store of per-room conversation state.
+
+A room's state is its summary line plus a ring buffer of the last
+HISTORY_TURN_LIMIT turns as slotted TurnRecords. Tiers, fastest first:
+
+  - an in-process LRU (SESSION_CACHE_ROOMS rooms, SESSION_CACHE_TTL_SECONDS),
+    shared by every room of the worker: a reconnect, or a second participant
+    joining the same room, gets the state from memory,
+  - optional Redis (SESSION_REDIS_URL, see src/services/redis_client.py), shared
+    by the workers of a host, so a room that moves to another worker skips
+    DynamoDB too,
+  - DynamoDB via load_history().
+
+save_turn() records every turn here as well as in DynamoDB, so cached state
+stays current; Redis copies are rewritten off the response path. Records keep
+the query features of user turns, so the ChatHistory built from them is not
+re-normalized either.
+"""
+import asyncio
+import json
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from typing import Deque, Dict, Iterable, List, Optional
+from .models.chat_message import ChatHistory
+from .query_normalizer import QueryFeatures, analyze
+from .services import redis_client
+from .utils.env import settings
+from .utils.logger import log
+from .utils.tracing import count, span
+
+REDIS_KEY = "session:{room_id}"
+WIRE_VERSION = 1
+
+class TurnRecord:
+    __slots__ = ("role", "text", "timestamp", "partial", "features")
+
+    def __init__(self, role: str, text: str, timestamp: Optional[str] = None, partial: bool = False,
+                 features: Optional[QueryFeatures] = None):
+        self.role = role
+        self.text = text
+        self.timestamp = timestamp
+        self.partial = partial
+        self.features = features
+
+    def entry(self) -> Dict:
+        """The record as a ChatHistory entry; user features are computed once and kept on the record."""
+        entry = {"role": self.role, "content": self.text}
+        if self.role == "user":
+            if self.features is None:
+                self.features = analyze(self.text)
+            entry["features"] = self.features
+        if self.partial:
+            entry["partial"] = True
+        return entry
+
+class SessionState:
+    __slots__ = ("room_id", "summary", "turns", "updated_at")
+
+    def __init__(self, room_id: str, summary: str = "", turns: Iterable[TurnRecord] = (), max_turns: int = 20):
+        self.room_id = room_id
+        self.summary = summary  # system message text, "" when the room has none
+        self.turns: Deque[TurnRecord] = deque(turns, maxlen=max_turns)
+        self.updated_at = time.monotonic()
+
+    @classmethod
+    def from_messages(cls, room_id: str, messages: List[Dict], max_turns: int) -> "SessionState":
+        """Build from load_history() output: an optional leading system summary, then turns oldest first."""
+        summary = messages[0]["text"] if messages and messages[0]["role"] == "system" else ""
+        turns = (TurnRecord(m["role"], m["text"], m.get("timestamp"), bool(m.get("partial")))
+                 for m in messages if m["role"] != "system")
+        return cls(room_id, summary, turns, max_turns)
+
+    def record(self, turn: TurnRecord):
+        self.turns.append(turn)
+        self.updated_at = time.monotonic()
+
+    def history(self, max_entries: Optional[int] = None) -> ChatHistory:
+        entries = [{"role": "system", "content": self.summary}] if self.summary else []
+        entries.extend(turn.entry() for turn in self.turns)
+        return ChatHistory(entries, max_entries=max_entries)
+
+    def to_wire(self) -> str:
+        return json.dumps({
+            "v": WIRE_VERSION,
+            "summary": self.summary,
+            "turns": [[t.role, t.text, t.timestamp, t.partial] for t in self.turns],
+        }, separators=(",", ":"))
+
+    @classmethod
+    def from_wire(cls, room_id: str, raw, max_turns: int) -> Optional["SessionState"]:
+        data = json.loads(raw)
+        if data.get("v") != WIRE_VERSION:
+            return None
+        return cls(room_id, data["summary"], (TurnRecord(*t) for t in data["turns"]), max_turns)
+
+class SessionStore:
+    def __init__(self, max_rooms: int = 500, ttl_seconds: float = 1800, max_turns: int = 20, redis_ttl_seconds: int = 86400):
+        self.max_rooms = max_rooms
+        self.ttl_seconds = ttl_seconds
+        self.max_turns = max_turns
+        self.redis_ttl_seconds = redis_ttl_seconds
+        # Shared by the rooms (threads) of a worker process: guards the LRU, the load and publish
+        # bookkeeping, the hit counts and the turns of cached states
+        self._lock = threading.Lock()
+        self._rooms: "OrderedDict[str, SessionState]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+        self._publishing: Dict[str, Optional[SessionState]] = {}  # room -> newer state to write once the running write ends
+        self.hits: Counter = Counter()  # by tier: memory / redis / dynamodb
+
+    def _cached(self, room_id: str) -> Optional[SessionState]:
+        with self._lock:
+            state = self._rooms.get(room_id)
+            if state is None:
+                return None
+            if time.monotonic() - state.updated_at > self.ttl_seconds:
+                del self._rooms[room_id]
+                return None
+            self._rooms.move_to_end(room_id)
+            return state
+
+    def _remember(self, state: SessionState):
+        with self._lock:
+            self._rooms[state.room_id] = state
+            self._rooms.move_to_end(state.room_id)
+            while len(self._rooms) > self.max_rooms:
+                self._rooms.popitem(last=False)
+
+    async def get(self, room_id: str) -> SessionState:
+        """The room's state from the fastest tier that has it; concurrent loads of one room share one fetch."""
+        state = self._cached(room_id)
+        if state is not None:
+            self._hit("memory")
+            return state
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            pending = self._loading.get(room_id)
+            if pending is None or pending.get_loop() is not loop:
+                future = self._loading[room_id] = loop.create_future()
+                pending = None
+        if pending is not None:
+            return await asyncio.shield(pending)
+        try:
+            state = await self._load(room_id)
+            self._remember(state)
+            future.set_result(state)
+            return state
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # retrieved: a load nobody else awaited is not "never retrieved"
+            raise
+        finally:
+            with self._lock:
+                if self._loading.get(room_id) is future:
+                    del self._loading[room_id]
+
+    async def _load(self, room_id: str) -> SessionState:
+        if redis_client.client is not None:
+            try:
+                with span("redis", op="get_session", room_id=room_id):
+                    raw = await redis_client.get(REDIS_KEY.format(room_id=room_id))
+                state = SessionState.from_wire(room_id, raw, self.max_turns) if raw else None
+                if state is not None:
+                    self._hit("redis")
+                    return state
+            except Exception as e:
+                log.warning("Redis session read failed, falling back to DynamoDB", room_id=room_id, error=str(e))
+        from .dynamodb_logger import load_history  # lazy: dynamodb_logger records into this store
+        state = SessionState.from_messages(room_id, await load_history(room_id, self.max_turns), self.max_turns)
+        self._hit("dynamodb")
+        self._publish(state)
+        return state
+
+    def _hit(self, tier: str):
+        with self._lock:
+            self.hits[tier] += 1
+        count(f"session_{tier}_hit")
+
+    def record(self, room_id: str, role: str, text: str, timestamp: Optional[str] = None, partial: bool = False):
+        """Add a saved turn to the room's cached state, if this worker holds it."""
+        state = self._cached(room_id)
+        if state is None:
+            # Another tier's copy would now miss this turn; the next load goes to DynamoDB
+            self._invalidate(room_id)
+            return
+        with self._lock:
+            state.record(TurnRecord(role, text, timestamp, partial))
+        self._publish(state)
+
+    def set_summary(self, room_id: str, summary: str):
+        state = self._cached(room_id)
+        if state is not None:
+            with self._lock:
+                state.summary = summary
+            self._publish(state)
+
+    def drop_room(self, room_id: str):
+        with self._lock:
+            self._rooms.pop(room_id, None)
+        self._invalidate(room_id)
+
+    # ---- Redis tier ----
+    def _publish(self, state: SessionState):
+        if redis_client.client is None:
+            return
+        with self._lock:
+            if state.room_id in self._publishing:
+                self._publishing[state.room_id] = state  # the running write goes round again
+                return
+            self._publishing[state.room_id] = None
+        asyncio.get_running_loop().create_task(self._write(state))
+
+    async def _write(self, state: SessionState):
+        # One write in flight per room, so an older copy can never land after a newer one
+        room_id = state.room_id
+        done = False
+        try:
+            while not done:
+                with self._lock:
+                    wire = state.to_wire()
+                await redis_client.put(REDIS_KEY.format(room_id=room_id), wire, self.redis_ttl_seconds)
+                with self._lock:
+                    # Checked and released in one step, so a change published meanwhile is never lost
+                    state = self._publishing[room_id]
+                    done = state is None
+                    if done:
+                        del self._publishing[room_id]
+                    else:
+                        self._publishing[room_id] = None
+        except Exception as e:
+            log.warning("Redis session write failed", room_id=room_id, error=str(e))
+        finally:
+            if not done:
+                with self._lock:
+                    self._publishing.pop(room_id, None)
+
+    def _invalidate(self, room_id: str):
+        if redis_client.client is None:
+            return
+        try:
+            asyncio.get_running_loop().create_task(redis_client.delete(REDIS_KEY.format(room_id=room_id)))
+        except RuntimeError:  # no running loop: nothing to clean up from here
+            pass
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"rooms": len(self._rooms), **{f"{tier}_hits": n for tier, n in self.hits.items()}}
+
+sessions = SessionStore(
+    max_rooms=settings.SESSION_CACHE_ROOMS,
+    ttl_seconds=settings.SESSION_CACHE_TTL_SECONDS,
+    max_turns=settings.HISTORY_TURN_LIMIT,
+    redis_ttl_seconds=settings.SESSION_REDIS_TTL_SECONDS,
+)
@@ -0,0 +1,112 @@
+# src/speculation.py
+"""
+Speculative dispatch support: guess the answer handler before the LLM
+classifier returns, and keep per-room win/loss/spend counters (logged with
+each speculative turn; the process-wide totals are exported as the
+`speculation_hit`/`speculation_miss` events and the `speculation_saved`/
+`speculation_wasted` stages, labelled with the guessed intent).
+"""
+import asyncio
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import AsyncIterator, Dict, List, Optional
+from .intent_router import get_router
+from .utils.env import settings
+
+SPECULATABLE = ("rag", "smart_ai_assistant")
+MAX_TRACKED_ROOMS = 1000
+
+@dataclass
+class SpeculationStats:
+    turns: int = 0
+    attempts: int = 0
+    wins: int = 0
+    losses: int = 0
+    wasted_bedrock_calls: int = 0   # speculative handler calls that were discarded
+    wasted_seconds: float = 0.0     # Bedrock time spent on discarded branches
+    saved_seconds: float = 0.0      # classifier latency hidden on wins
+
+    @property
+    def win_rate(self) -> float:
+        return self.wins / self.attempts if self.attempts else 0.0
+
+    @property
+    def extra_spend_ratio(self) -> float:
+        """Extra Bedrock handler calls per speculated turn."""
+        return self.wasted_bedrock_calls / self.attempts if self.attempts else 0.0
+
+    def as_dict(self) -> Dict:
+        return {**asdict(self), "win_rate": round(self.win_rate, 3), "extra_spend_ratio": round(self.extra_spend_ratio, 3)}
+
+_stats: "OrderedDict[str, SpeculationStats]" = OrderedDict()
+_stats_lock = threading.Lock()
+
+def stats_for(room_id: Optional[str]) -> SpeculationStats:
+    key = room_id or "_default"
+    with _stats_lock:
+        if key in _stats:
+            _stats.move_to_end(key)
+            return _stats[key]
+        stats = _stats[key] = SpeculationStats()
+        if len(_stats) > MAX_TRACKED_ROOMS:
+            _stats.popitem(last=False)
+        return stats
+
+def predict_handler(message: str, chat_history: List[Dict]) -> Optional[str]:
+    """Most likely answer handler, or None when speculating would not help.
+
+    No speculation when the local router is already confident (the classifier
+    returns instantly) or when the best guess is a greeting.
+    """
+    router = get_router(settings.INTENT_ROUTER_MODEL_PATH, settings.INTENT_ROUTER_THRESHOLD)
+    routed = router.route(message, chat_history)
+    if settings.INTENT_ROUTER_ENABLED and router.is_confident(routed):
+        return None
+    if routed.source == "defer":
+        # Referential follow-up: the classifier usually keeps the previous intent
+        for entry in reversed(chat_history):
+            if entry.get('role') == 'user' and entry.get('intent'):
+                return entry['intent'] if entry['intent'] in SPECULATABLE else None
+        return None
+    proba = router.model.predict_proba(message)
+    return max(SPECULATABLE, key=lambda intent: proba.get(intent, 0.0))
+
+_END = object()
+
+class PrefetchedStream:
+    """Starts consuming an async iterator immediately and buffers it until someone iterates."""
+
+    def __init__(self, source: AsyncIterator[str]):
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._error: Optional[BaseException] = None
+        self._task = asyncio.create_task(self._pump(source))
+
+    async def _pump(self, source: AsyncIterator[str]):
+        try:
+            async for item in source:
+                self._queue.put_nowait(item)
+        except Exception as e:
+            self._error = e
+        finally:
+            self._queue.put_nowait(_END)
+            # A cancelled pump leaves the source suspended; close it now so its Bedrock stream stops
+            aclose = getattr(source, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    def cancel(self):
+        self._task.cancel()
+
+    async def __aiter__(self):
+        try:
+            while True:
+                item = await self._queue.get()
+                if item is _END:
+                    if self._error:
+                        raise self._error
+                    return
+                yield item
+        finally:
+            # The consumer was cancelled or stopped iterating: nobody will read the rest
+            self._task.cancel()
@@ -0,0 +1,169 @@
+# src/startup.py
+"""
+Worker start-up: prewarm and connection keepalive.
+
+prewarm() runs once per process before it takes jobs. src/worker_pool.py calls
+it on the worker's main thread before the worker registers with LiveKit, and
+again from LiveKit's prewarm hook, where it only does work if the job runs in a
+fresh process. It
+
+  - imports the LiveKit STT/TTS plugins (they must register on the main thread),
+  - creates the boto3 clients, the intent router and the cached prompt prefixes,
+    and loads the response bank's pre-synthesized audio,
+  - sends STARTUP_WARMUP_CONNECTIONS concurrent read-only requests each to the
+    Bedrock runtime, the knowledge-base runtime and DynamoDB, so TLS handshakes
+    are done and the connection pools hold open sockets before the first caller,
+  - with AWS_KEEPALIVE_SECONDS set (off by default), starts a keepalive thread
+    that pings a service once it has been idle that long, before the server
+    side closes the idle connections.
+
+The pings are list/describe calls on the same endpoints the turns use
+(ListAsyncInvokes, ListSessions, DescribeTable): no model runs and no quota
+is spent, so they need no admission through the Bedrock governor. An error
+response still completes the round trip and leaves the connection warm.
+
+Every phase is timed (the `startup_*` / `warmup_*` stages) and the totals are
+logged when the worker is ready.
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional, Tuple
+from botocore.exceptions import ClientError
+from .prompt_builder import system_segment
+from .services import bedrock_client, dynamodb_client
+from .utils.env import settings
+from .utils.logger import log
+from .utils.tracing import span
+
+_lock = threading.Lock()
+_timings: Dict[str, float] = {}
+_prewarmed = False
+_plugins: Optional[Tuple[type, type]] = None
+_keepalive: Optional[threading.Thread] = None
+
+def process_age() -> Optional[float]:
+    """Seconds since this process started (Linux): interpreter start-up plus every import so far."""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return max(uptime - start_ticks / os.sysconf("SC_CLK_TCK"), 0.0)
+
+def _timed(phase: str, fn: Callable, *args):
+    with span(f"startup_{phase}") as s:
+        result = fn(*args)
+    _timings[phase] = round(s.elapsed, 3)
+    return result
+
+def load_plugins() -> Tuple[type, type]:
+    """(STT, TTS) plugin classes, imported on first call; call it on the main thread first."""
+    global _plugins
+    if _plugins is None:
+        def load():
+            from livekit.plugins.deepgram import STT
+            from livekit.plugins.elevenlabs import TTS
+            return STT, TTS
+        _plugins = _timed("plugins", load)
+    return _plugins
+
+def _build_clients():
+    for client in (bedrock_client.runtime, bedrock_client.agent_runtime, bedrock_client.kb_admin, dynamodb_client.client):
+        if hasattr(client, "resolve"):
+            client.resolve()
+
+def _build_models():
+    from .intent_router import get_router
+    from .rag_tool import INTENT_SYSTEM_PROMPT
+    from .response_bank import response_bank
+    get_router(settings.INTENT_ROUTER_MODEL_PATH, settings.INTENT_ROUTER_THRESHOLD)
+    system_segment(INTENT_SYSTEM_PROMPT)
+    response_bank.load()
+
+def _ping_bedrock():
+    bedrock_client.runtime.list_async_invokes(maxResults=1)
+
+def _ping_kb():
+    bedrock_client.agent_runtime.list_sessions(maxResults=1)
+
+def _ping_dynamodb():
+    dynamodb_client.client.describe_table(TableName=settings.DYNAMODB_TURNS_TABLE)
+
+# A read-only request on each hot-path endpoint; none of them invokes a model
+PINGS: Dict[str, Tuple[Callable[[], object], Callable[[], None]]] = {
+    "bedrock": (lambda: bedrock_client.runtime, _ping_bedrock),
+    "kb": (lambda: bedrock_client.agent_runtime, _ping_kb),
+    "dynamodb": (lambda: dynamodb_client.client, _ping_dynamodb),
+}
+
+def _ping(service: str) -> bool:
+    with span(f"warmup_{service}") as s:
+        try:
+            PINGS[service][1]()
+        except ClientError as e:
+            # An error response (e.g. AccessDenied without the list permission) still opened the connection
+            log.warning("Warm-up request rejected", service=service, error=str(e))
+        except Exception as e:
+            log.warning("Warm-up request failed", service=service, error=str(e))
+            return False
+    _timings[f"warmup_{service}"] = max(_timings.get(f"warmup_{service}", 0.0), round(s.elapsed, 3))
+    return True
+
+def warm_up(connections: int, timeout: float) -> Dict[str, int]:
+    """Open `connections` pooled connections per service with concurrent pings; successes per service."""
+    ok: Dict[str, int] = {service: 0 for service in PINGS}
+    pool = ThreadPoolExecutor(max_workers=len(PINGS) * connections, thread_name_prefix="warmup")
+    futures = {pool.submit(_ping, service): service for service in PINGS for _ in range(connections)}
+    done, not_done = wait(futures, timeout=timeout)
+    for future in done:
+        ok[futures[future]] += int(future.result())
+    if not_done:
+        log.warning("Warm-up still running at timeout, continuing start-up", pending=len(not_done))
+    pool.shutdown(wait=False)
+    return ok
+
+def _keepalive_loop(interval: float):
+    while True:
+        time.sleep(interval / 2)
+        now = time.monotonic()
+        for service, (client, _) in PINGS.items():
+            last_used = getattr(client(), "last_used", None)
+            if last_used is not None and now - last_used >= interval:
+                _ping(service)
+
+def start_keepalive(interval: float):
+    global _keepalive
+    if interval <= 0 or _keepalive is not None:
+        return
+    _keepalive = threading.Thread(target=_keepalive_loop, args=(interval,), name="aws-keepalive", daemon=True)
+    _keepalive.start()
+
+def prewarm():
+    """Idempotent per-process warm start; see the module docstring."""
+    global _prewarmed
+    with _lock:
+        if _prewarmed:
+            return
+        started = time.perf_counter()
+        age = process_age()
+        if age is not None:
+            _timings["imports"] = round(age, 3)  # interpreter start-up and module imports before prewarm
+        if threading.current_thread() is threading.main_thread():
+            load_plugins()
+        _timed("clients", _build_clients)
+        _timed("models", _build_models)
+        if settings.STARTUP_WARMUP:
+            connected = _timed("warmup", warm_up, settings.STARTUP_WARMUP_CONNECTIONS, settings.STARTUP_WARMUP_TIMEOUT)
+            log.info("AWS connections warmed", connections=connected)
+        start_keepalive(settings.AWS_KEEPALIVE_SECONDS)
+        _timings["prewarm"] = round(time.perf_counter() - started, 3)
+        _prewarmed = True
+
+def timings() -> Dict[str, float]:
+    """Start-up phase durations in seconds, plus the process age (imports included) at the time of the call."""
+    age = process_age()
+    return {**_timings, **({"process_age": round(age, 3)} if age is not None else {})}
@@ -0,0 +1,73 @@
+# src/turn_manager.py
+"""
+Per-room turn supersession for barge-in.
+
+A room runs at most one turn at a time. When the caller speaks again while a
+turn is still classifying, retrieving, generating or speaking, the new turn
+supersedes it: the old task is cancelled and its speech interrupted before the
+new one starts. Cancelling abandons pending Bedrock awaits and closes streamed
+responses (stream_blocking stops reading the event stream), so a busy room stops
+holding pool threads and Bedrock concurrency for answers nobody will hear.
+A unary InvokeModel already running on a pool thread still finishes, but its
+result is dropped.
+
+The cancelled turn is responsible for recording what it had said as a partial
+assistant turn (see src/agent.py); start() waits briefly for that so memory
+stays in order. start() calls are serialized: a transcript that arrives while
+an earlier start() is still waiting waits its turn, then supersedes the turn
+that one started, so only the newest turn ever runs.
+"""
+import asyncio
+from typing import Awaitable, Optional
+from .utils.logger import log
+from .utils.tracing import count
+
+class RoomTurns:
+    def __init__(self, room_id: str, settle_timeout: float = 1.0):
+        self.room_id = room_id
+        self.settle_timeout = settle_timeout
+        self.superseded = 0
+        self._task: Optional[asyncio.Task] = None
+        self._speech = None
+        self._starting = asyncio.Lock()
+
+    @property
+    def busy(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def set_speech(self, handle):
+        """Register the SpeechHandle of the running turn so a barge-in can interrupt it."""
+        self._speech = handle
+
+    async def supersede(self) -> bool:
+        """Cancel the turn in flight (if any) and interrupt its speech; True if one was cancelled."""
+        task, speech = self._task, self._speech
+        self._task = self._speech = None
+        if speech is not None and not speech.done():
+            speech.interrupt()
+        if task is None or task.done():
+            return False
+        task.cancel()
+        self.superseded += 1
+        count("turn_superseded")
+        log.info("Turn superseded by barge-in", room_id=self.room_id, superseded=self.superseded)
+        # Let the cancelled turn record its partial answer before the new turn writes anything
+        await asyncio.wait({task}, timeout=self.settle_timeout)
+        return True
+
+    async def start(self, turn: Awaitable) -> asyncio.Task:
+        """Supersede the running turn, then run `turn` as the room's current one."""
+        try:
+            async with self._starting:
+                await self.supersede()
+                task = self._task = asyncio.ensure_future(turn)
+        except asyncio.CancelledError:
+            if asyncio.iscoroutine(turn):
+                turn.close()  # never started
+            raise
+        task.add_done_callback(self._log_failure)
+        return task
+
+    def _log_failure(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            log.error("Turn failed", room_id=self.room_id, error=str(task.exception()))
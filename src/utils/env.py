@@ -10,13 +10,108 @@ class Settings(BaseSettings):
     BEDROCK_MODEL_ID: str = "meta.llama3-8b-instruct-v1:0"
     BEDROCK_KB_ID: str
 
-    DYNAMODB_TABLE: str = "VoiceAgentSessions"
+    DYNAMODB_TABLE: str = "VoiceAgentSessions"  # legacy one-item-per-room layout, see scripts/migrate_dynamodb.py
+    DYNAMODB_TURNS_TABLE: str = "VoiceAgentTurns"  # room_id (HASH) + sk (RANGE), one item per turn
+    HISTORY_TURN_LIMIT: int = 20  # turns loaded on (re)connect
+    HISTORY_COMPACT_EVERY: int = 40  # saved turns per room between summary roll-ups
+    WRITE_BEHIND_ENABLED: bool = True  # batch turn writes off the response path
+    WRITE_BEHIND_MAX_BATCH: int = 25
+    WRITE_BEHIND_FLUSH_SECONDS: float = 0.25
+
+    # Session store (src/session_store.py): in-process LRU of room state, optional Redis tier
+    SESSION_CACHE_ROOMS: int = 500
+    SESSION_CACHE_TTL_SECONDS: float = 1800
+    SESSION_HISTORY_ENTRIES: int = 60  # cap on a connection's live chat history
+    SESSION_REDIS_URL: str = ""  # "" disables, "local://" uses the in-process stand-in
+    SESSION_REDIS_TTL_SECONDS: int = 86400
 
     DEEPGRAM_API_KEY: str
     ELEVENLABS_API_KEY: str
     ELEVENLABS_VOICE_ID: str = "EXAVITQu4vr4xnSDxMaL"
 
     VAD_SILENCE_DURATION: float = 0.6
+    BARGE_IN_CANCEL: bool = True  # a new transcription cancels the room's turn in flight and its speech
+
+    # Early start (src/early_turn.py): classify/retrieve on stable interim transcripts before the final one
+    EARLY_START_ENABLED: bool = False  # opt-in: extra Bedrock calls for utterances that get revised
+    EARLY_START_MIN_WORDS: int = 3
+    EARLY_START_MAX_STARTS: int = 3  # per utterance; each may cost a classification and a KB retrieve
+
+    # Observability: Prometheus on METRICS_PORT (0 disables), optional OpenTelemetry spans
+    METRICS_PORT: int = 9100
+    METRICS_ROOM_LABEL: bool = False
+    OTEL_ENABLED: bool = False
+
+    # Shared AWS I/O pool (Bedrock + DynamoDB calls run here, off the event loop)
+    AWS_IO_MAX_WORKERS: int = 32
+
+    # Bedrock governor (src/services/bedrock_governor.py); account quotas are split across the running workers
+    BEDROCK_REQUESTS_PER_MINUTE: int = 800
+    BEDROCK_TOKENS_PER_MINUTE: int = 300000  # 0 disables the token bucket
+    BEDROCK_CONCURRENCY_INITIAL: int = 16  # AIMD start; adapts to throttling between 1 and the max
+    BEDROCK_CONCURRENCY_MAX: int = 64
+    BEDROCK_THROTTLE_RETRIES: int = 4
+    BEDROCK_HEDGE_ENABLED: bool = False  # duplicate unary calls slower than the percentile below
+    BEDROCK_HEDGE_PERCENTILE: float = 95
+
+    # Start-up (src/startup.py): warm AWS connections before taking jobs, keep idle ones open
+    STARTUP_WARMUP: bool = True
+    STARTUP_WARMUP_CONNECTIONS: int = 2  # concurrent warm-up requests (pooled connections) per service
+    STARTUP_WARMUP_TIMEOUT: float = 5.0
+    AWS_KEEPALIVE_SECONDS: float = 0  # opt-in: ping a service idle this long, e.g. 50 (0 disables)
+
+    # Worker pool (src/worker_pool.py): `start` runs WORKER_PROCESSES supervised agent servers
+    WORKER_PROCESSES: int = 1
+    WORKER_JOB_EXECUTOR: str = "thread"  # "thread" lets a worker's rooms share its caches; "process" isolates each job
+    WORKER_IDLE_JOBS: int = 2  # prewarmed job executors per worker
+    WORKER_HTTP_PORT: int = 8081  # health port of worker 0; worker i uses +i
+    WORKER_ROOM_AFFINITY: bool = True
+    WORKER_LOAD_THRESHOLD: float = 0.75  # dispatcher stops offering jobs to a worker above this load
+    WORKER_MAX_ROOMS: int = 20
+    WORKER_MAX_BEDROCK_INFLIGHT: int = 24
+    WORKER_MAX_LOOP_LAG_MS: float = 200
+
+    # Stream LLM tokens to TTS sentence by sentence instead of waiting for the full answer
+    STREAM_RESPONSES: bool = True
+
+    # Local intent router: answers confidently-classified turns without the Bedrock classifier
+    INTENT_ROUTER_ENABLED: bool = True
+    INTENT_ROUTER_THRESHOLD: float = 0.85
+    INTENT_ROUTER_MODEL_PATH: str = "models/intent_router.json"
+
+    # Start the likely answer handler while the LLM classifier is still running
+    SPECULATIVE_DISPATCH: bool = False
+
+    # Knowledge-base answer cache
+    RAG_CACHE_ENABLED: bool = True
+    RAG_CACHE_MAX_ENTRIES: int = 512
+    RAG_CACHE_TTL_SECONDS: float = 3600
+    RAG_CACHE_SEMANTIC: bool = False
+    RAG_CACHE_SIMILARITY: float = 0.92
+    RAG_CACHE_EMBED_MODEL_ID: str = "amazon.titan-embed-text-v2:0"
+    RAG_CACHE_KB_CHECK_SECONDS: float = 300
+
+    # "retrieve_and_generate" (one KB call) or "two_stage" (retrieve + local rerank + compact generation)
+    RAG_MODE: str = "retrieve_and_generate"
+    RAG_RETRIEVE_RESULTS: int = 20
+    RAG_CONTEXT_PASSAGES: int = 5
+    RAG_CONTEXT_CHARS: int = 3000
+
+    # Prompt assembly: token budgets (Llama 3 8B has an 8k context) and per-intent output caps
+    LLM_CONTEXT_TOKENS: int = 8192
+    PROMPT_HISTORY_TOKENS: int = 600
+    PROMPT_TOKENIZER_PATH: str = ""  # optional Llama 3 tokenizer.json; otherwise a local estimate is used
+    MAX_TOKENS_INTENT: int = 8
+    MAX_TOKENS_GREETING: int = 100
+    MAX_TOKENS_RAG: int = 220
+    MAX_TOKENS_SMART: int = 400
+
+    # Response bank (src/response_bank.py): canned greetings/fallbacks with audio pre-synthesized per voice
+    RESPONSE_BANK_ENABLED: bool = True
+    RESPONSE_BANK_PATH: str = "models/response_bank.json"  # optional override of the built-in replies
+    RESPONSE_AUDIO_DIR: str = "models/response_audio"
+    RESPONSE_AUDIO_SAMPLE_RATE: int = 24000
+    RESPONSE_BANK_TTS_MODEL: str = "eleven_flash_v2_5"  # used by scripts/refresh_response_bank.py
 
     class Config:
         env_file = ".env"
@@ -24,9 +119,7 @@ class Settings(BaseSettings):
 
 try:
     settings = Settings()
-    print("All environment variables loaded successfully!")
 except ValidationError as e:
-    print("Missing or invalid environment variables:")
-    for error in e.errors():
-        print(f"- {error['loc'][0]}: {error['msg']}")
-    raise SystemExit(1)
\ No newline at end of file
+    # Exit with the problems on stderr; stdout stays clean for scripts that print JSON
+    problems = "\n".join(f"- {error['loc'][0]}: {error['msg']}" for error in e.errors())
+    raise SystemExit(f"Missing or invalid environment variables:\n{problems}")
\ No newline at end of file
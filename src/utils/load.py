@@ -0,0 +1,68 @@
+# src/utils/load.py
+"""
+Load signals of this worker process, reported to the LiveKit dispatcher by
+src/worker_pool.py: active rooms, Bedrock calls in flight and event-loop lag.
+
+With the thread job executor every room runs on its own event loop inside the
+worker process, so the counters are guarded by a lock and lag is sampled per
+loop and kept over a short window (the worst recent stall is what a new room
+would compete with).
+"""
+import asyncio
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict
+
+class LoadTracker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rooms = 0
+        self.bedrock_inflight = 0
+        self._lag: Dict[int, Deque[float]] = {}  # id(loop) -> recent lag samples in seconds
+
+    def room_started(self):
+        with self._lock:
+            self.rooms += 1
+
+    def room_ended(self):
+        with self._lock:
+            self.rooms = max(self.rooms - 1, 0)
+
+    @contextmanager
+    def bedrock_call(self):
+        with self._lock:
+            self.bedrock_inflight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.bedrock_inflight -= 1
+
+    @property
+    def loop_lag(self) -> float:
+        with self._lock:
+            return max((max(samples) for samples in self._lag.values() if samples), default=0.0)
+
+    async def monitor_loop(self, interval: float = 0.5, window: int = 6):
+        """Sample how late the running loop wakes up from a sleep; run as a task for the loop's lifetime."""
+        loop = asyncio.get_running_loop()
+        key = id(loop)
+        samples: Deque[float] = deque(maxlen=window)
+        with self._lock:
+            self._lag[key] = samples
+        try:
+            while True:
+                start = loop.time()
+                await asyncio.sleep(interval)
+                lag = max(loop.time() - start - interval, 0.0)
+                with self._lock:
+                    samples.append(lag)
+        finally:
+            with self._lock:
+                self._lag.pop(key, None)
+
+    def snapshot(self) -> Dict:
+        return {"rooms": self.rooms, "bedrock_inflight": self.bedrock_inflight, "loop_lag_ms": round(self.loop_lag * 1000, 1)}
+
+load = LoadTracker()
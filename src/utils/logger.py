@@ -1,9 +1,18 @@
+import logging
+import os
 import structlog
 
+# LOG_LEVEL gates the per-turn DEBUG detail; filtered calls cost almost nothing
+LOG_LEVEL = getattr(logging, os.environ.get("LOG_LEVEL", "INFO").upper(), logging.INFO)
+
 structlog.configure(
     processors=[
+        structlog.processors.add_log_level,
+        structlog.processors.TimeStamper(fmt="iso"),
         structlog.processors.JSONRenderer()
-    ]
+    ],
+    wrapper_class=structlog.make_filtering_bound_logger(LOG_LEVEL),
+    cache_logger_on_first_use=True,
 )
 
-log = structlog.get_logger()
\ No newline at end of file
+log = structlog.get_logger()
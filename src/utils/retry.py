@@ -0,0 +1,57 @@
+# src/utils/retry.py
+import asyncio
+import random
+from typing import Callable, Iterator
+from botocore.exceptions import ClientError, HTTPClientError
+from botocore.exceptions import ConnectionError as BotoConnectionError
+from .logger import log
+
+# One classification for every AWS call: the Bedrock governor lowers its concurrency limit on throttles and
+# retries transient faults as-is, retry_async retries both. Anything else (ValidationException,
+# ResourceNotFoundException, ConditionalCheckFailedException, ...) fails the same way on every attempt.
+# ServiceUnavailable / ModelNotReady are capacity signals from Bedrock, so they count as throttles.
+THROTTLE_CODES = {"ThrottlingException", "TooManyRequestsException", "ServiceQuotaExceededException",
+                  "ProvisionedThroughputExceededException", "RequestLimitExceeded", "SlowDown",
+                  "ServiceUnavailableException", "ServiceUnavailable", "ModelNotReadyException"}
+TRANSIENT_CODES = {"InternalServerException", "InternalServerError", "ModelStreamErrorException",
+                   "ModelTimeoutException", "ServiceException"}
+
+def error_code(error: BaseException) -> str:
+    return error.response.get("Error", {}).get("Code", "") if isinstance(error, ClientError) else ""
+
+def is_throttle(error: BaseException) -> bool:
+    return error_code(error) in THROTTLE_CODES
+
+def is_transient(error: BaseException) -> bool:
+    """A fault worth retrying that says nothing about capacity: 5xx, stream errors, connection resets, timeouts."""
+    if isinstance(error, ClientError):
+        code = error_code(error)
+        status = error.response.get("ResponseMetadata", {}).get("HTTPStatusCode") or 0
+        return code in TRANSIENT_CODES or (status >= 500 and code not in THROTTLE_CODES)
+    # ConnectionError covers endpoint/connect-timeout failures, HTTPClientError resets and read timeouts
+    return isinstance(error, (BotoConnectionError, HTTPClientError))
+
+def is_retryable(error: BaseException) -> bool:
+    """Throttles, 5xx and dropped connections / timeouts."""
+    return is_throttle(error) or is_transient(error)
+
+def backoff_delays(attempts: int, base_delay: float = 0.1, max_delay: float = 5.0) -> Iterator[float]:
+    """Exponential backoff with full jitter: one delay per retry (attempts - 1 values)."""
+    for attempt in range(attempts - 1):
+        yield random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+async def retry_async(fn, *args, attempts: int = 5, base_delay: float = 0.1, max_delay: float = 5.0,
+                      retryable: Callable[[BaseException], bool] = is_retryable, **kwargs):
+    """Await fn(*args, **kwargs), retrying errors `retryable` accepts with jittered exponential backoff."""
+    delays = backoff_delays(attempts, base_delay, max_delay)
+    while True:
+        try:
+            return await fn(*args, **kwargs)
+        except Exception as e:
+            if not retryable(e):
+                raise
+            delay = next(delays, None)
+            if delay is None:
+                raise
+            log.warning("Retrying after error", fn=getattr(fn, "__name__", str(fn)), error=str(e), delay=round(delay, 3))
+            await asyncio.sleep(delay)
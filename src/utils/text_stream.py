@@ -0,0 +1,115 @@
+# src/utils/text_stream.py
+import re
+from typing import AsyncIterator, Iterable, Optional
+
+# Sentence end: terminator followed by whitespace. "3.5" and "sparkout.com" never split.
+_SENTENCE_END = re.compile(r'[.!?]["\')\]]*\s+|\n+')
+_ABBREVIATIONS = ('mr.', 'mrs.', 'ms.', 'dr.', 'e.g.', 'i.e.', 'etc.', 'inc.', 'ltd.', 'pvt.', 'vs.', 'no.')
+
+def _split_point(buffer: str, min_chars: int) -> int:
+    """Index just past the first speakable sentence boundary at or after min_chars, or -1."""
+    for match in _SENTENCE_END.finditer(buffer):
+        end = match.end()
+        if end < min_chars:
+            continue
+        head = buffer[:match.start() + 1].lower()
+        if head.endswith(_ABBREVIATIONS):
+            continue
+        return end
+    return -1
+
+async def sentence_chunks(tokens: AsyncIterator[str], min_chars: int = 20, max_chars: int = 250) -> AsyncIterator[str]:
+    """Re-cut a token stream into speakable chunks for TTS.
+
+    Flushes at sentence boundaries once a chunk has at least min_chars; an
+    over-long run-on sentence is cut at the last comma/space before max_chars.
+    """
+    buffer = ""
+    async for token in tokens:
+        buffer += token
+        while True:
+            idx = _split_point(buffer, min_chars)
+            if idx == -1 and len(buffer) > max_chars:
+                cut = max(buffer.rfind(', ', 0, max_chars), buffer.rfind(' ', 0, max_chars))
+                idx = cut + 1 if cut > 0 else max_chars
+            if idx == -1:
+                break
+            chunk, buffer = buffer[:idx].strip(), buffer[idx:]
+            if chunk:
+                yield chunk
+    if buffer.strip():
+        yield buffer.strip()
+
+class MetaPhraseFilter:
+    """Incremental version of the RAG meta-phrase scrub.
+
+    Text is released only once it can no longer be the start of a meta phrase.
+    On the first phrase hit the answer is cut there, trailing punctuation is
+    replaced by a full stop and everything after it is dropped.
+    """
+
+    def __init__(self, phrases: Iterable[str], min_length: int = 10):
+        self.phrases = [p.lower() for p in phrases]
+        # Hold back enough to see a whole phrase plus the punctuation in front of it
+        self.holdback = max((len(p) for p in self.phrases), default=0) + 8
+        self.min_length = min_length
+        self.pending = ""
+        self.emitted = 0
+        self.truncated = False
+
+    def _capitalize(self, text: str) -> str:
+        if self.emitted == 0:
+            text = text.lstrip()
+            if text:
+                text = text[0].upper() + text[1:]
+        return text
+
+    def _trim(self, text: str) -> str:
+        # Leading whitespace only matters before the first emitted character; after that it separates words
+        return text.strip() if self.emitted == 0 else text.rstrip()
+
+    def feed(self, text: str) -> str:
+        if self.truncated:
+            return ""
+        self.pending += text
+        lower = self.pending.lower()
+        hits = [idx for idx in (lower.find(p) for p in self.phrases) if idx != -1]
+        if hits:
+            self.truncated = True
+            head = self._trim(re.sub(r'[.,;:]+$', '', self._trim(self.pending[:min(hits)])))
+            self.pending = head + '.' if head.strip() else ""
+            if self.emitted + len(self.pending) < self.min_length:
+                return ""  # finish() decides between this and the fallback
+            out, self.pending = self._capitalize(self.pending), ""
+            self.emitted += len(out)
+            return out
+        # Nothing is released until the answer is long enough not to need the fallback
+        release = len(self.pending) - self.holdback
+        if release <= 0 or self.emitted + release < self.min_length:
+            return ""
+        out, self.pending = self._capitalize(self.pending[:release]), self.pending[release:]
+        self.emitted += len(out)
+        return out
+
+    def finish(self) -> str:
+        out, self.pending = self._trim(self.pending), ""
+        if out and self.emitted == 0:
+            out = self._capitalize(out)
+        self.emitted += len(out)
+        return out
+
+async def scrub_stream(tokens: AsyncIterator[str], phrases: Iterable[str], fallback: Optional[str] = None,
+                       min_length: int = 10) -> AsyncIterator[str]:
+    """Apply MetaPhraseFilter to a token stream; emit fallback if the answer ends up too short."""
+    scrub = MetaPhraseFilter(phrases, min_length=min_length)
+    async for token in tokens:
+        out = scrub.feed(token)
+        if out:
+            yield out
+    tail = scrub.finish()
+    if scrub.emitted < min_length:
+        if fallback:
+            yield fallback
+        return
+    if tail:
+        yield tail
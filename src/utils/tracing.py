@@ -0,0 +1,126 @@
+# src/utils/tracing.py
+"""
+Lightweight per-turn latency instrumentation.
+
+    with span("kb", mode="retrieve_and_generate"):
+        ...
+
+Every span records its duration in the `voice_agent_stage_seconds` Prometheus
+histogram (when prometheus_client is installed), emits a DEBUG log line and,
+with OTEL_ENABLED, an OpenTelemetry span. Room id and intent come from the
+current turn context, so nested calls (invoke_general_model, DynamoDB) are
+labelled without threading them through every signature.
+"""
+import contextvars
+import time
+from typing import Dict, Optional
+from .env import settings
+from .logger import log
+
+try:
+    from prometheus_client import Counter, Histogram, start_http_server
+except ImportError:  # metrics are optional
+    Counter = Histogram = start_http_server = None
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+_room_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("room_id", default=None)
+_intent: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("intent", default=None)
+
+# room_id as a Prometheus label is opt-in: it is unbounded cardinality on a busy deployment
+_LABELS = ["stage", "intent", "room_id"] if settings.METRICS_ROOM_LABEL else ["stage", "intent"]
+_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 8.0, 13.0)
+
+if Histogram is not None:
+    STAGE_SECONDS = Histogram("voice_agent_stage_seconds", "Latency of each turn stage", _LABELS, buckets=_BUCKETS)
+    STAGE_ERRORS = Counter("voice_agent_stage_errors_total", "Stages that raised", _LABELS)
+    EVENTS = Counter("voice_agent_events_total", "Discrete pipeline events (cache hits, fallbacks, ...)", ["event"])
+else:
+    STAGE_SECONDS = STAGE_ERRORS = EVENTS = None
+
+_tracer = otel_trace.get_tracer("sparkout.voice_agent") if (otel_trace is not None and settings.OTEL_ENABLED) else None
+
+def set_turn_context(room_id: Optional[str] = None, intent: Optional[str] = None):
+    """Label spans in the current task (and tasks it creates from now on) with room/intent."""
+    if room_id is not None:
+        _room_id.set(room_id)
+    if intent is not None:
+        _intent.set(intent)
+
+def current_room() -> Optional[str]:
+    return _room_id.get()
+
+def current_intent() -> Optional[str]:
+    return _intent.get()
+
+def count(event: str, amount: int = 1):
+    if EVENTS is not None:
+        EVENTS.labels(event=event).inc(amount)
+
+def observe(stage: str, seconds: float, **attrs):
+    """Record a duration measured outside a `with span(...)` block (e.g. time to first token)."""
+    labels = {"stage": stage, "intent": attrs.get("intent") or _intent.get() or "unknown"}
+    if settings.METRICS_ROOM_LABEL:
+        labels["room_id"] = attrs.get("room_id") or _room_id.get() or "unknown"
+    if STAGE_SECONDS is not None:
+        STAGE_SECONDS.labels(**labels).observe(seconds)
+    log.debug("span", stage=stage, ms=round(seconds * 1000, 1), room_id=attrs.get("room_id") or _room_id.get(),
+              intent=labels["intent"], **{k: v for k, v in attrs.items() if k not in ("room_id", "intent")})
+
+class span:
+    __slots__ = ("stage", "attrs", "start", "elapsed", "_otel")
+
+    def __init__(self, stage: str, **attrs):
+        self.stage = stage
+        self.attrs = attrs
+        self.start = 0.0
+        self.elapsed = 0.0
+        self._otel = None
+
+    def _labels(self) -> Dict[str, str]:
+        labels = {"stage": self.stage, "intent": self.attrs.get("intent") or _intent.get() or "unknown"}
+        if settings.METRICS_ROOM_LABEL:
+            labels["room_id"] = self.attrs.get("room_id") or _room_id.get() or "unknown"
+        return labels
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        if _tracer is not None:
+            self._otel = _tracer.start_as_current_span(self.stage)
+            otel_span = self._otel.__enter__()
+            otel_span.set_attribute("room_id", self.attrs.get("room_id") or _room_id.get() or "")
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.elapsed = time.perf_counter() - self.start
+        labels = self._labels()
+        if STAGE_SECONDS is not None:
+            STAGE_SECONDS.labels(**labels).observe(self.elapsed)
+            if exc_type is not None:
+                STAGE_ERRORS.labels(**labels).inc()
+        if self._otel is not None:
+            otel_span = otel_trace.get_current_span()
+            otel_span.set_attribute("intent", labels["intent"])
+            for key, value in self.attrs.items():
+                if isinstance(value, (str, int, float, bool)):
+                    otel_span.set_attribute(key, value)
+            self._otel.__exit__(exc_type, exc, tb)
+        log.debug("span", stage=self.stage, ms=round(self.elapsed * 1000, 1),
+                  room_id=self.attrs.get("room_id") or _room_id.get(), intent=labels["intent"],
+                  error=exc_type.__name__ if exc_type else None,
+                  **{k: v for k, v in self.attrs.items() if k not in ("room_id", "intent")})
+        return False
+
+def start_metrics_server(port: Optional[int] = None):
+    port = settings.METRICS_PORT if port is None else port
+    if start_http_server is None or not port:
+        log.info("Prometheus metrics disabled", reason="prometheus_client missing" if start_http_server is None else "METRICS_PORT=0")
+        return
+    start_http_server(port)
+    log.info("Prometheus metrics server started", port=port)
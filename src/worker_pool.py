@@ -0,0 +1,201 @@
+# src/worker_pool.py
+"""
+Supervised multi-worker mode.
+
+serve() runs WORKER_PROCESSES LiveKit agent servers as separate processes,
+each with its own boto3 clients, AWS I/O pool, caches and metrics port.
+Inside a worker, jobs run on the thread executor so every room of the process
+shares those caches, and src/startup.py prewarms the process (plugins,
+clients, warm AWS connections) before the worker registers for jobs.
+
+Each worker reports its load (active rooms, Bedrock calls in flight, event
+loop lag) through load_fnc, so the dispatcher stops offering jobs once it is
+above WORKER_LOAD_THRESHOLD. The same numbers go into a table shared with the
+sibling workers for room affinity: a room belongs to worker crc32(room) % N,
+and the others reject its job unless the owner is saturated or has stopped
+heartbeating, so a reconnecting room lands where its cached passages and
+history already are.
+"""
+import asyncio
+import multiprocessing
+import signal
+import sys
+import time
+import zlib
+from typing import Dict, List, Optional
+from livekit.agents import JobContext, JobExecutorType, JobProcess, JobRequest, WorkerOptions
+from livekit.agents.cli import run_app
+from . import startup
+from .dynamodb_logger import turn_writer
+from .services.bedrock_governor import governor
+from .utils.env import settings
+from .utils.load import load
+from .utils.logger import log
+from .utils.tracing import start_metrics_server
+
+FIELDS = ("heartbeat", "load", "rooms", "bedrock_inflight", "loop_lag_ms")
+HEARTBEAT_STALE_SECONDS = 10.0  # load_fnc runs every 0.5s, so a silent owner is down or restarting
+HEALTHY_UPTIME_SECONDS = 60.0
+RESTART_BACKOFF_MAX = 30.0
+
+_index = 0
+_count = 1
+_table = None  # RawArray of len(FIELDS) doubles per worker, shared by the supervisor's workers
+
+def current_load(server=None) -> float:
+    """0..1 load of this worker: the most saturated of rooms, Bedrock concurrency and loop lag."""
+    snapshot = load.snapshot()
+    value = min(1.0, max(
+        snapshot["rooms"] / settings.WORKER_MAX_ROOMS,
+        snapshot["bedrock_inflight"] / settings.WORKER_MAX_BEDROCK_INFLIGHT,
+        snapshot["loop_lag_ms"] / settings.WORKER_MAX_LOOP_LAG_MS,
+    ))
+    if _table is not None:
+        base = _index * len(FIELDS)
+        _table[base:base + len(FIELDS)] = [time.time(), value, snapshot["rooms"], snapshot["bedrock_inflight"], snapshot["loop_lag_ms"]]
+    return value
+
+def worker_state(index: int) -> Dict[str, float]:
+    base = index * len(FIELDS)
+    return dict(zip(FIELDS, _table[base:base + len(FIELDS)]))
+
+def owner_of(room: str) -> int:
+    # crc32 rather than hash(): str hashes are salted per process
+    return zlib.crc32(room.encode()) % _count
+
+def accepts_room(room: str) -> bool:
+    if _table is None or _count <= 1 or not settings.WORKER_ROOM_AFFINITY:
+        return True
+    owner = owner_of(room)
+    if owner == _index:
+        return True
+    state = worker_state(owner)
+    if time.time() - state["heartbeat"] > HEARTBEAT_STALE_SECONDS:
+        return True
+    return state["load"] >= settings.WORKER_LOAD_THRESHOLD  # owner saturated: spill over
+
+async def request_fnc(req: JobRequest):
+    room = req.room.name
+    if accepts_room(room):
+        await req.accept()
+    else:
+        log.debug("Leaving job to the room's worker", room_id=room, worker=_index, owner=owner_of(room))
+        await req.reject()
+
+def prewarm(proc: JobProcess):
+    """LiveKit's per-executor hook; a no-op in a worker already prewarmed by run_worker."""
+    startup.prewarm()
+    proc.userdata["startup"] = startup.timings()
+
+def track_job(ctx: JobContext):
+    """Count the job's room toward this worker's load and sample its loop lag until the job shuts down."""
+    load.room_started()
+    monitor = asyncio.create_task(load.monitor_loop())
+
+    async def finished():
+        monitor.cancel()
+        load.room_ended()
+    ctx.add_shutdown_callback(finished)
+
+def worker_options(entrypoint) -> WorkerOptions:
+    options = dict(
+        entrypoint_fnc=entrypoint,
+        request_fnc=request_fnc,
+        prewarm_fnc=prewarm,
+        num_idle_processes=settings.WORKER_IDLE_JOBS,
+        load_threshold=settings.WORKER_LOAD_THRESHOLD,
+    )
+    if settings.WORKER_JOB_EXECUTOR == "thread":
+        options.update(job_executor_type=JobExecutorType.THREAD, load_fnc=current_load)
+    # With the process executor the room counters live in the job processes; LiveKit's CPU load is used instead
+    if _count > 1:
+        options["port"] = settings.WORKER_HTTP_PORT + _index
+    return WorkerOptions(**options)
+
+def run_worker(entrypoint, index: int = 0, count: int = 1, table=None, argv: Optional[List[str]] = None):
+    global _index, _count, _table
+    _index, _count, _table = index, count, table
+    if argv is not None:
+        sys.argv = argv
+    # The account's Bedrock quotas are shared by the workers the supervisor is actually running
+    governor.set_quota(settings.BEDROCK_REQUESTS_PER_MINUTE, settings.BEDROCK_TOKENS_PER_MINUTE, workers=count)
+    start_metrics_server(settings.METRICS_PORT + index if settings.METRICS_PORT else 0)
+    # Warm before registering, so the dispatcher only sees workers that can answer right away
+    startup.prewarm()
+    log.info("Agent worker ready", worker=index, workers=count, executor=settings.WORKER_JOB_EXECUTOR, **startup.timings())
+    try:
+        run_app(worker_options(entrypoint))
+    finally:
+        turn_writer.close()  # the process-wide turn writer outlives every job's drain
+
+class Supervisor:
+    """Keeps `count` worker processes running; restarts crashed ones with backoff."""
+
+    def __init__(self, entrypoint, count: int):
+        self.entrypoint = entrypoint
+        self.count = count
+        self._mp = multiprocessing.get_context("spawn")
+        self.table = self._mp.RawArray("d", count * len(FIELDS))
+        self.procs: List[Optional[multiprocessing.Process]] = [None] * count
+        self._started = [0.0] * count
+        self._failures = [0] * count
+        self._restart_at: Dict[int, float] = {}
+        self._stopping = False
+
+    def _spawn(self, index: int):
+        proc = self._mp.Process(
+            target=run_worker,
+            args=(self.entrypoint, index, self.count, self.table, list(sys.argv)),
+            name=f"agent-worker-{index}",
+        )
+        proc.start()
+        self.procs[index] = proc
+        self._started[index] = time.monotonic()
+        log.info("Worker process started", worker=index, pid=proc.pid)
+
+    def _stop(self, signum, _frame):
+        self._stopping = True
+        # A terminal's SIGINT already reached every worker through the process group;
+        # SIGTERM (container stop) only reaches the supervisor
+        if signum == signal.SIGTERM:
+            for proc in self.procs:
+                if proc is not None and proc.is_alive():
+                    proc.terminate()
+
+    def _check(self):
+        now = time.monotonic()
+        for index, proc in enumerate(self.procs):
+            if index in self._restart_at:
+                if now >= self._restart_at[index]:
+                    del self._restart_at[index]
+                    self._spawn(index)
+                continue
+            if proc.is_alive():
+                continue
+            uptime = now - self._started[index]
+            self._failures[index] = 0 if uptime > HEALTHY_UPTIME_SECONDS else self._failures[index] + 1
+            delay = min(2 ** self._failures[index] - 1, RESTART_BACKOFF_MAX)
+            log.error("Worker process exited", worker=index, exitcode=proc.exitcode,
+                      uptime_s=round(uptime, 1), restart_in_s=delay)
+            self._restart_at[index] = now + delay
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        for index in range(self.count):
+            self._spawn(index)
+        while not self._stopping:
+            time.sleep(1.0)
+            if not self._stopping:
+                self._check()
+        log.info("Stopping worker processes", workers=self.count)
+        for proc in self.procs:
+            if proc is not None:
+                proc.join()
+
+def serve(entrypoint):
+    """Run the agent: `start` with WORKER_PROCESSES > 1 supervises that many workers, anything else runs one in-process."""
+    if settings.WORKER_PROCESSES <= 1 or sys.argv[1:2] != ["start"]:
+        run_worker(entrypoint)
+        return
+    Supervisor(entrypoint, settings.WORKER_PROCESSES).run()
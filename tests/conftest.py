@@ -0,0 +1,30 @@
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+# Dummy credentials so Settings validates; the tests make no AWS/LiveKit calls
+for key in ("LIVEKIT_URL", "LIVEKIT_API_KEY", "LIVEKIT_API_SECRET", "BEDROCK_KB_ID",
+            "DEEPGRAM_API_KEY", "ELEVENLABS_API_KEY"):
+    os.environ.setdefault(key, "test")
+os.environ.setdefault("METRICS_PORT", "0")
+
+def client_error(code: str, status: int, operation: str = "InvokeModel"):
+    from botocore.exceptions import ClientError
+    return ClientError({"Error": {"Code": code}, "ResponseMetadata": {"HTTPStatusCode": status}}, operation)
+
+def failing(*errors, asynchronous: bool = False):
+    """A callable raising `errors` one per call, then returning "ok"; also returns the list of calls made."""
+    pending = list(errors)
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if pending:
+            raise pending.pop(0)
+        return "ok"
+
+    async def afn():
+        return fn()
+    return (afn if asynchronous else fn), calls
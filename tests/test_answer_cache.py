@@ -0,0 +1,81 @@
+import asyncio
+import math
+from src.answer_cache import AnswerCache, cache_key
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_cache_key_ignores_case_and_punctuation():
+    assert cache_key("Where is  Sparkout's office?") == cache_key("where is sparkout s office")
+
+def test_exact_hit_and_miss():
+    cache = AnswerCache()
+    run(cache.put("Who is the COO?", "Yokesh."))
+    assert run(cache.get("who is the coo")) == "Yokesh."
+    assert run(cache.get("who is the ceo")) is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+
+def test_lru_eviction():
+    cache = AnswerCache(max_entries=2)
+    run(cache.put("a", "1"))
+    run(cache.put("b", "2"))
+    assert run(cache.get("a")) == "1"  # 'b' is now least recently used
+    run(cache.put("c", "3"))
+    assert run(cache.get("b")) is None
+    assert run(cache.get("a")) == "1" and run(cache.get("c")) == "3"
+    assert cache.counters.evictions == 1
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("src.answer_cache.time.monotonic", lambda: now[0])
+    cache = AnswerCache(ttl_seconds=60)
+    run(cache.put("q", "answer"))
+    now[0] += 59
+    assert run(cache.get("q")) == "answer"
+    now[0] += 2
+    assert run(cache.get("q")) is None
+    assert cache.counters.expirations == 1 and len(cache) == 0
+
+def test_semantic_hit_above_threshold():
+    vectors = {"who is the coo": [1.0, 0.0], "who runs operations": [0.96, math.sqrt(1 - 0.96 ** 2)],
+               "where is the office": [0.0, 1.0]}
+
+    async def embed(text):
+        return vectors[text]
+    cache = AnswerCache(embed=embed, similarity_threshold=0.92)
+    run(cache.put("Who is the COO?", "Yokesh."))
+    assert run(cache.get("Who runs operations?")) == "Yokesh."
+    assert run(cache.get("Where is the office?")) is None
+    assert cache.counters.semantic_hits == 1
+
+def test_embedding_failure_is_a_miss():
+    async def embed(text):
+        raise RuntimeError("bedrock down")
+    cache = AnswerCache(embed=embed)
+    run(cache.put("q", "answer"))  # stored without an embedding
+    assert run(cache.get("q")) == "answer"
+    assert run(cache.get("other")) is None
+
+def test_kb_resync_clears_the_cache():
+    markers = iter(["job-1", "job-1", "job-2"])
+
+    async def kb_marker():
+        return next(markers)
+    cache = AnswerCache(kb_marker=kb_marker)
+    run(cache.put("q", "answer"))
+    assert not run(cache.check_kb_resync())  # first marker only records the version
+    assert not run(cache.check_kb_resync())
+    assert len(cache) == 1
+    assert run(cache.check_kb_resync())
+    assert len(cache) == 0 and cache.counters.invalidations == 1
+
+def test_answer_started_before_an_invalidation_is_not_stored():
+    cache = AnswerCache()
+    generation = cache.generation
+    assert run(cache.get("q")) is None
+    cache.invalidate()  # the KB resynced while the answer was being generated
+    run(cache.put("q", "old answer", generation))
+    assert len(cache) == 0 and cache.counters.stale_puts == 1
+    run(cache.put("q", "new answer", cache.generation))
+    assert run(cache.get("q")) == "new answer"
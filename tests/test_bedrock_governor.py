@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+import pytest
+from botocore.exceptions import ClientError, ReadTimeoutError
+from src.services import bedrock_governor
+from src.services.bedrock_governor import MIN_HEDGE_SAMPLES, BedrockGovernor, TokenBucket
+from .conftest import client_error, failing
+
+def test_transient_errors_are_retried_without_lowering_the_limit():
+    governor = BedrockGovernor(60000, 0, initial_limit=4, max_limit=8, retries=3)
+    fn, calls = failing(ReadTimeoutError(endpoint_url="https://bedrock"), client_error("InternalServerException", 500))
+    assert asyncio.run(governor.call(fn, {})) == "ok"
+    assert len(calls) == 3
+    stats = governor.stats()
+    assert (stats["transient"], stats["retried"], stats["throttled"]) == (2, 2, 0)
+    assert stats["limit"] >= 4 and stats["inflight"] == 0
+
+def test_client_errors_are_not_retried():
+    governor = BedrockGovernor(60000, 0, initial_limit=4, max_limit=8, retries=3)
+    fn, calls = failing(client_error("ValidationException", 400))
+    with pytest.raises(ClientError):
+        asyncio.run(governor.call(fn, {}))
+    assert len(calls) == 1
+
+def test_throttles_halve_the_limit():
+    governor = BedrockGovernor(60000, 0, initial_limit=8, max_limit=8, retries=3)
+    fn, calls = failing(client_error("ThrottlingException", 429))
+    assert asyncio.run(governor.call(fn, {})) == "ok"
+    assert governor.stats()["throttled"] == 1 and governor.limit < 8
+
+def test_set_quota_splits_across_workers():
+    governor = BedrockGovernor(600, 60000, initial_limit=4, max_limit=8)
+    governor.set_quota(600, 60000, workers=3)
+    assert governor.requests.rate == pytest.approx(600 / 3 / 60)
+    assert governor.tokens.rate == pytest.approx(60000 / 3 / 60)
+    governor.set_quota(600, 0, workers=0)
+    assert governor.workers == 1 and governor.tokens is None
+
+def hedging_governor() -> BedrockGovernor:
+    governor = BedrockGovernor(60000, 0, initial_limit=4, max_limit=8, hedge=True)
+    for _ in range(MIN_HEDGE_SAMPLES):
+        governor._on_success("rag", 0.01)
+    return governor
+
+@pytest.mark.parametrize("winner", ["first", "second"])
+def test_hedge_loser_holds_its_slot_until_its_thread_finishes(winner):
+    governor = hedging_governor()
+    unblock = threading.Event()
+    started = []
+
+    def fn():
+        started.append(1)
+        if (len(started) == 1) == (winner == "second"):
+            unblock.wait(5)  # the loser
+            return "loser"
+        if winner == "first":
+            time.sleep(0.05)  # past the hedge threshold, so the second call starts
+        return "winner"
+
+    async def run():
+        assert await governor.call(fn, {}, purpose="rag", hedge=True) == "winner"
+        assert governor.inflight == 1
+        unblock.set()
+        for _ in range(100):
+            if governor.inflight == 0:
+                break
+            await asyncio.sleep(0.01)
+    asyncio.run(run())
+    stats = governor.stats()
+    assert len(started) == 2 and stats["hedged"] == 1
+    assert stats["hedge_wins"] == (1 if winner == "second" else 0)
+    assert stats["inflight"] == 0
+
+def test_no_hedge_without_latency_samples():
+    governor = BedrockGovernor(60000, 0, initial_limit=4, max_limit=8, hedge=True)
+    fn, calls = failing()
+    assert asyncio.run(governor.call(fn, {}, purpose="rag", hedge=True)) == "ok"
+    assert len(calls) == 1 and governor.stats()["hedged"] == 0
+
+def test_freed_slot_goes_to_the_highest_priority_waiter():
+    governor = BedrockGovernor(60000, 0, initial_limit=1, max_limit=1)
+    order = []
+
+    async def waiter(priority, name):
+        await governor.acquire(priority)
+        order.append(name)
+        governor.release()
+
+    async def run():
+        await governor.acquire(1)
+        tasks = [asyncio.create_task(waiter(p, name)) for p, name in
+                 ((2, "summary"), (1, "rag"), (0, "intent"), (1, "smart"))]
+        await asyncio.sleep(0.01)
+        assert governor.stats()["waiting"] == 4 and not order
+        governor.release()
+        await asyncio.gather(*tasks)
+    asyncio.run(run())
+    # Priority first, arrival order within a priority
+    assert order == ["intent", "rag", "smart", "summary"]
+    assert governor.inflight == 0
+
+def test_token_bucket_reserves_into_debt_and_refills(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(bedrock_governor, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    bucket = TokenBucket(60, burst_seconds=2)  # 1 token/s, 2 tokens of burst
+    assert bucket.reserve(1) == 0 and bucket.reserve(1) == 0
+    assert bucket.reserve(1) == pytest.approx(1.0)  # in debt by one token: wait a second
+    assert not bucket.try_take(1)
+    now[0] += 2.0
+    assert bucket.try_take(1)
+    assert not bucket.try_take(1)
+    now[0] += 10.0  # refills up to capacity only
+    assert bucket.reserve(2) == 0 and bucket.reserve(1) == pytest.approx(1.0)
+
+def test_low_priority_keeps_a_reserve_for_high(monkeypatch):
+    monkeypatch.setattr(bedrock_governor, "time", SimpleNamespace(monotonic=lambda: 100.0))
+    bucket = TokenBucket(60, burst_seconds=10)
+    assert bucket.reserve(8) == 0
+    assert bucket.reserve(1, keep=2) == pytest.approx(1.0)  # may not dip below 2 tokens
+    assert bucket.reserve(1) == 0
+
+def test_empty_request_bucket_delays_the_call():
+    governor = BedrockGovernor(600, 0, initial_limit=4, max_limit=8)
+    governor.requests = TokenBucket(600, burst_seconds=0.1)  # one request of burst, then 10/s
+    fn, _ = failing()
+
+    async def run():
+        await governor.call(fn, {}, purpose="intent")
+        started = time.perf_counter()
+        await governor.call(fn, {}, purpose="intent")
+        return time.perf_counter() - started
+    assert asyncio.run(run()) >= 0.08
@@ -0,0 +1,64 @@
+import asyncio
+import threading
+from src import dynamodb_logger
+from src.dynamodb_logger import CompactionScheduler
+from src.utils.env import settings
+
+def test_compaction_every_n_turns(monkeypatch):
+    started = []
+
+    async def compact_room(room_id):
+        started.append(room_id)
+    monkeypatch.setattr(dynamodb_logger, "compact_room", compact_room)
+    monkeypatch.setattr(settings, "HISTORY_COMPACT_EVERY", 3)
+
+    async def run():
+        scheduler = CompactionScheduler()
+        for _ in range(7):
+            scheduler.turn_saved("room-a")
+            await asyncio.sleep(0)
+        scheduler.turn_saved("room-b")
+        await asyncio.sleep(0)
+        assert started == ["room-a", "room-a"]
+        assert scheduler.tracked_rooms() == 2
+        await scheduler.end_room("room-a")
+        await scheduler.end_room("room-b")
+        assert scheduler.tracked_rooms() == 0
+    asyncio.run(run())
+
+def test_end_room_waits_for_a_running_compaction(monkeypatch):
+    finished = []
+
+    async def compact_room(room_id):
+        await asyncio.sleep(0.02)
+        finished.append(room_id)
+    monkeypatch.setattr(dynamodb_logger, "compact_room", compact_room)
+    monkeypatch.setattr(settings, "HISTORY_COMPACT_EVERY", 1)
+
+    async def run():
+        scheduler = CompactionScheduler()
+        scheduler.turn_saved("room")
+        await scheduler.end_room("room")
+        assert finished == ["room"]
+    asyncio.run(run())
+
+def test_rooms_on_different_loops_are_counted_separately(monkeypatch):
+    started = []
+
+    async def compact_room(room_id):
+        started.append(room_id)
+    monkeypatch.setattr(dynamodb_logger, "compact_room", compact_room)
+    monkeypatch.setattr(settings, "HISTORY_COMPACT_EVERY", 2)
+    scheduler = CompactionScheduler()
+
+    async def one_turn():
+        scheduler.turn_saved("room")
+        await asyncio.sleep(0)
+
+    # Same room name, two loops (threads): neither reaches two turns on its own
+    threads = [threading.Thread(target=asyncio.run, args=(one_turn(),)) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert started == []
@@ -0,0 +1,88 @@
+import asyncio
+import pytest
+from src import early_turn, rag_tool
+from src.early_turn import EarlyTurn
+from src.intent_router import RouteResult
+from src.passage_cache import Passage, passage_cache
+from src.utils.env import settings
+
+class FakeRouter:
+    def __init__(self, intent: str, confidence: float):
+        self.result = RouteResult(intent, confidence, "model")
+
+    def route(self, message, history=None):
+        return self.result
+
+    def is_confident(self, result):
+        return result.confidence >= 0.8
+
+@pytest.fixture
+def calls(monkeypatch):
+    made = {"classify": [], "retrieve": []}
+
+    async def classify_intent_with_context(message, chat_history):
+        made["classify"].append(message)
+        return "rag"
+
+    async def kb_retrieve(query):
+        made["retrieve"].append(query)
+        return [Passage("Our office is in Chennai.", 0.9, "s3://kb/office.md")]
+    monkeypatch.setattr(rag_tool, "classify_intent_with_context", classify_intent_with_context)
+    monkeypatch.setattr(rag_tool, "kb_retrieve", kb_retrieve)
+    monkeypatch.setattr(settings, "RAG_MODE", "two_stage")
+    monkeypatch.setattr(early_turn, "get_router", lambda *args: FakeRouter("rag", 0.95))
+    return made
+
+async def speak(early: EarlyTurn, *interims: str):
+    for text in interims:
+        early.on_interim(text)
+        await asyncio.sleep(0.01)
+
+def test_final_matching_the_prefix_reuses_intent_and_retrieval(calls):
+    async def run():
+        early = EarlyTurn("room-match", [])
+        await speak(early, "where is your office", "where is your office located")
+        start = early.take("Where is your office?")
+        assert start is not None and await start.wait_intent() == "rag"
+        # retrieve_passages finds the early retrieval under the turn's query
+        prefetched = passage_cache.take_prefetched("room-match", start.query)
+        assert prefetched is not None and (await prefetched)[0].source == "s3://kb/office.md"
+    asyncio.run(run())
+    assert calls["classify"] == ["where is your office"] and len(calls["retrieve"]) == 1
+
+def test_diverging_final_cancels_everything(calls):
+    async def run():
+        early = EarlyTurn("room-diverge", [])
+        await speak(early, "where is your office", "where is your office located")
+        start = early._start
+        assert early.take("who is the coo") is None
+        await asyncio.sleep(0)
+        assert start.task.done()
+        assert passage_cache.take_prefetched("room-diverge", start.query) is None
+    asyncio.run(run())
+
+@pytest.mark.parametrize("confidence, reused", [(0.95, True), (0.5, False)])
+def test_longer_final_reuses_the_intent_only_if_the_router_is_confident(calls, monkeypatch, confidence, reused):
+    monkeypatch.setattr(early_turn, "get_router", lambda *args: FakeRouter("rag", confidence))
+
+    async def run():
+        early = EarlyTurn("room-longer", [])
+        await speak(early, "where is your office", "where is your office located")
+        start = early._start
+        taken = early.take("where is your office located in dubai")
+        assert (taken is start) == reused
+        # The retrieval was for the shorter query either way
+        assert passage_cache.take_prefetched("room-longer", start.query) is None
+    asyncio.run(run())
+
+def test_starts_stop_at_the_limit_until_the_next_utterance(calls):
+    async def run():
+        early = EarlyTurn("room-limit", [], min_words=3, max_starts=2)
+        await speak(early, "tell me about", "tell me about your", "tell me about your services",
+                    "tell me about your services in", "tell me about your services in dubai")
+        assert calls["classify"] == ["tell me about", "tell me about your"]
+        early.take("tell me about your services in dubai")
+        await speak(early, "who is the", "who is the coo")
+        assert calls["classify"][-1] == "who is the"
+        early.cancel()
+    asyncio.run(run())
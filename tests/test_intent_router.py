@@ -0,0 +1,57 @@
+import pytest
+from src.intent_router import INTENTS, SEED_EXAMPLES, HashedNgramClassifier, IntentRouter, featurize
+
+@pytest.fixture(scope="module")
+def model():
+    return HashedNgramClassifier().fit(SEED_EXAMPLES)
+
+def test_featurize_is_normalized():
+    feats = featurize("Where is your office located?")
+    assert feats
+    assert sum(v * v for v in feats.values()) == pytest.approx(1.0)
+    assert featurize("") == featurize("   ")
+
+def test_predict_proba_is_a_distribution(model):
+    proba = model.predict_proba("how do i scale a web application")
+    assert set(proba) == set(INTENTS)
+    assert sum(proba.values()) == pytest.approx(1.0)
+    assert max(proba, key=proba.get) == "smart_ai_assistant"
+
+def test_fits_the_seed_set(model):
+    correct = sum(max(p := model.predict_proba(text), key=p.get) == label for text, label in SEED_EXAMPLES)
+    assert correct / len(SEED_EXAMPLES) >= 0.95
+
+def test_save_and_load_round_trip(model, tmp_path):
+    path = tmp_path / "router.json"
+    model.save(str(path))
+    loaded = HashedNgramClassifier.load(str(path))
+    for text in ("what is docker used for", "who are your clients", "hello"):
+        original, restored = model.predict_proba(text), loaded.predict_proba(text)
+        assert restored == pytest.approx(original, abs=1e-4)
+
+@pytest.mark.parametrize("message, intent, source", [
+    ("Hello!", "greetings", "rule"),
+    ("good morning team", "greetings", "rule"),
+    ("Who is the COO of Sparkout?", "rag", "rule"),
+    ("Tell me about your case studies", "rag", "rule"),
+    ("What is the difference between SQL and NoSQL", "smart_ai_assistant", "model"),
+])
+def test_route(model, message, intent, source):
+    result = IntentRouter(model).route(message)
+    assert (result.intent, result.source) == (intent, source)
+
+def test_long_greeting_is_not_a_rule_match(model):
+    assert IntentRouter(model).route("hello can you explain how kubernetes schedules pods").source == "model"
+
+def test_referential_follow_up_defers_to_the_llm(model):
+    router = IntentRouter(model)
+    history = [{"role": "user", "content": "Where is your office located?", "intent": "rag"}]
+    result = router.route("what about there", history)
+    assert result.source == "defer" and not router.is_confident(result)
+    # Without an earlier classified turn there is nothing to lean on
+    assert router.route("what about there").source != "defer"
+
+def test_threshold_decides_confidence(model):
+    result = IntentRouter(model).route("what is a vector database")
+    assert IntentRouter(model, threshold=0.0).is_confident(result)
+    assert not IntentRouter(model, threshold=1.01).is_confident(result)
@@ -0,0 +1,70 @@
+import asyncio
+from src.passage_cache import Passage, PassageCache, query_key, rerank, topic_of
+
+def test_topic_of():
+    assert topic_of("Where is your Dubai office?") == "location"
+    assert topic_of("Tell me about a case study") == "portfolio"
+    assert topic_of("Who is the COO?") == "general"
+
+def test_query_key():
+    assert query_key("Where is the Office?") == query_key("where is the office")
+
+def test_rerank_prefers_query_terms():
+    passages = [
+        Passage("Sparkout builds mobile apps for retail clients.", score=0.5),
+        Passage("The Dubai office is in Business Bay, Dubai.", score=0.4),
+        Passage("Our team follows agile delivery.", score=0.6),
+    ]
+    ranked = rerank("Where is the Dubai office?", passages, top_k=2)
+    assert len(ranked) == 2
+    assert ranked[0].text.startswith("The Dubai office")
+
+def test_rerank_respects_the_char_budget():
+    passages = [Passage("office " * 100, score=0.9), Passage("office dubai", score=0.1), Passage("dubai " * 100, score=0.8)]
+    ranked = rerank("office dubai", passages, top_k=5, max_chars=720)
+    assert sum(len(p.text) for p in ranked) <= 720
+    # A single passage over budget is cut rather than leaving the context empty
+    only = rerank("office", [Passage("office " * 1000)], max_chars=100)
+    assert len(only) == 1 and len(only[0].text) == 100
+    assert rerank("anything", []) == []
+
+def test_get_put_per_room_and_topic(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("src.passage_cache.time.monotonic", lambda: now[0])
+    cache = PassageCache(max_rooms=2, ttl_seconds=60)
+    passages = [Passage("text")]
+    cache.put("room-a", "location", passages)
+    assert cache.get("room-a", "location") is passages
+    assert cache.get("room-a", "portfolio") is None
+    assert cache.get("room-b", "location") is None
+    now[0] += 61
+    assert cache.get("room-a", "location") is None
+    assert (cache.hits, cache.misses) == (1, 3)
+
+def test_rooms_are_evicted_least_recently_used():
+    cache = PassageCache(max_rooms=2)
+    for room in ("a", "b"):
+        cache.put(room, "general", [Passage(room)])
+    cache.get("a", "general")
+    cache.put("c", "general", [Passage("c")])
+    assert cache.get("b", "general") is None
+    assert cache.get("a", "general") is not None and cache.get("c", "general") is not None
+
+def test_prefetched_retrieval_is_handed_out_once_for_its_query():
+    async def run():
+        cache = PassageCache()
+        task = asyncio.ensure_future(asyncio.sleep(10))
+        cache.put_prefetched("room", "Where is the office?", task)
+        assert cache.take_prefetched("room", "who is the coo") is None
+        assert cache.take_prefetched("room", "where is the office") is task
+        assert cache.take_prefetched("room", "where is the office") is None
+        task.cancel()
+
+        first = asyncio.ensure_future(asyncio.sleep(10))
+        second = asyncio.ensure_future(asyncio.sleep(10))
+        cache.put_prefetched("room", "q1", first)
+        cache.put_prefetched("room", "q2", second)  # replaces and cancels the first
+        cache.drop_room("room")
+        await asyncio.sleep(0)
+        assert first.cancelled() and second.cancelled()
+    asyncio.run(run())
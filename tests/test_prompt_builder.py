@@ -0,0 +1,75 @@
+import json
+from src import prompt_builder
+from src.prompt_builder import (FRAMING_TOKENS, count_tokens, fit_texts, history_block, llama3_body, output_cap,
+                                system_segment, truncate_tokens)
+from src.utils.env import settings
+
+def format_entry(entry):
+    return f"{entry['role'].capitalize()}: {entry['content']}\n"
+
+def sentence(n: int) -> str:
+    return " ".join(f"word{i}" for i in range(n))
+
+def test_output_caps_per_intent():
+    assert output_cap("intent") == settings.MAX_TOKENS_INTENT
+    assert output_cap("greetings") == settings.MAX_TOKENS_GREETING
+    assert output_cap("rag") == settings.MAX_TOKENS_RAG
+    assert output_cap("smart_ai_assistant") == settings.MAX_TOKENS_SMART
+    assert output_cap("unknown") == settings.MAX_TOKENS_SMART
+
+def test_llama3_body_framing_and_token_estimate():
+    body, prompt_tokens = llama3_body("You are helpful.", "Hi there", max_gen_len=50, temperature=0.2)
+    request = json.loads(body)
+    assert request["prompt"].startswith("<|begin_of_text|><|start_header_id|>system<|end_header_id|>\n\nYou are helpful.")
+    assert request["prompt"].endswith("Hi there<|eot_id|><|start_header_id|>assistant<|end_header_id|>\n\n")
+    assert request["max_gen_len"] == 50 and request["temperature"] == 0.2
+    assert prompt_tokens == count_tokens("You are helpful.") + count_tokens("Hi there") + FRAMING_TOKENS
+
+def test_system_segment_is_cached():
+    assert system_segment("Static prompt") is system_segment("Static prompt")
+
+def test_output_cap_is_clamped_to_the_context_window(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_CONTEXT_TOKENS", 400)
+    body, prompt_tokens = llama3_body("System.", sentence(100), max_gen_len=300, temperature=0.0)
+    max_gen_len = json.loads(body)["max_gen_len"]
+    assert prompt_tokens < 400 and max_gen_len < 300
+    assert prompt_tokens + max_gen_len == 400
+    # A prompt that alone overflows the window still gets a minimal output cap
+    body, _ = llama3_body("System.", sentence(400), max_gen_len=300, temperature=0.0)
+    assert json.loads(body)["max_gen_len"] == 16
+
+def test_truncate_tokens_fits_the_budget():
+    text = sentence(300)
+    for budget in (10, 50, 120):
+        cut = truncate_tokens(text, budget)
+        assert count_tokens(cut) <= budget
+        assert cut.endswith(" …") and text.startswith(cut[:-2])
+    assert truncate_tokens("short text", 50) == "short text"
+
+def test_history_block_keeps_the_newest_entries_within_budget():
+    entries = [{"role": "user" if i % 2 == 0 else "assistant", "content": f"turn {i} " + sentence(20)} for i in range(30)]
+    budget = 200
+    block = history_block(entries, budget, format_entry)
+    assert count_tokens(block) <= budget
+    assert block.endswith(format_entry(entries[-1]))
+    assert "turn 0 " not in block
+
+def test_history_block_shortens_a_long_entry_instead_of_dropping_it():
+    entries = [{"role": "user", "content": "first question"}, {"role": "assistant", "content": sentence(500)}]
+    block = history_block(entries, 120, format_entry)
+    assert block.startswith("Assistant: word0") and "…" in block
+    assert count_tokens(block) <= 120
+    assert history_block(entries, 0, format_entry) == ""
+
+def test_fit_texts():
+    texts = [sentence(10), sentence(10), sentence(10)]
+    one = count_tokens(texts[0])
+    assert fit_texts(texts, one * 3) == 3
+    assert fit_texts(texts, one * 2 + 1) == 2
+    assert fit_texts(texts, one - 1) == 0
+    assert fit_texts([], 10) == 0
+
+def test_estimate_over_counts_words(monkeypatch):
+    monkeypatch.setattr(prompt_builder, "_tokenizer", None)
+    text = "Sparkout Tech Solutions builds mobile applications for clients in Dubai."
+    assert count_tokens(text) >= len(text.split())
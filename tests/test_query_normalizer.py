@@ -0,0 +1,66 @@
+import random
+import re
+from src.query_normalizer import CORRECTIONS, VAGUE_WORDS, analyze
+
+def legacy_normalize(query: str) -> str:
+    """normalize_query as it was before the single-pass normalizer: substring replaces, then one regex per rule."""
+    normalized = query.lower()
+    for wrong, correct in CORRECTIONS.items():
+        if wrong in normalized:
+            normalized = normalized.replace(wrong, correct)
+    normalized = re.sub(r'\.{2,}', '.', normalized)
+    normalized = re.sub(r'\?+', '?', normalized)
+    return re.sub(r'\s+', ' ', normalized).strip()
+
+WORDS = ["where", "is", "your", "office", "located", "who", "the", "coo", "of", "sparkout", "tell", "me", "about",
+         "case", "study", "projects", "services", "clients", "address", "location", "in", "dubai", "india", "what",
+         "how", "do", "you", "build", "apps", "that", "this", "it", "they", "there", "here", "exact", "which"]
+# Where the old substring replaces went wrong: words containing a typo ('branch' -> 'branchh') and
+# typos whose correction contains another typo ('studys' -> 'studies' -> 'studys')
+PARITY_WORDS = [w for w in WORDS + list(CORRECTIONS)
+                if not any(typo in w and typo != w for typo in CORRECTIONS)
+                and not any(typo in CORRECTIONS.get(w, "") for typo in CORRECTIONS)]
+PUNCTUATION = ["", "", "", ".", "?", ",", "...", "??", "?!"]
+SPACES = [" ", " ", " ", "  ", "\t", "\n "]
+
+def random_query(rng: random.Random) -> str:
+    parts = []
+    for _ in range(rng.randint(1, 14)):
+        word = rng.choice(PARITY_WORDS)
+        if rng.random() < 0.2:
+            word = word.capitalize() if rng.random() < 0.5 else word.upper()
+        parts.append(word + rng.choice(PUNCTUATION))
+        parts.append(rng.choice(SPACES))
+    return rng.choice(["", " "]) + "".join(parts)
+
+def test_normalization_matches_legacy():
+    rng = random.Random(11)
+    for _ in range(3000):
+        query = random_query(rng)
+        assert analyze(query).normalized == legacy_normalize(query), query
+
+def test_vague_tag_matches_whole_words():
+    rng = random.Random(12)
+    for _ in range(2000):
+        features = analyze(random_query(rng))
+        words = re.findall(r"[a-z]+", features.normalized)
+        assert features.is_vague == any(w in VAGUE_WORDS for w in words)
+        assert features.word_count == len(features.normalized.split())
+
+def test_corrections_only_apply_to_whole_words():
+    # The old substring replaces turned these into 'branchh' / 'studys'
+    assert analyze("Any other branches?").normalized == "any other branches?"
+    assert analyze("Show me case studies").normalized == "show me case studies"
+    assert analyze("saprkout branc adress").normalized == "sparkout branch address"
+    assert analyze("case studys").normalized == "case studies"
+
+def test_vague_words_do_not_match_inside_words():
+    assert not analyze("Sparkout mobile development capabilities").is_vague
+    assert analyze("is it in dubai").is_vague
+
+def test_topic_groups():
+    assert analyze("Where are your offices located?").topic_group == "location"
+    assert analyze("Tell me about your case studies").topic_group == "case"
+    assert "case_study" in analyze("tell me about your case studies").tags
+    assert analyze("what is kubernetes").topic_group == ""
+    assert analyze("SaprkOut services").mentions_sparkout
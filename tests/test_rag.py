@@ -0,0 +1,21 @@
+import asyncio
+from botocore.exceptions import EndpointConnectionError, ReadTimeoutError
+from src import rag_tool
+from src.response_bank import MODEL_ERROR_RESPONSE
+from src.services import bedrock_client
+
+def test_connection_errors_return_the_model_error_response(monkeypatch):
+    async def invoke_model(purpose, tokens, **kwargs):
+        raise EndpointConnectionError(endpoint_url="https://bedrock")
+    monkeypatch.setattr(bedrock_client, "invoke_model", invoke_model)
+    assert asyncio.run(rag_tool.invoke_general_model("System.", "Hi")) == MODEL_ERROR_RESPONSE
+
+def test_stream_read_timeout_returns_the_model_error_response(monkeypatch):
+    async def invoke_model_stream(purpose, tokens, **kwargs):
+        raise ReadTimeoutError(endpoint_url="https://bedrock")
+        yield {}
+    monkeypatch.setattr(bedrock_client, "invoke_model_stream", invoke_model_stream)
+
+    async def run():
+        return [text async for text in rag_tool.stream_general_model("System.", "Hi")]
+    assert asyncio.run(run()) == [MODEL_ERROR_RESPONSE]
@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+from botocore.exceptions import ClientError, EndpointConnectionError, ReadTimeoutError
+from src.utils.retry import backoff_delays, is_retryable, is_throttle, is_transient, retry_async
+from .conftest import client_error, failing
+
+def test_is_retryable():
+    assert is_retryable(client_error("ProvisionedThroughputExceededException", 400))
+    assert is_retryable(client_error("ThrottlingException", 400))
+    assert is_retryable(client_error("InternalServerError", 500))
+    assert is_retryable(client_error("Unknown", 503))
+    assert is_retryable(EndpointConnectionError(endpoint_url="https://dynamodb"))
+    assert is_retryable(ReadTimeoutError(endpoint_url="https://dynamodb"))
+    assert not is_retryable(client_error("ValidationException", 400))
+    assert not is_retryable(client_error("ResourceNotFoundException", 400))
+    assert not is_retryable(ValueError("bad item"))
+
+def test_throttles_and_transient_faults():
+    assert is_throttle(client_error("ThrottlingException", 429))
+    assert not is_transient(client_error("ThrottlingException", 429))
+    assert is_transient(client_error("InternalServerException", 500))
+    assert is_transient(client_error("ModelStreamErrorException", 424))
+    assert is_transient(client_error("SomethingNew", 502))
+    assert is_transient(ReadTimeoutError(endpoint_url="https://bedrock"))
+    assert is_transient(EndpointConnectionError(endpoint_url="https://bedrock"))
+    assert not is_transient(client_error("ValidationException", 400))
+    assert not is_transient(client_error("ResourceNotFoundException", 404))
+
+@pytest.mark.parametrize("code, status", [("ModelNotReadyException", 429), ("ServiceUnavailableException", 503),
+                                          ("ServiceQuotaExceededException", 400), ("ModelTimeoutException", 408),
+                                          ("ProvisionedThroughputExceededException", 400)])
+def test_governor_and_retry_async_agree(code, status):
+    error = client_error(code, status)
+    assert is_retryable(error)
+    assert is_throttle(error) != is_transient(error)
+
+def test_backoff_delays_are_bounded():
+    delays = list(backoff_delays(6, base_delay=0.1, max_delay=0.3))
+    assert len(delays) == 5
+    assert all(0 <= d <= 0.3 for d in delays)
+
+def test_retries_transient_errors():
+    fn, calls = failing(client_error("ProvisionedThroughputExceededException", 400), ReadTimeoutError(endpoint_url="x"), asynchronous=True)
+    assert asyncio.run(retry_async(fn, attempts=3, base_delay=0.001)) == "ok"
+    assert len(calls) == 3
+
+def test_gives_up_after_attempts():
+    fn, calls = failing(*[client_error("ThrottlingException", 400)] * 5, asynchronous=True)
+    with pytest.raises(ClientError):
+        asyncio.run(retry_async(fn, attempts=3, base_delay=0.001))
+    assert len(calls) == 3
+
+def test_caller_errors_are_not_retried():
+    fn, calls = failing(client_error("ValidationException", 400), asynchronous=True)
+    with pytest.raises(ClientError):
+        asyncio.run(retry_async(fn, attempts=5, base_delay=0.001))
+    assert len(calls) == 1
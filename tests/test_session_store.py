@@ -0,0 +1,126 @@
+import asyncio
+import pytest
+from src import dynamodb_logger
+from src.services import redis_client
+from src.services.redis_client import LocalRedis
+from src.session_store import REDIS_KEY, SessionState, SessionStore, TurnRecord
+
+MESSAGES = [
+    {"role": "system", "text": "Earlier: the caller asked about offices."},
+    {"role": "user", "text": "Where is your office?"},
+    {"role": "assistant", "text": "Chennai and Dubai.", "partial": True},
+]
+
+@pytest.fixture
+def loads(monkeypatch):
+    made = []
+
+    async def load_history(room_id, limit=None):
+        made.append(room_id)
+        return [dict(m) for m in MESSAGES]
+    monkeypatch.setattr(dynamodb_logger, "load_history", load_history)
+    monkeypatch.setattr(redis_client, "client", None)
+    return made
+
+@pytest.fixture
+def redis(monkeypatch, loads):
+    local = LocalRedis()
+    monkeypatch.setattr(redis_client, "client", local)
+    return local
+
+async def settle():
+    for _ in range(20):
+        await asyncio.sleep(0.005)
+
+def test_lru_evicts_the_least_recently_used_room(loads):
+    store = SessionStore(max_rooms=2)
+    for room in ("a", "b"):
+        store._remember(SessionState(room))
+    assert store._cached("a") is not None  # 'a' is now the most recent
+    store._remember(SessionState("c"))
+    assert store._cached("b") is None
+    assert store._cached("a") is not None and store._cached("c") is not None
+    assert store.stats()["rooms"] == 2
+
+def test_expired_rooms_are_reloaded(loads):
+    store = SessionStore(ttl_seconds=60)
+
+    async def run():
+        state = await store.get("room")
+        assert await store.get("room") is state
+        state.updated_at -= 61
+        assert await store.get("room") is not state
+    asyncio.run(run())
+    assert loads == ["room", "room"]
+    assert store.stats() == {"rooms": 1, "dynamodb_hits": 2, "memory_hits": 1}
+
+def test_summary_leads_the_history_and_survives_the_wire(loads):
+    state = SessionState.from_messages("room", MESSAGES, max_turns=20)
+    history = state.history()
+    assert history[0] == {"role": "system", "content": MESSAGES[0]["text"]}
+    assert history[2]["partial"] and "features" in history[1]
+    restored = SessionState.from_wire("room", state.to_wire(), max_turns=20)
+    assert restored.summary == state.summary
+    assert [(t.role, t.text, t.partial) for t in restored.turns] == [(t.role, t.text, t.partial) for t in state.turns]
+    assert SessionState("room", turns=[TurnRecord("user", "hi")]).history()[0]["role"] == "user"
+
+def test_set_summary_and_record_update_the_cached_state(loads):
+    store = SessionStore(max_turns=2)
+
+    async def run():
+        await store.get("room")
+        store.set_summary("room", "New summary.")
+        store.record("room", "user", "Any openings?")
+        return await store.get("room")
+    state = asyncio.run(run())
+    assert state.summary == "New summary."
+    # The ring buffer keeps the last max_turns turns
+    assert [t.text for t in state.turns] == ["Chennai and Dubai.", "Any openings?"]
+
+def test_redis_copy_serves_another_worker(redis, loads):
+    async def run():
+        first, second = SessionStore(), SessionStore()
+        await first.get("room")
+        await settle()
+        assert redis.get(REDIS_KEY.format(room_id="room")) is not None
+        first.record("room", "user", "Any openings?")
+        await settle()
+        state = await second.get("room")
+        return first, second, state
+    first, second, state = asyncio.run(run())
+    assert loads == ["room"]
+    assert second.stats()["redis_hits"] == 1
+    assert [t.text for t in state.turns][-1] == "Any openings?"
+    assert state.summary == MESSAGES[0]["text"]
+
+def test_a_turn_for_an_uncached_room_invalidates_the_redis_copy(redis, loads):
+    key = REDIS_KEY.format(room_id="room")
+    redis.set(key, SessionState("room", "Old summary.").to_wire())
+
+    async def run():
+        SessionStore().record("room", "user", "Hello")
+        await settle()
+    asyncio.run(run())
+    assert redis.get(key) is None
+
+def test_changes_during_a_write_are_coalesced_into_one_more_write(redis, loads, monkeypatch):
+    written = []
+
+    async def put(key, value, ttl_seconds):
+        await asyncio.sleep(0.02)
+        written.append(value)
+        redis.set(key, value, ex=ttl_seconds)
+    monkeypatch.setattr(redis_client, "put", put)
+
+    async def run():
+        store = SessionStore()
+        await store.get("room")
+        for n in range(3):
+            store.record("room", "user", f"turn {n}")
+        await asyncio.sleep(0.1)
+        return store
+    store = asyncio.run(run())
+    assert len(written) == 2
+    final = SessionState.from_wire("room", redis.get(REDIS_KEY.format(room_id="room")), 20)
+    assert [t.text for t in final.turns][-1] == "turn 2"
+    assert not store._publishing
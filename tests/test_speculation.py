@@ -0,0 +1,84 @@
+import asyncio
+import pytest
+from src import rag_tool, speculation
+from src.speculation import PrefetchedStream
+
+async def numbers(closed: list, count: int = 100):
+    try:
+        for i in range(count):
+            yield str(i)
+            await asyncio.sleep(0.01)
+    finally:
+        closed.append(True)
+
+def test_reads_everything_in_order():
+    async def run():
+        closed = []
+        stream = PrefetchedStream(numbers(closed, 5))
+        return [item async for item in stream], closed
+    items, closed = asyncio.run(run())
+    assert items == ["0", "1", "2", "3", "4"] and closed
+
+def test_abandoned_iterator_cancels_the_pump():
+    async def run():
+        closed = []
+        stream = PrefetchedStream(numbers(closed))
+        items = stream.__aiter__()
+        assert await items.__anext__() == "0"
+        await items.aclose()
+        await asyncio.sleep(0.05)
+        # Checked before asyncio.run cancels leftover tasks on shutdown
+        assert stream._task.cancelled() and closed
+    asyncio.run(run())
+
+def test_cancelled_consumer_cancels_the_pump():
+    async def run():
+        closed = []
+        stream = PrefetchedStream(numbers(closed))
+
+        async def consume():
+            async for _ in stream:
+                pass
+        consumer = asyncio.create_task(consume())
+        await asyncio.sleep(0.03)
+        consumer.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await consumer
+        await asyncio.sleep(0.01)
+        assert stream._task.cancelled() and closed
+    asyncio.run(run())
+
+def test_source_errors_reach_the_consumer():
+    async def broken():
+        yield "a"
+        raise RuntimeError("stream failed")
+
+    async def run():
+        return [item async for item in PrefetchedStream(broken())]
+    with pytest.raises(RuntimeError):
+        asyncio.run(run())
+
+class Handle:
+    cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+@pytest.mark.parametrize("intent, event, stage", [("rag", "speculation_hit", "speculation_saved"),
+                                                  ("smart_ai_assistant", "speculation_miss", "speculation_wasted")])
+def test_hits_and_misses_are_exported_by_guessed_intent(monkeypatch, intent, event, stage):
+    events, stages = [], []
+
+    async def classify_intent_with_context(message, chat_history):
+        return intent
+    monkeypatch.setattr(speculation, "predict_handler", lambda message, chat_history: "rag")
+    monkeypatch.setattr(rag_tool, "classify_intent_with_context", classify_intent_with_context)
+    monkeypatch.setattr(rag_tool, "count", lambda name, amount=1: events.append(name))
+    monkeypatch.setattr(rag_tool, "observe", lambda name, seconds, **attrs: stages.append((name, attrs["intent"])))
+    handle = Handle()
+    history = []
+    result = asyncio.run(rag_tool._classify_speculatively("where is your office", history, "room-spec", lambda guess: handle))
+    assert result == (intent, None if handle.cancelled else handle)
+    assert handle.cancelled == (event == "speculation_miss")
+    assert events == [event] and stages == [(stage, "rag")]
+    assert history[-1]["intent"] == intent
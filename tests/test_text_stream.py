@@ -0,0 +1,54 @@
+import asyncio
+import random
+
+from src.rag_tool import META_PHRASES, NO_INFO_RESPONSE, clean_rag_response
+from src.utils.text_stream import MetaPhraseFilter, scrub_stream, sentence_chunks
+
+WORDS = ["we", "build", "custom", "software", "for", "clients", "worldwide", "and", "have", "many", "case",
+         "studies,", "in", "Coimbatore.", "Our", "team", "is", "based", "India;", "blockchain", "AI:"]
+
+async def _stream(parts):
+    for part in parts:
+        yield part
+
+def _collect(agen):
+    async def run():
+        return [item async for item in agen]
+    return asyncio.run(run())
+
+def _random_split(text, rng):
+    parts, i = [], 0
+    while i < len(text):
+        step = rng.randint(1, 12)
+        parts.append(text[i:i + step])
+        i += step
+    return parts
+
+def _random_answer(rng):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(1, 40))]
+    if rng.random() < 0.6:
+        words.insert(rng.randint(0, len(words)), rng.choice(META_PHRASES))
+    text = " ".join(words)
+    return text[0].upper() + text[1:]
+
+def test_streaming_scrub_matches_unary_cleaning():
+    rng = random.Random(7)
+    for _ in range(2000):
+        answer = _random_answer(rng)
+        streamed = "".join(_collect(scrub_stream(_stream(_random_split(answer, rng)), META_PHRASES, fallback=NO_INFO_RESPONSE)))
+        assert streamed == clean_rag_response(answer.strip()), answer
+
+def test_scrub_keeps_space_at_holdback_boundary():
+    answer = "We build software for clients worldwide and have many case studies in healthcare and fintech."
+    scrub = MetaPhraseFilter(META_PHRASES)
+    out = "".join(scrub.feed(token) for token in answer.split(" ") for token in (token, " ")) + scrub.finish()
+    assert out == answer
+
+def test_scrub_falls_back_when_answer_is_too_short():
+    assert _collect(scrub_stream(_stream(["Based on the ", "documents, yes"]), META_PHRASES, fallback=NO_INFO_RESPONSE)) == [NO_INFO_RESPONSE]
+
+def test_sentence_chunks_split_at_sentence_ends_only():
+    text = "Our office is in Coimbatore, India. We also have a team in Dubai! The price is 3.5 lakhs, e.g. for a dApp."
+    chunks = _collect(sentence_chunks(_stream(_random_split(text, random.Random(1)))))
+    assert chunks == ["Our office is in Coimbatore, India.", "We also have a team in Dubai!",
+                      "The price is 3.5 lakhs, e.g. for a dApp."]
@@ -0,0 +1,7 @@
+from src.utils.tracing import observe, span
+
+def test_explicit_room_and_intent_labels_are_accepted():
+    observe("stt", 0.2, room_id="room", intent="rag", final=True)
+    with span("kb", room_id="room", intent="rag") as s:
+        pass
+    assert s.elapsed >= 0
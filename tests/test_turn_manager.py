@@ -0,0 +1,82 @@
+import asyncio
+from src.turn_manager import RoomTurns
+
+class FakeSpeech:
+    def __init__(self):
+        self.interrupted = False
+
+    def done(self) -> bool:
+        return self.interrupted
+
+    def interrupt(self):
+        self.interrupted = True
+
+def make_turn(turns: RoomTurns, memory: list, name: str, speak_for: float = 1.0, save_delay: float = 0.0):
+    """A turn shaped like agent.run_turn: records the user, speaks, and saves a partial reply when cancelled."""
+    async def run():
+        spoken = []
+        try:
+            memory.append(("user", name))
+            spoken.append(f"{name} answer")
+            turns.set_speech(FakeSpeech())
+            await asyncio.sleep(speak_for)
+            memory.append(("assistant", name))
+        except asyncio.CancelledError:
+            if spoken:
+                await asyncio.sleep(save_delay)  # save_turn
+                memory.append(("partial", name))
+            raise
+    return run()
+
+def test_new_turn_cancels_the_running_one():
+    async def run():
+        turns, memory = RoomTurns("room"), []
+        first = await turns.start(make_turn(turns, memory, "one"))
+        await asyncio.sleep(0.01)
+        speech = turns._speech
+        second = await turns.start(make_turn(turns, memory, "two", speak_for=0.01))
+        assert first.cancelled() and speech.interrupted
+        await second
+        assert turns.superseded == 1 and not turns.busy
+        return memory
+    memory = asyncio.run(run())
+    # The partial reply is saved before the new turn records anything
+    assert memory == [("user", "one"), ("partial", "one"), ("user", "two"), ("assistant", "two")]
+
+def test_transcript_during_the_settle_wait_supersedes_the_newer_turn():
+    async def run():
+        turns, memory = RoomTurns("room", settle_timeout=1.0), []
+        await turns.start(make_turn(turns, memory, "one", save_delay=0.05))
+        await asyncio.sleep(0.01)
+        # 'two' waits for 'one' to save its partial reply; 'three' arrives meanwhile
+        second = asyncio.create_task(turns.start(make_turn(turns, memory, "two")))
+        await asyncio.sleep(0.01)
+        third = await turns.start(make_turn(turns, memory, "three", speak_for=0.01))
+        second = second.result()
+        await third
+        assert second.cancelled()
+        assert turns._task is third and not turns.busy
+        return memory
+    memory = asyncio.run(run())
+    assert [m for m in memory if m[0] == "assistant"] == [("assistant", "three")]
+    assert memory.index(("partial", "one")) < memory.index(("user", "two")) < memory.index(("user", "three"))
+
+def test_nothing_to_supersede():
+    async def run():
+        turns = RoomTurns("room")
+        assert not await turns.supersede()
+        done = await turns.start(asyncio.sleep(0))
+        await done
+        assert not await turns.supersede()
+        assert turns.superseded == 0
+    asyncio.run(run())
+
+def test_slow_partial_save_does_not_hold_up_the_new_turn_forever():
+    async def run():
+        turns, memory = RoomTurns("room", settle_timeout=0.02), []
+        await turns.start(make_turn(turns, memory, "one", save_delay=0.2))
+        await asyncio.sleep(0.01)
+        started = asyncio.get_running_loop().time()
+        await turns.start(make_turn(turns, memory, "two", speak_for=0.01))
+        assert asyncio.get_running_loop().time() - started < 0.15
+    asyncio.run(run())
@@ -0,0 +1,117 @@
+import itertools
+import time
+import zlib
+from types import SimpleNamespace
+import pytest
+
+pytest.importorskip("livekit.agents")
+from src import worker_pool
+from src.worker_pool import FIELDS, HEARTBEAT_STALE_SECONDS, RESTART_BACKOFF_MAX, Supervisor, accepts_room, owner_of
+from src.utils.env import settings
+
+WORKERS = 3
+
+def room_owned_by(index: int) -> str:
+    return next(room for room in (f"room-{n}" for n in itertools.count()) if zlib.crc32(room.encode()) % WORKERS == index)
+
+def report(table, index: int, heartbeat: float, load: float):
+    base = index * len(FIELDS)
+    table[base:base + 2] = [heartbeat, load]
+
+@pytest.fixture
+def table(monkeypatch):
+    """This process as worker 0 of WORKERS, with a load table like the supervisor's."""
+    shared = [0.0] * (WORKERS * len(FIELDS))
+    monkeypatch.setattr(worker_pool, "_index", 0)
+    monkeypatch.setattr(worker_pool, "_count", WORKERS)
+    monkeypatch.setattr(worker_pool, "_table", shared)
+    monkeypatch.setattr(settings, "WORKER_ROOM_AFFINITY", True)
+    monkeypatch.setattr(settings, "WORKER_LOAD_THRESHOLD", 0.75)
+    return shared
+
+def test_owner_is_crc32_of_the_room_modulo_the_worker_count(table):
+    rooms = [f"room-{n}" for n in range(300)]
+    assert all(owner_of(room) == zlib.crc32(room.encode()) % WORKERS for room in rooms)
+    assert {owner_of(room) for room in rooms} == set(range(WORKERS))
+
+def test_own_rooms_are_always_accepted(table):
+    report(table, 0, time.time(), 1.0)
+    assert accepts_room(room_owned_by(0))
+
+def test_a_healthy_owner_keeps_its_rooms(table):
+    report(table, 1, time.time(), 0.5)
+    assert not accepts_room(room_owned_by(1))
+
+def test_rooms_spill_over_from_a_saturated_owner(table):
+    report(table, 1, time.time(), 0.75)
+    assert accepts_room(room_owned_by(1))
+
+def test_rooms_of_a_silent_owner_are_taken_over(table):
+    report(table, 2, time.time() - HEARTBEAT_STALE_SECONDS - 1, 0.0)
+    assert accepts_room(room_owned_by(2))
+    # A worker that never reported (still starting) counts as silent too
+    report(table, 2, 0.0, 0.0)
+    assert accepts_room(room_owned_by(2))
+
+def test_affinity_off_or_single_worker_accepts_everything(table, monkeypatch):
+    report(table, 1, time.time(), 0.0)
+    room = room_owned_by(1)
+    monkeypatch.setattr(settings, "WORKER_ROOM_AFFINITY", False)
+    assert accepts_room(room)
+    monkeypatch.setattr(settings, "WORKER_ROOM_AFFINITY", True)
+    monkeypatch.setattr(worker_pool, "_count", 1)
+    assert accepts_room(room)
+
+class FakeProc:
+    def __init__(self):
+        self.exitcode = None
+
+    def is_alive(self) -> bool:
+        return self.exitcode is None
+
+@pytest.fixture
+def supervisor(monkeypatch):
+    clock = SimpleNamespace(now=0.0)
+    monkeypatch.setattr(worker_pool, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    sup = Supervisor(entrypoint=None, count=2)
+    sup.clock, sup.spawned = clock, []
+
+    def spawn(index):
+        sup.procs[index] = FakeProc()
+        sup._started[index] = clock.now
+        sup.spawned.append((index, clock.now))
+    monkeypatch.setattr(sup, "_spawn", spawn)
+    for index in range(sup.count):
+        spawn(index)
+    sup.spawned.clear()
+    return sup
+
+def crash_and_check(sup, index: int, at: float):
+    sup.clock.now = at
+    sup.procs[index].exitcode = 1
+    sup._check()
+
+def test_crash_loops_back_off_exponentially(supervisor):
+    crash_and_check(supervisor, 0, at=5.0)
+    assert supervisor._restart_at == {0: 6.0}  # 2**1 - 1 seconds
+    supervisor.clock.now = 5.5
+    supervisor._check()
+    assert supervisor.spawned == []
+    supervisor.clock.now = 6.0
+    supervisor._check()
+    assert supervisor.spawned == [(0, 6.0)]
+    crash_and_check(supervisor, 0, at=7.0)
+    assert supervisor._restart_at == {0: 10.0}  # 2**2 - 1
+    assert supervisor.procs[1].is_alive() and 1 not in supervisor._restart_at
+
+def test_backoff_is_capped(supervisor):
+    supervisor._failures[0] = 20
+    crash_and_check(supervisor, 0, at=1.0)
+    assert supervisor._restart_at[0] == 1.0 + RESTART_BACKOFF_MAX
+
+def test_a_crash_after_a_healthy_run_restarts_at_once(supervisor):
+    supervisor._failures[1] = 4
+    crash_and_check(supervisor, 1, at=worker_pool.HEALTHY_UPTIME_SECONDS + 1)
+    assert supervisor._failures[1] == 0
+    supervisor._check()
+    assert supervisor.spawned == [(1, worker_pool.HEALTHY_UPTIME_SECONDS + 1)]
@@ -0,0 +1,60 @@
+import asyncio
+import threading
+import pytest
+from src.services import dynamodb_client
+from src.services.write_behind import SharedWriteBehind
+
+@pytest.fixture
+def batches(monkeypatch):
+    written = []
+
+    async def batch_write(table, puts=(), delete_keys=()):
+        written.append([item["sk"] for item in puts])
+        return []
+    monkeypatch.setattr(dynamodb_client, "batch_write", batch_write)
+    return written
+
+def test_rooms_on_different_loops_share_one_batch(batches):
+    writer = SharedWriteBehind("turns", max_batch=25, flush_interval=0.3)
+    enqueued = threading.Barrier(2)
+
+    def room(name):
+        async def run():
+            writer.enqueue({"room_id": name, "sk": f"{name}-1"})
+            writer.enqueue({"room_id": name, "sk": f"{name}-2"})
+            enqueued.wait()
+            await writer.drain()
+        asyncio.run(run())
+
+    threads = [threading.Thread(target=room, args=(name,)) for name in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(batches) == 1
+    assert sorted(batches[0]) == ["a-1", "a-2", "b-1", "b-2"]
+    assert writer.written == 4 and len(writer) == 0
+    writer.close()
+
+def test_flush_writes_in_enqueue_order(batches):
+    writer = SharedWriteBehind("turns", max_batch=2, flush_interval=10)
+
+    async def run():
+        for n in range(5):
+            writer.enqueue({"sk": str(n)})
+        await writer.flush()
+    asyncio.run(run())
+    assert batches == [["0", "1"], ["2", "3"], ["4"]]
+    writer.close()
+
+def test_close_writes_the_rest_and_refuses_new_items(batches):
+    writer = SharedWriteBehind("turns", max_batch=25, flush_interval=10)
+    writer.enqueue({"sk": "last"})
+    writer.close()
+    assert batches == [["last"]]
+    with pytest.raises(RuntimeError):
+        writer.enqueue({"sk": "late"})
+
+def test_drain_without_items_is_a_no_op(batches):
+    asyncio.run(SharedWriteBehind("turns").drain())
+    assert batches == []